@@ -0,0 +1,65 @@
+'''
+Acceleration
+Safeguarded Anderson acceleration of a fixed-point iteration, e.g. the ADMM iterations of RDA_solver
+'''
+
+import numpy as np
+
+
+class AndersonAcceleration:
+    def __init__(self, memory=3, regularization=1e-8) -> None:
+
+        '''
+        memory: the number of the last iterates to extrapolate from
+        regularization: the relative Tikhonov regularization of the least squares, for the nearly dependent residuals
+
+        x_{k+1} = g(x_k) - dG @ gamma, gamma = argmin || f_k - dF @ gamma ||, f = g(x) - x (type II),
+        dF, dG: the differences of the last residuals and the last g(x).
+        The plain step x_{k+1} = g(x_k) is taken and the history is cleared if the residual grows, the extrapolation was not a descent.
+        '''
+
+        self.memory = memory
+        self.regularization = regularization
+        self.reset()
+
+    def reset(self):
+        self.last_g = None
+        self.last_f = None
+        self.dG_list = []
+        self.dF_list = []
+
+    def step(self, x, g):
+
+        '''
+        x: the iterate, 1d array; g: the result of the iteration from x
+
+        return the next iterate and whether it is extrapolated
+        '''
+
+        f = g - x
+
+        if self.last_f is not None and (len(f) != len(self.last_f) or np.linalg.norm(f) > np.linalg.norm(self.last_f)):
+            # the residual grows (or the variables changed), restart from the plain step
+            self.reset()
+
+        if self.last_f is not None:
+            self.dG_list.append(g - self.last_g)
+            self.dF_list.append(f - self.last_f)
+
+            if len(self.dF_list) > self.memory:
+                self.dG_list.pop(0)
+                self.dF_list.pop(0)
+
+        self.last_g, self.last_f = g, f
+
+        if len(self.dF_list) == 0:
+            return g, False
+
+        dF = np.column_stack(self.dF_list)
+        dG = np.column_stack(self.dG_list)
+
+        FF = dF.T @ dF
+        FF += self.regularization * max(np.trace(FF), 1e-12) * np.eye(FF.shape[0])
+        gamma = np.linalg.solve(FF, dF.T @ f)
+
+        return g - dG @ gamma, True
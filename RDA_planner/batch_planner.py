@@ -0,0 +1,85 @@
+'''
+Batch planner
+Plan for several robots in one process, the subproblems of all the robots are solved by one shared solver pool
+'''
+
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from RDA_planner.mpc import MPC
+from RDA_planner.solver_pool import SolverPool
+
+
+class BatchPlanner:
+    def __init__(self, car_tuple, ref_path_list, process_num=4, thread_num=None, problem_cache_dir=None, **kwargs) -> None:
+
+        '''
+        car_tuple: the car of all the robots, or the list of the car of each robot
+        ref_path_list: the reference path of each robot, the number of the paths is the number of the robots
+        process_num (4): the number of the worker processes shared by all the robots
+        thread_num (None): the number of the robots planned at the same time, all the robots if None
+        problem_cache_dir (None): the directory of the problem cache, see RDA_solver; a temporary directory of the pool if None
+        kwargs: the arguments of MPC for all the robots, e.g. receding, iter_num, obstacle_template_list, see MPC
+
+        Each robot has its own MPC (the reference path, the warm start and the obstacle slots), planned in a thread.
+        The threads only prepare the problems and wait, the su (ECOS) and the LamMuZ subproblems of all the robots are queued
+        in the shared SolverPool and solved by the idle workers, the robots with the same horizon and car share the compiled problems.
+        '''
+
+        robot_num = len(ref_path_list)
+        car_tuple_list = car_tuple if isinstance(car_tuple, list) else [car_tuple] * robot_num
+
+        assert len(car_tuple_list) == robot_num, 'one car tuple for each reference path'
+
+        self.solver_pool = SolverPool(process_num, problem_cache_dir).start()
+        self.mpc_list = [MPC(car, ref_path, solver_pool=self.solver_pool, process_num=1, **kwargs) for car, ref_path in zip(car_tuple_list, ref_path_list)]
+        self.executor = ThreadPoolExecutor(max_workers=thread_num if thread_num is not None else robot_num)
+
+    def control(self, state_list, ref_speed=5, obstacle_list=None, ref_path_list=None, **kwargs):
+
+        '''
+        state_list: the state of each robot, (3, 1) vectors
+        ref_speed: the reference speed of all the robots, or the list of each robot
+        obstacle_list: the obstacle list of each robot (see MPC.control), no obstacle if None
+        ref_path_list: the new reference path of each robot (None for the robots keeping the path), the paths are kept if None
+        kwargs: the arguments of MPC.control for all the robots, e.g. time_budget
+
+        return the list of (u, info) of the robots, the same as MPC.control
+        '''
+
+        robot_num = len(self.mpc_list)
+        speed_list = ref_speed if isinstance(ref_speed, (list, tuple, np.ndarray)) else [ref_speed] * robot_num
+        obstacle_list = obstacle_list if obstacle_list is not None else [[] for _ in range(robot_num)]
+
+        assert len(state_list) == robot_num and len(speed_list) == robot_num and len(obstacle_list) == robot_num, 'one state, speed and obstacle list for each robot'
+
+        if ref_path_list is not None:
+            for mpc, ref_path in zip(self.mpc_list, ref_path_list):
+                if ref_path is not None:
+                    mpc.update_ref_path(ref_path)
+
+        future_list = [self.executor.submit(mpc.control, state, speed, obstacles, **kwargs) for mpc, state, speed, obstacles in zip(self.mpc_list, state_list, speed_list, obstacle_list)]
+
+        return [future.result() for future in future_list]
+
+    def update_parameter(self, **kwargs):
+        # the adjust parameters of all the robots, see MPC.update_parameter
+        for mpc in self.mpc_list:
+            mpc.update_parameter(**kwargs)
+
+    def close(self):
+
+        self.executor.shutdown()
+
+        for mpc in self.mpc_list:
+            mpc.close()
+
+        self.solver_pool.close()
+
+    def __len__(self):
+        return len(self.mpc_list)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,102 @@
+'''
+Compiled conic problem
+Solve a DPP cvxpy problem by ECOS from the parametrized problem data compiled once, lazily, or loaded from the problem cache
+'''
+
+import cvxpy as cp
+import numpy as np
+import scipy.sparse as sp
+from RDA_planner.problem_cache import compile_problem
+
+
+class CompiledConic:
+
+    # the exit flags of ECOS with a solution, the others are failures
+    STATUS_MAP = {0: cp.OPTIMAL, 10: cp.OPTIMAL_INACCURATE}
+
+    def __init__(self, build, parameters, variables, cache=None, name=None, **solver_opts) -> None:
+
+        '''
+        build: function returning the cvxpy problem, DPP and conic, called by the first solve only if the problem is not cached,
+            None to load the problem from the cache only
+        parameters: the parameters the problem may use, in a fixed order, None if build is None
+        variables: the variables to recover, in a fixed order, without attributes, None if build is None
+        cache, name: the ProblemCache and the name of the problem in it, see compile_problem
+        solver_opts: the settings of ECOS, default of ECOS if not given
+
+        Each solve maps the parameter values to the conic data and calls ECOS directly, without the cvxpy solving chain.
+        '''
+
+        import ecos
+
+        self.ecos = ecos
+        self.build = build
+        self.parameters = parameters
+        self.variables = variables
+        self.cache = cache
+        self.name = name
+        self.solver_opts = solver_opts
+
+        self.compiled = None
+
+    def compile(self):
+
+        if self.compiled is None:
+            self.compiled = compile_problem(self.build, self.parameters, self.variables, cp.ECOS, self.cache, self.name)
+            self.dims = {'l': self.compiled['param_prog'].cone_dims.nonneg, 'q': list(self.compiled['param_prog'].cone_dims.soc), 'e': 0}
+
+        return self.compiled
+
+    def solve(self, value_list=None, pool=None):
+
+        '''
+        value_list: the values of the parameters in the order of the parameter list, the values of the parameters if None
+        pool: the SolverPool to solve the problem in its workers, None to solve in this process
+
+        return the status; the values of the variables are assigned if solved
+        '''
+
+        if value_list is None:
+            value_list = [p.value for p in self.parameters]
+
+        if pool is not None:
+            status, solution_list = pool.solve([(self, value_list)])[0]
+        else:
+            status, solution_list = self.solve_values(value_list)
+
+        if solution_list is not None:
+            for variable, value in zip(self.variables, solution_list):
+                variable.value = value
+
+        return status
+
+    def solve_values(self, value_list):
+
+        '''
+        solve by the values of the parameters, the variables are not touched, e.g. in the worker processes of SolverPool
+
+        return the status, the list of the variable values (None if not solved)
+        '''
+
+        compiled = self.compile()
+        param_prog = compiled['param_prog']
+
+        value_dict = {param_id: np.asarray(value) for param_id, value in zip(compiled['param_ids'], value_list)}
+        c, _, A, b = param_prog.apply_parameters(value_dict)
+
+        # A x + b in the cones: the first rows zero, the others nonneg and soc, ECOS: A_eq x = b_eq, G x + s = h, s in the cones
+        n_eq = param_prog.cone_dims.zero
+        A = sp.csc_matrix(A)
+        b = np.asarray(b).flatten(order='F')
+
+        A_eq, b_eq = (-A[:n_eq], b[:n_eq]) if n_eq > 0 else (None, None)
+
+        solution = self.ecos.solve(c, -A[n_eq:], b[n_eq:], self.dims, A_eq, b_eq, verbose=False, **self.solver_opts)
+        status = self.STATUS_MAP.get(solution['info']['exitFlag'], cp.SOLVER_ERROR)
+
+        if status == cp.SOLVER_ERROR:
+            return status, None
+
+        solution = param_prog.split_solution(solution['x'], active_vars=compiled['var_ids'])
+
+        return status, [solution[var_id] for var_id in compiled['var_ids']]
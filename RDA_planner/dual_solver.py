@@ -0,0 +1,221 @@
+'''
+RDA dual solver
+Batched numpy solver for the LamMuZ subproblem of RDA_solver
+'''
+
+import numpy as np
+
+
+class DualSolverNumpy:
+    def __init__(self, G, h, cone_type='Rpositive', iter_num=20, ro1=1, barrier_range=(1, 1e9)) -> None:
+
+        '''
+        Solve the LamMuZ subproblems of all the obstacles and all the time steps together.
+
+        The subproblem is separable over the obstacles and the time steps, for each x_t = (lam_t, mu_t):
+            min 0.5*ro1*neg(Im_t - z_t)^2 + 0.5*ro2*||Hm_t||^2
+            s.t. lam_t in K_obs, ||obsA_t.T @ lam_t|| <= 1, mu_t in K_car, z_t >= 0
+
+        The subproblem is degenerate, all the points with Hm_t = 0 and 0 <= z_t <= Im_t have zero cost.
+        It is solved by a batched barrier method from a fixed interior point, so that the result is the analytic center of the optimal set
+        instead of the optimal point nearest to a warm start, which keeps Im_t and the safety distance at 0. The center is near the interior
+        point ECOS returns but not the same, the plans are close to but not the same as the cvxpy backend.
+        The neg() and the cones are written as ECOS receives them from cvxpy: s_t >= 0, s_t >= z_t - Im_t, and an auxiliary radius
+        for the norm2 cones and the unit ball.
+
+        G, h, cone_type: the car geometry, G @ p <=_cone h
+        iter_num (20): the number of the Newton steps, the barrier weight grows geometrically over barrier_range, one step each
+        ro1 (1): the penalty on Im, the same value as the cvxpy LamMuZ problem
+        barrier_range ((1, 1e9)): the first and the last weight of the objective against the barrier
+        '''
+
+        self.G = np.asarray(G, dtype=float)
+        self.h = np.asarray(h, dtype=float).reshape(-1)
+        self.cone_type = cone_type
+
+        self.iter_num = iter_num
+        self.ro1 = ro1
+        self.barrier_range = barrier_range
+
+    def solve(self, lam, mu, obsA, obsA_rot, obs_trans, xi, offset, ro2, cone_type='Rpositive'):
+
+        '''
+        The arrays are stacked by obstacle (K) and time step (T):
+            lam: (K, T, m), mu: (K, T, n), the last values, only their shapes are used, the barrier method starts from a fixed interior point
+            obsA: (K, T, m, 2), the obstacle matrix A
+            obsA_rot: (K, T, m, 2), obsA @ rot
+            obs_trans: (K, T, m), obsA @ trans - obsb
+            xi: (K, T, 2)
+            offset: (K, T), zeta - dis
+            ro2: the penalty on Hm
+            cone_type: the cone of the obstacles, Rpositive or norm2
+
+        return lam (K, T, m), mu (K, T, n), z (K, T)
+        '''
+
+        K, T, m = lam.shape
+        n = mu.shape[-1]
+        B = K * T
+
+        # y = [lam, mu, z, s, r, (lam radius), (mu radius)], s: the epigraph of neg(Im - z), r: the radius of obsA.T @ lam
+        iz, i_s, ir = m+n, m+n+1, m+n+2
+        N = m+n+3
+
+        positive_list, soc_list, radius_list = [iz, i_s], [], []
+
+        for start, size, cone in ((0, m, cone_type), (m, n, self.cone_type)):
+            if cone == 'Rpositive':
+                positive_list += list(range(start, start+size))
+            else:
+                # ||x[0:-1]|| <= w <= -x[-1], see cone_project
+                soc_list.append(list(range(start, start+size-1)) + [N])
+                radius_list.append((start+size-1, N))
+                N += 1
+
+        # the linear constraints row @ y + row_b > 0: s + Im - z (Im = c @ (lam, mu) + offset), 1 - r, the cone radii, y >= 0
+        L = 2 + len(radius_list) + len(positive_list)
+        row = np.zeros((B, L, N))
+        row_b = np.zeros((B, L))
+
+        row[:, 0, 0:m] = obs_trans.reshape(B, m)
+        row[:, 0, m:m+n] = -self.h
+        row[:, 0, [iz, i_s]] = [-1, 1]
+        row_b[:, 0] = offset.reshape(B)
+
+        row[:, 1, ir] = -1
+        row_b[:, 1] = 1
+
+        for i, (last, radius) in enumerate(radius_list):
+            row[:, 2+i, [last, radius]] = -1
+
+        row[:, 2+len(radius_list):][:, range(len(positive_list)), positive_list] = 1
+
+        # the second order cones ||u[0:-1]|| < u[-1], u = F @ y: the obstacle and car norm2 cones, the unit ball (obsA.T @ lam, r)
+        P = np.swapaxes(obsA, -1, -2).reshape(B, 2, m)
+
+        soc_F = {}
+        for index in soc_list:
+            F = np.zeros((B, len(index), N))
+            F[:, range(len(index)), index] = 1
+            soc_F.setdefault(len(index), []).append(F)
+
+        F = np.zeros((B, 3, N))
+        F[:, 0:2, 0:m] = P
+        F[:, 2, ir] = 1
+        soc_F.setdefault(3, []).append(F)
+
+        soc_group = []
+        for d, F_list in soc_F.items():
+            sign = np.r_[-np.ones(d-1), 1.0]
+            soc_group.append((np.stack(F_list, axis=1), sign, np.diag(sign)))
+
+        # the cost 0.5 * y @ H_cost @ y + c_cost @ y + const
+        M = np.zeros((B, 2, N))
+        M[:, :, 0:m] = np.swapaxes(obsA_rot, -1, -2).reshape(B, 2, m)
+        M[:, :, m:m+n] = self.G.T
+        Mt = np.swapaxes(M, -1, -2)
+
+        H_cost = ro2 * Mt @ M
+        H_cost[:, i_s, i_s] += self.ro1
+        c_cost = ro2 * (Mt @ xi.reshape(B, 2, 1))[:, :, 0]
+
+        y = self.initial_point(P, m, n, N, cone_type, radius_list, row[:, 0], row_b[:, 0], iz, i_s, ir)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for weight in np.geomspace(*self.barrier_range, self.iter_num):
+
+                grad = weight * ((H_cost @ y[:, :, np.newaxis])[:, :, 0] + c_cost)
+
+                # -log(row @ y + row_b)
+                slack = (row @ y[:, :, np.newaxis])[:, :, 0] + row_b
+                W = row / slack[:, :, np.newaxis]
+                grad -= np.sum(W, axis=1)
+                hess = weight * H_cost + np.swapaxes(W, -1, -2) @ W
+
+                # -log(t^2 - ||x||^2), u = (x, t) = F @ y
+                soc_u = []
+                for F, sign, J in soc_group:
+                    u = (F @ y[:, np.newaxis, :, np.newaxis])[..., 0]
+                    q = np.sum(u * u * sign, axis=-1)[..., np.newaxis]
+                    soc_grad = -2 * u * sign / q
+                    soc_hess = soc_grad[..., np.newaxis] * soc_grad[..., np.newaxis, :] - 2 * J / q[..., np.newaxis]
+
+                    Ft = np.swapaxes(F, -1, -2)
+                    grad += np.sum(Ft @ soc_grad[..., np.newaxis], axis=1)[:, :, 0]
+                    hess += np.sum(Ft @ soc_hess @ F, axis=1)
+                    soc_u.append(u)
+
+                dy = -np.linalg.solve(hess, grad[:, :, np.newaxis])
+
+                # the full step, or 0.99 of the step to the boundary
+                d_slack = (row @ dy)[:, :, 0]
+                step = np.min(np.where(d_slack < 0, -slack / d_slack, np.inf), axis=1)
+
+                for (F, sign, J), u in zip(soc_group, soc_u):
+                    step = np.minimum(step, np.min(self.soc_step(u, (F @ dy[:, np.newaxis])[..., 0], sign), axis=1))
+
+                y = y + np.minimum(0.99 * step, 1)[:, np.newaxis] * dy[:, :, 0]
+
+        return y[:, 0:m].reshape(K, T, m), y[:, m:m+n].reshape(K, T, n), y[:, iz].reshape(K, T)
+
+    def initial_point(self, P, m, n, N, cone_type, radius_list, im_row, im_b, iz, i_s, ir):
+        # a strictly feasible point: the cone centers scaled into half of the unit ball, r = 0.75, z = 1, s above z - Im
+
+        y = np.zeros((P.shape[0], N))
+
+        lam = np.ones(m) if cone_type == 'Rpositive' else np.r_[np.zeros(m-1), -1.0]
+        bound = np.sum(np.abs(lam)) * np.max(np.linalg.norm(P, axis=1), axis=1)
+        y[:, 0:m] = lam * (0.5 / np.maximum(bound, 1e-9))[:, np.newaxis]
+        y[:, m:m+n] = 1 if self.cone_type == 'Rpositive' else np.r_[np.zeros(n-1), -1.0]
+
+        # the radii of the norm2 cones in the middle of [0, -x[-1]]
+        for last, radius in radius_list:
+            y[:, radius] = -y[:, last] / 2
+
+        y[:, ir] = 0.75
+        y[:, iz] = 1
+
+        Im = np.einsum('bj,bj->b', im_row[:, 0:m+n], y[:, 0:m+n]) + im_b
+        y[:, i_s] = np.maximum(1 - Im, 0) + 1
+
+        return y
+
+    @staticmethod
+    def soc_step(u, du, sign):
+        # the largest step keeping u + step * du in the interior of the second order cone, u = (x, t) on the last axis
+        # q(step) = ||t + step * dt||^2 - ||x + step * dx||^2 = a * step^2 + b * step + c, c > 0, the first positive root
+        # (t stays positive before q reaches 0)
+
+        a = np.sum(du * du * sign, axis=-1)
+        b = 2 * np.sum(u * du * sign, axis=-1)
+        c = np.sum(u * u * sign, axis=-1)
+
+        disc = b**2 - 4*a*c
+        k = -0.5 * (b + np.copysign(np.sqrt(np.maximum(disc, 0)), b))
+        root_1, root_2 = k / a, c / k
+
+        step = np.minimum(np.where(root_1 > 0, root_1, np.inf), np.where(root_2 > 0, root_2, np.inf))
+
+        return np.where(disc >= 0, step, np.inf)
+
+    @staticmethod
+    def cone_project(array, cone='Rpositive'):
+        # project the last axis of the array to the feasible set of cone_cp_array(-array, cone) in RDA_solver
+        #   Rpositive: array >= 0
+        #   norm2: ||array[0:-1]|| <= -array[-1]
+
+        if cone == 'Rpositive':
+            return np.maximum(array, 0)
+
+        elif cone == 'norm2':
+            v = -array[..., 0:-1]
+            s = -array[..., -1:]
+            norm_v = np.linalg.norm(v, axis=-1, keepdims=True)
+
+            scale = (norm_v + s) / 2
+            proj = np.concatenate((v * scale / np.maximum(norm_v, 1e-12), scale), axis=-1)
+
+            proj = np.where(norm_v <= s, -array, proj)
+            proj = np.where(norm_v <= -s, 0, proj)
+
+            return -proj
@@ -0,0 +1,203 @@
+'''
+Executor
+The executors of the compiled subproblems behind one interface: serial, thread pool and process pool, chosen per solver
+'''
+
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from RDA_planner.compiled_conic import CompiledConic
+
+# the compiled problems loaded by the worker process, {cache file path: CompiledConic}
+worker_problem_dict = {}
+
+
+class SerialExecutor:
+    def __init__(self, worker_num=1) -> None:
+
+        '''
+        solve the problems one by one in the calling thread, no start needed, worker_num is not used
+        '''
+
+        self.worker_num = 1
+
+    def start(self):
+        return self
+
+    def close(self):
+        pass
+
+    @property
+    def running(self):
+        return True
+
+    def solve(self, problem_list, chunk_size=None):
+
+        '''
+        problem_list: list of (CompiledConic, the values of its parameters)
+        chunk_size: the number of the problems of each task, not used
+
+        return the list of (status, the list of the variable values) of the problems
+        '''
+
+        return solve_compiled_list(problem_list)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def split(self, task_list, chunk_size=None):
+        # the tasks grouped by chunk_size, one group for each worker if None
+
+        if chunk_size is None:
+            chunk_size = -(-len(task_list) // self.worker_num)
+
+        chunk_size = max(int(chunk_size), 1)
+
+        return [task_list[i:i+chunk_size] for i in range(0, len(task_list), chunk_size)]
+
+
+class ThreadExecutor(SerialExecutor):
+    def __init__(self, worker_num=4) -> None:
+
+        '''
+        worker_num: the number of the threads
+
+        The problems are solved in the threads of this process, no inter process communication and the compiled problems are shared.
+        The threads run at the same time only in the solver calls releasing the GIL, otherwise they take turns.
+        '''
+
+        self.worker_num = worker_num
+        self.pool = None
+
+    def start(self):
+
+        if not self.running:
+            self.pool = ThreadPoolExecutor(max_workers=self.worker_num)
+
+        return self
+
+    def close(self):
+
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    @property
+    def running(self):
+        return self.pool is not None
+
+    def solve(self, problem_list, chunk_size=None):
+
+        '''
+        chunk_size: the number of the problems of each task, the problems split evenly among the threads if None
+
+        see SerialExecutor.solve
+        '''
+
+        assert self.running, 'the executor is not started'
+
+        if len(problem_list) == 0:
+            return []
+
+        for compiled, _ in problem_list:
+            # compiled in the calling thread, the threads only solve
+            compiled.compile()
+
+        future_list = [self.pool.submit(solve_compiled_list, chunk) for chunk in self.split(problem_list, chunk_size)]
+
+        return [solution for future in future_list for solution in future.result()]
+
+    def __getstate__(self):
+        # the pool belongs to the owner process
+        state = self.__dict__.copy()
+        state.update(pool=None)
+        return state
+
+
+class ProcessExecutor(ThreadExecutor):
+    def __init__(self, worker_num=4, cache_dir=None) -> None:
+
+        '''
+        worker_num: the number of the worker processes
+        cache_dir: the directory of the problem cache, the workers load the compiled problems from it, a temporary directory removed by close if None
+
+        The tasks are the parameter values of the CompiledConic problems, a worker loads the compiled data from the cache at its first task of a problem,
+        the solver itself is not sent to the workers. The tasks of all the callers are queued together and taken by the idle workers.
+        The solve is thread safe, the solvers of several robots may run in threads and wait for their results (see BatchPlanner).
+        '''
+
+        self.worker_num = worker_num
+        self.temp_dir = cache_dir is None
+        self.cache_dir = tempfile.mkdtemp(prefix='rda_problem_') if cache_dir is None else cache_dir
+
+        self.pool = None
+
+    def start(self):
+
+        if not self.running:
+            self.pool = ProcessPoolExecutor(max_workers=self.worker_num)
+
+        return self
+
+    def solve(self, problem_list, chunk_size=None):
+
+        '''
+        problem_list: list of (CompiledConic with the problem cache, the values of its parameters)
+        chunk_size: the number of the problems of each task, the problems split evenly among the workers if None;
+            the fewer tasks the less overhead of the inter process communication
+
+        see SerialExecutor.solve
+        '''
+
+        assert self.running, 'the executor is not started'
+
+        if len(problem_list) == 0:
+            return []
+
+        for compiled, _ in problem_list:
+            # compiled in this process first, so the cache has it for the workers
+            compiled.compile()
+
+            if not os.path.exists(compiled.cache.path(compiled.name)):
+                # e.g. the temporary directory removed by the last close, the compiled data is kept by the solver
+                compiled.cache.save(compiled.name, compiled.compiled)
+
+        task_list = [(compiled.cache, compiled.name, value_list) for compiled, value_list in problem_list]
+        future_list = [self.pool.submit(solve_problem_list, chunk) for chunk in self.split(task_list, chunk_size)]
+
+        return [solution for future in future_list for solution in future.result()]
+
+    def close(self):
+
+        super().close()
+
+        if self.temp_dir:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+
+executor_dict = {'serial': SerialExecutor, 'thread': ThreadExecutor, 'process': ProcessExecutor}
+
+
+def solve_compiled_list(problem_list):
+    # problem: (CompiledConic, value_list)
+    return [compiled.solve_values(value_list) for compiled, value_list in problem_list]
+
+
+def solve_problem_list(task_list):
+    # run in the worker process, task: (cache, name, value_list)
+
+    solution_list = []
+
+    for cache, name, value_list in task_list:
+        path = cache.path(name)
+
+        if path not in worker_problem_dict:
+            worker_problem_dict[path] = CompiledConic(None, None, None, cache, name)
+
+        solution_list.append(worker_problem_dict[path].solve_values(value_list))
+
+    return solution_list
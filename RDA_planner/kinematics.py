@@ -0,0 +1,95 @@
+'''
+Kinematics
+The motion models of the robot, the rollout and the linearization of the whole horizon in one vectorized call
+'''
+
+import numpy as np
+
+
+class Kinematics:
+    def __init__(self, model='ackermann', wheelbase=1) -> None:
+
+        '''
+        model: the motion model, state (x, y, phi) for all
+            ackermann: vel (v, psi), linear speed and steering angle;
+            diff: vel (v, omega), linear and angular speed of the differential drive;
+            omni: vel (vx, vy), the speed in the world frame, the heading is not changed.
+        wheelbase: the wheelbase of the ackermann model
+        '''
+
+        assert model in ('ackermann', 'diff', 'omni'), 'unknown kinematics model ' + str(model)
+
+        self.model = model
+        self.wheelbase = wheelbase
+
+    def rollout(self, state, vel_array, dt, wheelbase=None):
+
+        '''
+        the states of the constant velocities in the horizon, the same as the steps of step()
+        state: (3, 1), the initial state
+        vel_array: (2, T), the velocity of each step
+
+        return (3, T+1)
+        '''
+
+        L = self.wheelbase if wheelbase is None else wheelbase
+        v0, v1 = vel_array[0, :], vel_array[1, :]
+
+        if self.model == 'ackermann':
+            dphi = v0 * np.tan(v1) / L
+        elif self.model == 'diff':
+            dphi = v1
+        else:
+            dphi = np.zeros(v0.shape)
+
+        phi = state[2, 0] + np.concatenate(([0], np.cumsum(dphi * dt)))
+
+        if self.model == 'omni':
+            dx, dy = v0, v1
+        else:
+            dx, dy = v0 * np.cos(phi[:-1]), v0 * np.sin(phi[:-1])
+
+        x = state[0, 0] + np.concatenate(([0], np.cumsum(dx * dt)))
+        y = state[1, 0] + np.concatenate(([0], np.cumsum(dy * dt)))
+
+        return np.vstack((x, y, phi))
+
+    def step(self, state, vel, dt, wheelbase=None):
+        # the next state of one step, (3, 1)
+        return self.rollout(state, vel, dt, wheelbase)[:, 1:2]
+
+    def linearize(self, nom_s, nom_u, dt):
+
+        '''
+        the linear model s_t+1 = A_t @ s_t + B_t @ u_t + C_t around the nominal states and velocities of all the steps
+        nom_s: (3, T), nom_u: (2, T)
+
+        return A (T, 3, 3), B (T, 3, 2), C (T, 3, 1)
+        '''
+
+        phi = nom_s[2]
+        v0, v1 = nom_u[0], nom_u[1]
+
+        zero, one = np.zeros(phi.shape), np.ones(phi.shape)
+
+        if self.model == 'omni':
+            A = np.broadcast_to(np.eye(3), (len(phi), 3, 3)).copy()
+            B = np.stack([ one*dt, zero, zero, one*dt, zero, zero ], axis=1).reshape(-1, 3, 2)
+            C = np.zeros((len(phi), 3, 1))
+
+            return A, B, C
+
+        cos_phi, sin_phi = np.cos(phi), np.sin(phi)
+
+        A = np.stack([ one, zero, -v0 * dt * sin_phi, zero, one, v0 * dt * cos_phi, zero, zero, one ], axis=1).reshape(-1, 3, 3)
+
+        if self.model == 'ackermann':
+            psi_gain = v0*dt / (self.wheelbase * np.cos(v1)**2)
+
+            B = np.stack([ cos_phi*dt, zero, sin_phi*dt, zero, np.tan(v1)*dt / self.wheelbase, psi_gain ], axis=1).reshape(-1, 3, 2)
+            C = np.stack([ phi*v0*sin_phi*dt, -phi*v0*cos_phi*dt, -v1 * psi_gain ], axis=1)[:, :, np.newaxis]
+        else:
+            B = np.stack([ cos_phi*dt, zero, sin_phi*dt, zero, zero, one*dt ], axis=1).reshape(-1, 3, 2)
+            C = np.stack([ phi*v0*sin_phi*dt, -phi*v0*cos_phi*dt, zero ], axis=1)[:, :, np.newaxis]
+
+        return A, B, C
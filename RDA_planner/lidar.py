@@ -0,0 +1,243 @@
+'''
+Lidar obstacle
+Convert the lidar scans to the rda obstacles: vectorized scan points, scan order clustering, one box or convex polygon for each cluster
+and the ids of the clusters kept across the scans
+'''
+
+import numpy as np
+from scipy.spatial import ConvexHull, QhullError
+from RDA_planner.mpc import MPC, rdaobs
+
+
+class LidarObstacle:
+    def __init__(self, eps=0.5, min_points=3, shape='box', max_edge=4, min_width=0.1, inflate=0, max_num=None, range_margin=0.01, match_dis=1.0) -> None:
+
+        '''
+        eps (0.5): the break distance of two neighboring points in the scan order, the arc of one beam at their range is added
+        min_points (3): the clusters with fewer points are dropped as noise
+        shape ('box'): 'box', the minimum area rectangle of each cluster;
+            'polygon', the convex hull of the cluster if it has at most max_edge vertices, otherwise the box
+        max_edge (4): the maximum edge number of the polygons, the obstacle_template_list of MPC should have the slots of the edge numbers
+        min_width (0.1): the minimum width of the box, e.g. the points of a wall are on one line
+        inflate (0): expand the boxes by the distance on each side, e.g. the noise of the ranges
+        max_num (None): the maximum number of the obstacles, the closest ones are kept, all if None
+        range_margin (0.01): the beams with range >= range_max - range_margin hit nothing
+        match_dis (1.0): the maximum displacement of the center of a cluster between two scans to keep its id, None for the obstacles without id
+
+        The points are converted by the cached cos / sin of the beam angles, the neighboring valid points in the scan order
+        belong to the same cluster unless they are farther than the break distance, O(n) for n beams;
+        a scan of 360 degrees joins the last and the first clusters if they are close.
+        The obstacles are static rdaobs (A, b of the counterclockwise vertices in the world frame), sorted by the distance to the robot,
+        ready for RDA_solver (MPC with rda_obstacle=True).
+        Each scan is clustered from scratch (not incremental); the clusters take the ids of the closest clusters of the last scan
+        within match_dis (world frame centers, the closest pairs first) and new ids otherwise, so that RDA_solver keeps their slots and dual variables.
+        '''
+
+        assert shape in ('box', 'polygon'), 'shape should be box or polygon'
+
+        self.eps = eps
+        self.min_points = max(min_points, 1)
+        self.shape = shape
+        self.max_edge = max_edge
+        self.min_width = min_width
+        self.inflate = inflate
+        self.max_num = max_num
+        self.range_margin = range_margin
+        self.match_dis = match_dis
+
+        # the ids and the world frame centers (k, 2) of the clusters of the last scan
+        self.track_id = []
+        self.track_center = np.zeros((0, 2))
+        self.next_id = 0
+
+        self.angle_key = None
+        self.cos_angle = None
+        self.sin_angle = None
+
+    def __call__(self, state, scan_data):
+        return self.obstacle_list(state, scan_data)
+
+    def obstacle_list(self, state, scan_data):
+
+        '''
+        state: the robot state (x, y, theta), 3*1 vector, the pose of the lidar
+        scan_data: dict of ranges, angle_min, angle_max, range_max and the optional range_min
+
+        return the list of rdaobs, the closest first
+        '''
+
+        points, ranges = self.scan_points(scan_data)
+        cluster_list = self.cluster(points, ranges, len(np.ravel(scan_data['ranges'])), scan_data['angle_min'], scan_data['angle_max'])
+
+        if len(cluster_list) == 0:
+            self.track_id, self.track_center = [], np.zeros((0, 2))
+            return []
+
+        # the closest clusters first, so that they have the solver slots
+        cluster_list.sort(key=lambda index: np.min(ranges[index]))
+
+        if self.max_num is not None:
+            cluster_list = cluster_list[0:self.max_num]
+
+        trans = np.reshape(state[0:2], (2, 1))
+        rot = np.reshape(state, -1)[2]
+        R = np.array([[np.cos(rot), -np.sin(rot)], [np.sin(rot), np.cos(rot)]])
+
+        vertex_list = [trans + R @ self.fit(points[:, index]) for index in cluster_list]
+        id_list = self.match_id(np.array([np.mean(vertex, axis=1) for vertex in vertex_list]))
+
+        obstacle_list = []
+
+        for vertex, obs_id in zip(vertex_list, id_list):
+            A, b = MPC.gen_inequal_batch(vertex[np.newaxis])
+
+            obstacle_list.append(rdaobs(A[0], b[0][:, np.newaxis], 'Rpositive', None, vertex, obs_id))
+
+        return obstacle_list
+
+    def match_id(self, center):
+
+        '''
+        center: (k, 2) the world frame centers of the clusters of this scan
+
+        return the ids of the clusters, the ids of the matched clusters of the last scan or new ids; None for all if match_dis is None
+        '''
+
+        if self.match_dis is None:
+            return [None] * len(center)
+
+        id_list = [None] * len(center)
+
+        if len(self.track_id) != 0:
+            distance = np.linalg.norm(center[:, np.newaxis] - self.track_center[np.newaxis], axis=2)
+            used = set()
+
+            # the closest pairs first
+            for i, j in zip(*np.unravel_index(np.argsort(distance, axis=None), distance.shape)):
+                if distance[i, j] > self.match_dis:
+                    break
+
+                if id_list[i] is None and j not in used:
+                    id_list[i] = self.track_id[j]
+                    used.add(j)
+
+        for i in range(len(id_list)):
+            if id_list[i] is None:
+                id_list[i] = self.next_id
+                self.next_id += 1
+
+        self.track_id, self.track_center = id_list, center
+
+        return id_list
+
+    def scan_points(self, scan_data):
+
+        '''
+        return the valid points (2, n) in the lidar frame in the scan order and their ranges (n, )
+        '''
+
+        ranges = np.asarray(scan_data['ranges'], dtype=float).ravel()
+        key = (scan_data['angle_min'], scan_data['angle_max'], len(ranges))
+
+        if key != self.angle_key:
+            angles = np.linspace(scan_data['angle_min'], scan_data['angle_max'], len(ranges))
+            self.cos_angle, self.sin_angle = np.cos(angles), np.sin(angles)
+            self.angle_key = key
+
+        valid = np.isfinite(ranges) & (ranges < scan_data['range_max'] - self.range_margin) & (ranges > scan_data.get('range_min', 0))
+        beam_index = np.flatnonzero(valid)
+        ranges = ranges[beam_index]
+
+        points = np.vstack((ranges * self.cos_angle[beam_index], ranges * self.sin_angle[beam_index]))
+
+        return points, ranges
+
+    def cluster(self, points, ranges, beam_num, angle_min, angle_max):
+
+        '''
+        split the points in the scan order at the gaps larger than the break distance
+
+        return the list of the point indices of the clusters, with at least min_points points
+        '''
+
+        n = points.shape[1]
+
+        if n == 0:
+            return []
+
+        angle_step = (angle_max - angle_min) / max(beam_num - 1, 1)
+
+        # the break distance of each neighboring pair: eps and the arc of one beam at the nearer range, the spacing of the points of 
+        # one surface far away; the pairs with the beams of no return between them are not closer than their distance
+        gap = np.linalg.norm(np.diff(points, axis=1), axis=0)
+        threshold = self.eps + np.minimum(ranges[:-1], ranges[1:]) * angle_step
+
+        split = np.flatnonzero(gap > threshold) + 1
+        cluster_list = np.split(np.arange(n), split)
+
+        # 360 degrees, the last beam is next to the first one
+        full = beam_num * angle_step >= 2 * np.pi - 1e-6
+
+        if full and len(cluster_list) > 1:
+            wrap_threshold = self.eps + min(ranges[0], ranges[-1]) * angle_step
+
+            if np.linalg.norm(points[:, 0] - points[:, -1]) <= wrap_threshold:
+                cluster_list[0] = np.concatenate((cluster_list.pop(), cluster_list[0]))
+
+        return [index for index in cluster_list if len(index) >= self.min_points]
+
+    def fit(self, points):
+
+        '''
+        points: (2, n) of one cluster
+
+        return the counterclockwise vertices (2, edge_num) of the box or the convex polygon
+        '''
+
+        try:
+            hull = points[:, ConvexHull(points.T).vertices]
+        except (QhullError, ValueError):
+            # fewer than 3 points or all on one line
+            hull = None
+
+        if self.shape == 'polygon' and hull is not None and hull.shape[1] <= self.max_edge and self.inflate == 0:
+            return hull
+
+        return self.min_area_box(points if hull is None else hull)
+
+    def min_area_box(self, hull):
+
+        '''
+        hull: (2, n) the convex hull or the collinear points
+
+        return the counterclockwise vertices (2, 4) of the minimum area rectangle, widened to min_width and inflated
+        '''
+
+        # one side of the minimum area rectangle is on an edge of the hull
+        if hull.shape[1] > 2:
+            edge = np.roll(hull, -1, axis=1) - hull
+        else:
+            edge = hull[:, -1:] - hull[:, 0:1]
+
+        angle = np.unique(np.mod(np.arctan2(edge[1], edge[0]), np.pi / 2))
+
+        # (k, 2) the directions of the sides and their normals
+        u = np.column_stack((np.cos(angle), np.sin(angle)))
+        v = np.column_stack((-u[:, 1], u[:, 0]))
+
+        proj_u = u @ hull
+        proj_v = v @ hull
+
+        u_min, u_max = np.min(proj_u, axis=1), np.max(proj_u, axis=1)
+        v_min, v_max = np.min(proj_v, axis=1), np.max(proj_v, axis=1)
+
+        k = np.argmin((u_max - u_min) * (v_max - v_min))
+
+        # widen the thin boxes about the middle, then inflate
+        u_pad = max(self.min_width - (u_max[k] - u_min[k]), 0) / 2 + self.inflate
+        v_pad = max(self.min_width - (v_max[k] - v_min[k]), 0) / 2 + self.inflate
+
+        corner_u = np.array([u_min[k] - u_pad, u_max[k] + u_pad, u_max[k] + u_pad, u_min[k] - u_pad])
+        corner_v = np.array([v_min[k] - v_pad, v_min[k] - v_pad, v_max[k] + v_pad, v_max[k] + v_pad])
+
+        return np.outer(u[k], corner_u) + np.outer(v[k], corner_v)
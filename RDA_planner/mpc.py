@@ -5,13 +5,21 @@ Author: Han Ruihua
 '''
 
 import numpy as np
-from math import inf, sqrt, pi, sin, cos, tan
+from math import inf, sqrt
 from RDA_planner.rda_solver import RDA_solver
+from RDA_planner.path import ReferencePath, wraptopi
+from RDA_planner.kinematics import Kinematics
+from concurrent.futures import ThreadPoolExecutor, wait
 import time
 
 from collections import namedtuple
 
-rdaobs = namedtuple('rdaobs', 'A b cone_type center vertex')
+# id: the optional stable ID of the obstacle across the control steps, the dual variables follow it, see RDA_solver
+rdaobs = namedtuple('rdaobs', 'A b cone_type center vertex id', defaults=[None])
+
+# A of the circle obstacle, constant for all the circles and time steps
+circle_A = np.array([ [1, 0], [0, 1], [0, 0] ])
+circle_A.flags.writeable = False
 
 class MPC:
     def __init__(self, car_tuple, ref_path, receding=10, sample_time=0.1, iter_num=4, enable_reverse=False, rda_obstacle=False, obstacle_order=False, **kwargs) -> None:
@@ -26,7 +34,16 @@ class MPC:
             enable_reverse (False): If true, the car-robot can move forward and backward, 
                             and the reference path would be splitted in the change of direction.
             iter_threshold (0.2): The threshold to stop the iteration. 
+            freeze_threshold (None): The residual threshold to skip the subproblems of the converged obstacles (freeze_dis 0.1), see RDA_solver.
             process_num (4): The number of processes to solve the rda problem. Depends on your computer
+            executor (None): The executor of the LamMuZ subproblems, 'serial', 'thread', 'process' or 'shared_memory' (chunk_size), see RDA_solver.
+            dual_backend ('cvxpy'): The solver of the LamMuZ subproblems, 'cvxpy' (ECOS per obstacle) or 'numpy' (all obstacles batched, no process pool, close to but not the same plans as ECOS).
+            time_budget (None): The wall clock budget (seconds) of each control step, the rda iterations stop before exceeding it. None for no deadline.
+            metrics_sink (None), metrics_file (None): function called with / json lines file appended by the record of every control step.
+            su_solver ('ECOS'): The solver of the su subproblem, 'ECOS' or other cvxpy solvers such as 'CLARABEL' and 'OSQP' (su_solver_opts), see RDA_solver.
+            problem_cache_dir (None): The directory to cache the compiled problems, loaded by the later runs with the same horizon, car and weights.
+            problem_cache_size (100): The maximum number of the files in problem_cache_dir, the least recently used ones are removed.
+            solver_pool (None): A SolverPool shared by several robots to solve the subproblems, replacing the own process pool, see BatchPlanner.
             *slack_gain (8): slack gain value for l1 regularization, see paper for details.
             *max_sd (1.0): maximum safety distance.
             *min_sd (0.1): minimum safety distance.
@@ -34,24 +51,42 @@ class MPC:
             wu (1): The weight for the speed difference cost.
             *ro1 (200): The penalty parameter in ADMM.
             ro2 (1): The penalty parameter in ADMM.
+            acceleration (None): 'anderson' to extrapolate the dual variables from the last anderson_memory (3) iterations, see RDA_solver.
+            adaptive_ro (False): Adapt ro1, ro2 in the iterations by balancing the primal and dual residuals, see RDA_solver.
             init_vel ([0,0]): The initial velocity of the car robot.
-            rda_obstacle: if True, the obstacle list can be transported to rda_solver directly, otherwise, it should be converted.
+            rda_obstacle: if True, the obstacle list can be transported to rda_solver directly (e.g. the rdaobs of LidarObstacle), otherwise, it should be converted.
             obstacle_order: if True, the obstacle list is ordered by the distance to the robot, otherwise, it is not ordered.
+            warm_shift (False): Shift the optimal velocities and the dual variables one step forward as the initial values of the next step.
+            kinematics ('ackermann'): The motion model of the robot, 'ackermann' (v, steering angle), 'diff' (v, angular speed) or 'omni' (vx, vy).
+            obstacle_cull (False): if True, drop the obstacles farther than max_sd + cull_margin from the swept path of the robot before solving.
+            cull_margin (4.0): the margin of the culling, the obstacles kept in the last step are dropped beyond max_sd + 2 * cull_margin.
+            cull_num (None): the maximum number of the obstacles kept by the culling, None for no limit.
+            relocalize_dis (None): search the whole path if the search window is farther than it, None to disable.
         '''
         
         self.car_tuple = car_tuple # car_tuple: 'G h cone_type wheelbase max_speed max_acce'
         self.L = car_tuple.wheelbase  # wheel base
+        self.kinematics = Kinematics(kwargs.get('kinematics', 'ackermann'), self.L)
 
         self.receding = receding
         self.dt = sample_time
+        self.time_budget = kwargs.get('time_budget', None)
+        self.relocalize_dis = kwargs.get('relocalize_dis', None)
+
+        self.obstacle_cull = kwargs.get('obstacle_cull', False)
+        self.cull_margin = kwargs.get('cull_margin', 4.0)
+        self.cull_num = kwargs.get('cull_num', None)
+        self.cull_position = np.zeros((0, 2))  # the positions of the obstacles kept by the last culling
+        self.footprint_center, self.footprint_radius = self.footprint_circle(car_tuple.G, car_tuple.h, car_tuple.cone_type)
 
         self.cur_vel_array = kwargs.get('init_vel', np.zeros((2, receding)))
+        self.warm_shift = kwargs.get('warm_shift', False)
 
         self.state = np.zeros((3, 1))
 
         # flag
         self.cur_index = 0
-        self.ref_path = ref_path
+        self.ref_path = ReferencePath(ref_path)
         
         self.rda = RDA_solver(receding, car_tuple, iter_num=iter_num, step_time=sample_time, **kwargs)
 
@@ -64,15 +99,27 @@ class MPC:
             self.curve_list = self.split_path(self.ref_path)
             self.curve_index = 0
 
+        self.async_executor = None  # the background thread of control_async, started by the first submit
+        self.future = None  # the pending solve of submit
+
     def control(self, state, ref_speed=5, obstacle_list=[], obstacle_order=False, **kwargs):
 
         '''
         state: the robot state (x, y, theta) of current time, 3*1 vector 
         ref_speed: the reference speed, scalar value
         obstacle_list: a list of obstacle
-            obstacle: (center, radius, vertex, cone_type, velocity)
+            obstacle: (center, radius, vertex, cone_type, velocity), and an optional id field, the stable ID of the obstacle across the steps
+        time_budget: the wall clock budget (seconds) of this step, default the time_budget of the construction, None for no deadline
         '''
 
+        with self.rda.profiler.cycle():
+            return self.control_cycle(state, ref_speed, obstacle_list, **kwargs)
+
+    def control_cycle(self, state, ref_speed=5, obstacle_list=[], **kwargs):
+
+        start_time = time.time()
+        time_budget = kwargs.pop('time_budget', self.time_budget)
+
         if np.shape(state)[0] > 3:
             state = state[0:3]
 
@@ -80,19 +127,31 @@ class MPC:
 
         if self.enable_reverse:
             cur_ref_path = self.curve_list[self.curve_index]
-            gear_flag = cur_ref_path[0][-1, 0]
+            gear_flag = cur_ref_path.gear(0)
         else:
             cur_ref_path = self.ref_path
             gear_flag = 1
 
-        state_pre_array, ref_traj_list, self.cur_index = self.pre_process(state, cur_ref_path, self.cur_index, ref_speed, **kwargs)
+        with self.rda.profiler.phase('pre_process'):
+            state_pre_array, ref_traj_list, self.cur_index = self.pre_process(state, cur_ref_path, self.cur_index, ref_speed, **kwargs)
 
         if not self.rda_obstacle:
-            rda_obs_list = self.convert_rda_obstacle(obstacle_list, state, self.obstacle_order)
+            with self.rda.profiler.phase('convert_rda_obstacle'):
+                rda_obs_list = self.convert_rda_obstacle(obstacle_list, state, self.obstacle_order)
         else:
             rda_obs_list = obstacle_list
+
+        if self.obstacle_cull:
+            with self.rda.profiler.phase('cull_obstacle'):
+                # the reference reversed, the swept path goes back along it from the end of the nominal trajectory
+                path_array = np.hstack((state_pre_array, np.hstack(ref_traj_list)[0:3, ::-1]))
+                rda_obs_list = self.cull_obstacle(rda_obs_list, path_array)
+
+        if time_budget is not None:
+            # the rest of the budget after the pre process
+            time_budget = time_budget - (time.time() - start_time)
         
-        u_opt_array, info = self.rda.iterative_solve(state_pre_array, self.cur_vel_array, ref_traj_list, gear_flag*ref_speed, rda_obs_list, **kwargs)
+        u_opt_array, info = self.rda.iterative_solve(state_pre_array, self.cur_vel_array, ref_traj_list, gear_flag*ref_speed, rda_obs_list, time_budget=time_budget, **kwargs)
 
         if self.cur_index == len(cur_ref_path) - 1:
 
@@ -113,273 +172,426 @@ class MPC:
         else:
             info['arrive'] = False
         
-        self.cur_vel_array = u_opt_array
+        if self.warm_shift:
+            # the first velocity is applied in this step, the nominal velocities of the next step start from the second one
+            self.cur_vel_array = np.hstack((u_opt_array[:, 1:], u_opt_array[:, -1:]))
+        else:
+            self.cur_vel_array = u_opt_array
 
         return u_opt_array[:, 0:1], info
 
-    def convert_rda_obstacle(self, obstacle_list, state=None, obstacle_order=False):
-        rda_obs_list = []
+    def control_async(self, state, ref_speed=5, obstacle_list=[], **kwargs):
+
+        '''
+        the pipelined control: the command of this step was solved in the background during the last step, from the state predicted 
+        by its command; collect it (wait if it is not ready, solve now at the first call) and submit the solve of the next step
+
+        state, ref_speed, obstacle_list, kwargs: see control, the obstacles of the next step are predicted by their velocities
+
+        return the command of this step and the info of its solve, info['solve_state'] is the state it was solved from
+        '''
+
+        if self.future is None:
+            u, info = self.control(state, ref_speed, obstacle_list, **kwargs)
+            info['solve_state'] = np.array(state[0:3], dtype=float)
+        else:
+            u, info = self.poll(timeout=None)
+
+        self.submit(state, ref_speed, obstacle_list, u=u, **kwargs)
+
+        return u, info
+
+    def submit(self, state, ref_speed=5, obstacle_list=[], u=None, **kwargs):
+
+        '''
+        start the solve of the next step in the background thread while the robot executes the command u, collect it by poll
+
+        state, ref_speed, obstacle_list, kwargs: see control
+        u: the command executed now, 2*1 vector, the solve starts from the state predicted by one step of it 
+            and the obstacles predicted by their velocities; None to solve for the state and obstacles as given
+
+        The MPC (control, update_ref_path, update_parameter) should not be used until the result is collected by poll.
+        '''
+
+        assert self.future is None, 'the last solve is not collected by poll'
+
+        state = np.array(state[0:3], dtype=float)
+
+        if u is not None:
+            state = self.motion_predict_model(state, u, self.L, self.dt)
+
+            if not self.rda_obstacle:
+                obstacle_list = self.predict_obstacle(obstacle_list, self.dt)
+
+        if self.async_executor is None:
+            self.async_executor = ThreadPoolExecutor(max_workers=1)
+
+        self.future = self.async_executor.submit(self.control_solve_state, state, ref_speed, obstacle_list, **kwargs)
+
+        return self.future
+
+    def poll(self, timeout=0):
+
+        '''
+        collect the solve started by submit
+        timeout: the seconds to wait for it, 0 to return at once, None to wait until it is done
+
+        return (u, info) of control, None if it is not done in the timeout or nothing is submitted
+        '''
+
+        if self.future is None:
+            return None
+
+        if not wait([self.future], timeout=timeout).done:
+            return None
+
+        future, self.future = self.future, None
+
+        return future.result()
+
+    def control_solve_state(self, state, ref_speed, obstacle_list, **kwargs):
+        # run in the background thread
+        u, info = self.control(state, ref_speed, obstacle_list, **kwargs)
+        info['solve_state'] = state
+
+        return u, info
+
+    def predict_obstacle(self, obstacle_list, dt):
+        # move the obstacles with velocity (namedtuples of center, vertex, velocity) by the time dt
+
+        predict_list = []
 
         for obs in obstacle_list:
-            if obs.cone_type == 'norm2':
-                A, b = self.convert_inequal_circle(obs.center, obs.radius, obs.velocity)
+            velocity = self.obstacle_velocity(obs)
+
+            if np.linalg.norm(velocity) <= 0.01:
+                predict_list.append(obs)
+                continue
+
+            move = velocity[:, np.newaxis] * dt
+            center, vertex = obs.center, obs.vertex
+
+            if center is not None:
+                center = np.array(center, dtype=float)
+                center[0:2] += np.reshape(move, np.shape(center[0:2]))
+
+            if vertex is not None:
+                vertex = np.array(vertex, dtype=float)
+                vertex[0:2] += move
+
+            predict_list.append(obs._replace(center=center, vertex=vertex))
+
+        return predict_list
+
+    def close(self):
+        # release the background thread and the worker processes of the rda solver
+        if self.async_executor is not None:
+            self.async_executor.shutdown()
+            self.async_executor = None
+            self.future = None
 
-                rda_obs = rdaobs(A, b, obs.cone_type, obs.center, None)
-                rda_obs_list.append(rda_obs)
+        self.rda.close()
 
+    def __enter__(self):
+        self.rda.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def convert_rda_obstacle(self, obstacle_list, state=None, obstacle_order=False):
+
+        # convert the obstacles of the same type (cone type, edge number) together
+        rda_obs_list = [None] * len(obstacle_list)
+        group_dict = {}
+
+        for index, obs in enumerate(obstacle_list):
+            if obs.cone_type == 'norm2':
+                group_dict.setdefault(('norm2', 3), []).append(index)
             elif obs.cone_type == 'Rpositive':
-                A, b = self.convert_inequal_polygon(obs.vertex, obs.velocity)
+                group_dict.setdefault(('Rpositive', obs.vertex.shape[1]), []).append(index)
 
-                rda_obs = rdaobs(A, b, obs.cone_type, None, obs.vertex)
-                rda_obs_list.append(rda_obs)
-            
-        
+        for (cone_type, edge_num), index_list in group_dict.items():
 
-        if obstacle_order:
-            rda_obs_list.sort(key=self.rda_obs_distance)
+            group = [obstacle_list[index] for index in index_list]
+            velocity = np.array([self.obstacle_velocity(obs) for obs in group])
 
+            if cone_type == 'norm2':
+                center = np.array([np.reshape(obs.center[0:2], 2) for obs in group])
+                radius = np.array([obs.radius for obs in group], dtype=float)
+                A, b = self.convert_inequal_circle_batch(center, radius, velocity)
+            else:
+                vertex = np.array([obs.vertex[0:2] for obs in group], dtype=float)
+                A, b = self.convert_inequal_polygon_batch(vertex, velocity)
 
-        return rda_obs_list
+            # the static obstacles keep one A, b for all the time steps 
+            moving = np.linalg.norm(velocity, axis=1) > 0.01
 
-    def rda_obs_distance(self, rda_obs):
+            for k, (index, obs) in enumerate(zip(index_list, group)):
+                obs_A, obs_b = (A[k], b[k]) if moving[k] else (A[k, 0], b[k, 0])
 
-        if rda_obs.cone_type == 'norm2':
-            distance= MPC.distance(self.state[0:2], rda_obs.center[0:2])
-        
-        elif rda_obs.cone_type == 'Rpositive':
-            distance = np.min(np.linalg.norm(self.state[0:2]-rda_obs.vertex, axis=0))
+                if cone_type == 'norm2':
+                    rda_obs_list[index] = rdaobs(obs_A, obs_b, obs.cone_type, obs.center, None, getattr(obs, 'id', None))
+                else:
+                    rda_obs_list[index] = rdaobs(obs_A, obs_b, obs.cone_type, None, obs.vertex, getattr(obs, 'id', None))
 
-        return distance
-            
+        rda_obs_list = [rda_obs for rda_obs in rda_obs_list if rda_obs is not None]
 
-    def update_ref_path(self, ref_path):
-        self.ref_path = ref_path
-        self.cur_index = 0
+        if obstacle_order:
+            rda_obs_list.sort(key=self.rda_obs_distance)
 
-        if self.enable_reverse:
-            self.curve_list = self.split_path(self.ref_path)
-            self.curve_index = 0
+        return rda_obs_list
 
-    def update_parameter(self, **kwargs):
-        self.rda.assign_adjust_parameter(**kwargs)
+    @staticmethod
+    def obstacle_velocity(obs):
+        # the velocity (2, ) of the obstacle, None or a scalar (e.g. velocity=0) is static
 
-    def split_path(self, ref_path):
-        # split path by gear
+        velocity = getattr(obs, 'velocity', None)
 
-        flag = ref_path[0][-1, 0]
-        curve_list = []
+        if velocity is None or np.size(velocity) < 2:
+            return np.zeros(2)
 
-        start_index = 0
-        end_index = -1
+        return np.asarray(velocity, dtype=float).reshape(-1)[0:2]
 
-        for index, point in enumerate(ref_path):
-            if point[-1, 0] != flag:
+    def convert_inequal_circle_batch(self, center, radius, velocity):
 
-                end_index = index
-                curve_list.append(ref_path[start_index:end_index])
-                start_index = end_index
-                flag = point[-1, 0]
+        '''
+        center: (K, 2), radius: (K,), velocity: (K, 2) of K circles
 
-        curve_list.append(ref_path[end_index:])
+        return A: (K, receding+1, 3, 2), a broadcast view of circle_A; b: (K, receding+1, 3, 1)
+        '''
 
-        return curve_list
+        K = center.shape[0]
+        times = np.arange(self.receding+1) * self.dt
 
-    def pre_process(self, state, ref_path, cur_index, ref_speed, **kwargs):
-        # find closest points 
-        min_dis, min_index = self.closest_point(state, ref_path, cur_index, **kwargs)
+        A = np.broadcast_to(circle_A, (K, self.receding+1, 3, 2))
 
-        # predict the state list and find the reference points list
-        cur_state = state
-        traj_point = ref_path[min_index]
+        b = np.empty((K, self.receding+1, 3, 1))
+        b[:, :, 0:2, 0] = center[:, np.newaxis, :] + velocity[:, np.newaxis, :] * times[np.newaxis, :, np.newaxis]
+        b[:, :, 2, 0] = -radius[:, np.newaxis]
 
-        ref_traj_list = [ traj_point ]
-        state_pre_list = [cur_state]
+        return A, b
 
-        for i in range(self.receding):
-            cur_state = self.motion_predict_model(cur_state, self.cur_vel_array[:, i:i+1], self.L, self.dt)
-            state_pre_list.append(cur_state)
+    def convert_inequal_polygon_batch(self, vertex, velocity):
 
-            move_len = ref_speed * self.dt
-            traj_point, cur_index = self.inter_point(traj_point, ref_path, cur_index, move_len)
+        '''
+        vertex: (K, 2, E), velocity: (K, 2) of K polygons with E edges
 
-            diff = traj_point[2, 0] - cur_state[2, 0]
-            traj_point[2, 0] = cur_state[2, 0] + MPC.wraptopi(diff)
-            ref_traj_list.append( traj_point )
+        return A: (K, receding+1, E, 2), a broadcast view, the translation does not change A; b: (K, receding+1, E, 1)
+        '''
 
-        state_pre_array = np.hstack(state_pre_list)
+        times = np.arange(self.receding+1) * self.dt
 
-        return state_pre_array, ref_traj_list, min_index
+        A, b = self.gen_inequal_batch(vertex)
 
-    def motion_predict_model(self, car_state, vel, wheel_base, sample_time):
+        # A @ (vertex + v t) = b + A @ v t
+        move = velocity[:, np.newaxis, :] * times[np.newaxis, :, np.newaxis]
+        b_array = b[:, np.newaxis, :] + np.einsum('ked,ktd->kte', A, move)
 
-        assert car_state.shape == (3, 1) and vel.shape == (2, 1) 
+        return np.broadcast_to(A[:, np.newaxis], (A.shape[0], self.receding+1) + A.shape[1:]), b_array[..., np.newaxis]
 
-        phi = car_state[2, 0]
+    @staticmethod
+    def gen_inequal_batch(vertex):
+        # vertex: (K, 2, E), counterclockwise; return A: (K, E, 2), b: (K, E), A @ p <= b inside
 
-        v = vel[0, 0]
-        psi = vel[1, 0]
+        diff = np.roll(vertex, -1, axis=2) - vertex
 
-        ds = np.array([ [v*cos(phi)], [v*sin(phi)], [ v*tan(psi) / wheel_base ] ])  
-    
-        next_state = car_state + ds * sample_time
+        A = np.stack((diff[:, 1], -diff[:, 0]), axis=-1)
+        b = np.einsum('ked,kde->ke', A, vertex)
 
-        return next_state
+        return A, b
 
-    def closest_point(self, state, ref_path, start_ind, threshold=0.1, ind_range=10, **kwargs):
+    def rda_obs_distance(self, rda_obs):
+
+        if rda_obs.cone_type == 'norm2':
+            distance= MPC.distance(self.state[0:2], rda_obs.center[0:2])
         
-        min_dis = inf
-        min_ind = start_ind
-    
-        for i, waypoint in enumerate(ref_path[start_ind:start_ind+ind_range]):
-            dis = MPC.distance(state[0:2], waypoint[0:2])
-            if dis < min_dis:
-                min_dis = dis
-                min_ind = start_ind + i
-                if dis < threshold: break
-                    
-        return min_dis, min_ind
+        elif rda_obs.cone_type == 'Rpositive':
+            distance = np.min(np.linalg.norm(self.state[0:2]-rda_obs.vertex, axis=0))
 
-    def inter_point(self, traj_point, ref_path, cur_ind, length):
+        return distance
+            
 
-        circle = np.squeeze(traj_point[0:2])
-        new_traj_point = np.copy(traj_point)
+    def cull_obstacle(self, rda_obs_list, path_array):
 
-        while True:
+        '''
+        drop the obstacles farther than max_sd + cull_margin from the swept path, rank the rest by the distance
+        path_array: (3, N), the poses of the swept path
 
-            if cur_ind+1 > len(ref_path) - 1:
-                
-                end_point = ref_path[-1]
-                end_point[2] = MPC.wraptopi(end_point[2])
+        The distance is a lower bound: from the bounding circles of the obstacle at the time steps to the segments swept by
+        the bounding circle of the robot footprint. The obstacles without the geometry (no vertex) are kept first.
+        An obstacle kept by the last culling is dropped only beyond max_sd + 2 * cull_margin, so that the obstacles near the 
+        threshold do not enter and leave the problem (and restart their dual variables) in turn.
+        '''
 
-                return end_point, cur_ind
-            
-            cur_point = ref_path[cur_ind]
-            next_point = ref_path[cur_ind + 1]
+        # the footprint center in the world frame along the path
+        cos_phi, sin_phi = np.cos(path_array[2]), np.sin(path_array[2])
+        center = self.footprint_center
+        path_point = path_array[0:2].T + np.column_stack((cos_phi*center[0] - sin_phi*center[1], sin_phi*center[0] + cos_phi*center[1]))
+
+        bound_list = []
+        position_list = []
 
-            segment = [np.squeeze(cur_point[0:2]) , np.squeeze(next_point[0:2])]
-            int_point = self.range_cir_seg(circle, length, segment)
+        for rda_obs in rda_obs_list:
+            circle = self.obstacle_circle(rda_obs)
 
-            if int_point is None:
-                cur_ind = cur_ind + 1
+            if circle is None:
+                bound_list.append(-inf)
+                position_list.append(None)
             else:
-                diff = MPC.wraptopi(next_point[2, 0] - cur_point[2, 0])
-                theta = MPC.wraptopi(cur_point[2, 0] + diff / 2 )
-                new_traj_point[0:2, 0] = int_point[:]
-                new_traj_point[2, 0] = theta
-                
-                return new_traj_point, cur_ind
-
-    def range_cir_seg(self, circle, r, segment):
-        
-        assert circle.shape == (2,) and segment[0].shape == (2,) and segment[1].shape == (2,)
+                obs_center, obs_radius = circle
+                bound_list.append(np.min(self.point_polyline_distance(obs_center, path_point)) - obs_radius - self.footprint_radius)
+                position_list.append(obs_center[0])
 
-        sp = segment[0]
-        ep = segment[1]
+        threshold = self.rda.para_max_sd.value + self.cull_margin
+        keep_list = []
 
-        d = ep - sp
+        for i in np.argsort(bound_list, kind='stable'):
+            position = position_list[i]
+            kept = position is not None and len(self.cull_position) != 0 and np.min(np.linalg.norm(self.cull_position - position, axis=1)) <= self.rda.match_dis
 
-        if np.linalg.norm(d) == 0:
-            return None
+            if bound_list[i] <= threshold or (kept and bound_list[i] <= threshold + self.cull_margin):
+                keep_list.append(i)
+
+        keep_list = keep_list[0:self.cull_num]
+        self.cull_position = np.array([position_list[i] for i in keep_list if position_list[i] is not None]).reshape(-1, 2)
 
-        # if d.all() == 0:
-        #     return None
+        return [rda_obs_list[i] for i in keep_list]
 
-        f = sp - circle
+    @staticmethod
+    def obstacle_circle(rda_obs):
+        # the bounding circles of the obstacle at the time steps, centers (n, 2) and the radius, None if unknown
 
-        a = d @ d
-        b = 2* f@d
-        c = f@f - r ** 2
+        b = np.asarray(rda_obs.b, dtype=float)
 
-        discriminant = b**2 - 4 * a * c
+        if rda_obs.cone_type == 'norm2':
+            # b: [center; -radius], see convert_inequal_circle_batch
+            b = b.reshape(-1, 3)
+            return b[:, 0:2], np.max(-b[:, 2])
 
-        if discriminant < 0:
+        if rda_obs.vertex is None:
             return None
-        else:
-            
-            t1 = (-b - sqrt(discriminant)) / (2*a)
-            t2 = (-b + sqrt(discriminant)) / (2*a)
-  
-            if t2 >= 0 and t2 <=1:
-                int_point = sp + t2 * d
-                return int_point
 
-            return None
+        vertex = np.asarray(rda_obs.vertex, dtype=float)[0:2]
+        centroid = np.mean(vertex, axis=1)
+        radius = np.max(np.linalg.norm(vertex - centroid[:, np.newaxis], axis=0))
+
+        if b.ndim == 3:
+            # moving, the translation d of the time steps by A @ d = b_t - b_0
+            A = np.asarray(rda_obs.A[0], dtype=float)
+            move = np.linalg.lstsq(A, (b[:, :, 0] - b[0, :, 0]).T, rcond=None)[0].T
+            return centroid + move, radius
+
+        return centroid[np.newaxis], radius
 
     @staticmethod
-    def distance(point1, point2):
-        return sqrt( (point1[0, 0] - point2[0, 0])**2 + (point1[1, 0] - point2[1, 0])**2 )
+    def point_polyline_distance(point, polyline):
+        # the distance from each point (n, 2) to the polyline (N, 2), (n, )
+
+        start, diff = polyline[:-1], np.diff(polyline, axis=0)
+
+        if len(diff) == 0:
+            return np.linalg.norm(point - polyline[0], axis=1)
+
+        # (n, N-1) projection ratio on the segments
+        relative = point[:, np.newaxis] - start[np.newaxis]
+        ratio = np.clip(np.einsum('nsd,sd->ns', relative, diff) / np.maximum(np.sum(diff**2, axis=1), 1e-12), 0, 1)
+
+        distance = np.linalg.norm(relative - ratio[:, :, np.newaxis] * diff[np.newaxis], axis=2)
+
+        return np.min(distance, axis=1)
 
     @staticmethod
-    def wraptopi(radian):
-        while radian > pi:
-            radian = radian - 2 * pi
-        while radian < -pi:
-            radian = radian + 2 * pi
+    def footprint_circle(G, h, cone_type):
+        # the bounding circle of the robot footprint {p | h - G p in cone} in the robot frame, center (2, ), radius
 
-        return radian
+        h = np.reshape(h, -1)
 
+        if cone_type == 'norm2':
+            # || h[:-1] - G[:-1] p || <= h[-1]
+            center = np.linalg.lstsq(G[:-1], h[:-1], rcond=None)[0]
+            return center, h[-1] / np.min(np.linalg.svd(G[:-1], compute_uv=False))
 
-    def convert_inequal_circle(self, center, radius, velocity=np.zeros((2, 1))):
-        # center: 2*1
-        # radius: scalar
-        
-        if np.linalg.norm(velocity) <= 0.01:
-            A = np.array([ [1, 0], [0, 1], [0, 0] ])
-            b = np.row_stack((center, -radius* np.ones((1,1))))
-        else:
-            A = []
-            b = []
-            for t in range(self.receding+1):
-                next = center + velocity * (t * self.dt)
-                temp_A = np.array([ [1, 0], [0, 1], [0, 0] ])
-                temp_b = np.row_stack((next, -radius* np.ones((1,1))))
+        # the vertices are the feasible intersections of the edge pairs
+        vertex_list = []
 
-                A.append(temp_A)
-                b.append(temp_b)
+        for i in range(len(h)):
+            for j in range(i+1, len(h)):
+                pair = G[[i, j]]
 
-        return A, b
-        
+                if abs(np.linalg.det(pair)) > 1e-9:
+                    vertex = np.linalg.solve(pair, h[[i, j]])
 
-    def convert_inequal_polygon(self, vertex, velocity=np.zeros((2, 1))):
-        # vertex: 2*4 matrix
+                    if np.all(G @ vertex <= h + 1e-9):
+                        vertex_list.append(vertex)
 
-        if np.linalg.norm(velocity) <= 0.01:
-            A, b = self.gen_inequal_global(vertex)
-        else:
-            A, b = [], []
+        vertex = np.array(vertex_list)
+        center = np.mean(vertex, axis=0)
 
-            for t in range(self.receding+1): 
-                next = vertex + velocity * (t * self.dt)
-                temp_A, temp_b = self.gen_inequal_global(next)
-                A.append(temp_A)
-                b.append(temp_b)
+        return center, np.max(np.linalg.norm(vertex - center, axis=1))
 
-        return A, b
+    def update_ref_path(self, ref_path):
+        self.ref_path = ReferencePath(ref_path)
+        self.cur_index = 0
 
-    def gen_inequal_global(self, vertex):
+        if self.enable_reverse:
+            self.curve_list = self.split_path(self.ref_path)
+            self.curve_index = 0
 
-        temp_vertex = np.c_[vertex, vertex[0:2, 0]]   
+    def update_parameter(self, **kwargs):
+        self.rda.assign_adjust_parameter(**kwargs)
 
-        point_num = vertex.shape[1]
-        
-        A = np.zeros((point_num, 2))
-        b = np.zeros((point_num, 1))
+    def split_path(self, ref_path):
+        # split path by gear
+        return ReferencePath(ref_path).split()
 
-        for i in range(point_num):
-            cur_p = temp_vertex[0:2, i]
-            next_p = temp_vertex[0:2, i+1]
+    def pre_process(self, state, ref_path, cur_index, ref_speed, **kwargs):
 
-            diff = next_p - cur_p
+        if not isinstance(ref_path, ReferencePath):
+            ref_path = ReferencePath(ref_path)
 
-            ax = diff[1]
-            by = -diff[0]
-            c = ax * cur_p[0] + by * cur_p[1]
+        # find closest points 
+        min_dis, min_index = self.closest_point(state, ref_path, cur_index, **kwargs)
 
-            A[i, 0] = ax
-            A[i, 1] = by
-            b[i, 0] = c
+        # predict the state list and find the reference points list
+        state_pre_array = self.motion_predict_array(state, self.cur_vel_array, self.L, self.dt)
+
+        move_len = ref_speed * self.dt
+        ref_array = ref_path.sample(min_index, move_len, self.receding+1)
+
+        diff = ref_array[2] - state_pre_array[2]
+        ref_array[2] = state_pre_array[2] + wraptopi(diff)
 
-        return A, b 
+        ref_traj_list = [ ref_array[:, i:i+1] for i in range(self.receding+1) ]
 
+        return state_pre_array, ref_traj_list, min_index
+
+    def motion_predict_array(self, car_state, vel_array, wheel_base, sample_time):
+        # the states of motion_predict_model for all the velocities in the horizon, 3*(receding+1)
+        return self.kinematics.rollout(car_state, vel_array, sample_time, wheel_base)
 
+    def motion_predict_model(self, car_state, vel, wheel_base, sample_time):
+
+        assert car_state.shape == (3, 1) and vel.shape == (2, 1) 
+
+        return self.kinematics.step(car_state, vel, sample_time, wheel_base)
+
+    def closest_point(self, state, ref_path, start_ind, threshold=0.1, ind_range=10, **kwargs):
 
+        if not isinstance(ref_path, ReferencePath):
+            ref_path = ReferencePath(ref_path)
+
+        min_dis, min_ind = ref_path.closest_point(state[0:2, 0], start_ind, threshold, ind_range)
+
+        # the robot is pushed off the path or the index falls behind, re-localize on the whole path
+        if self.relocalize_dis is not None and min_dis > self.relocalize_dis:
+            dis, ind = ref_path.nearest_point(state[0:2, 0])
+
+            if dis < min_dis:
+                min_dis, min_ind = dis, ind
+
+        return min_dis, min_ind
+
+    @staticmethod
+    def distance(point1, point2):
+        return sqrt( (point1[0, 0] - point2[0, 0])**2 + (point1[1, 0] - point2[1, 0])**2 )
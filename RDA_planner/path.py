@@ -0,0 +1,178 @@
+'''
+Reference path
+The waypoints in one contiguous array, with the arc length interpolation for the receding horizon
+'''
+
+import numpy as np
+from math import pi
+from scipy.spatial import cKDTree
+
+
+class ReferencePath:
+    def __init__(self, points, gear=1) -> None:
+
+        '''
+        points: the waypoints, one of
+            (N, 3) or (N, 4) array: x, y, theta (, gear) of each row;
+            list of (3, 1) or (4, 1) arrays: the legacy format of the examples, a column for each waypoint;
+            (N, 3, 1) or (N, 4, 1) array: the legacy format saved by np.save;
+            ReferencePath: shared, not copied.
+        gear (1): the gear of the waypoints without the gear column, 1 forward, -1 backward
+
+        The array is read only, the segment lengths, the arc length, the segment headings and the gear change indices are computed once.
+        '''
+
+        if isinstance(points, ReferencePath):
+            array = points.array
+        else:
+            array = np.asarray(points, dtype=float)
+
+            if array.ndim == 3:
+                array = array[:, :, 0]
+
+            if array.shape[1] == 3:
+                array = np.hstack((array, gear * np.ones((array.shape[0], 1))))
+
+            # a view, the flag of the input array is not changed
+            array = np.ascontiguousarray(array).view()
+
+        array.flags.writeable = False
+        self.array = array
+
+        self.seg_diff = np.diff(array[:, 0:2], axis=0)
+        self.seg_len = np.linalg.norm(self.seg_diff, axis=1)
+        self.arc_len = np.concatenate(([0], np.cumsum(self.seg_len)))
+
+        # the heading of a segment is the middle of its two ends
+        heading = np.unwrap(array[:, 2])
+        self.seg_heading = (heading[:-1] + heading[1:]) / 2
+
+        self.gear_change_index = np.flatnonzero(np.diff(array[:, 3]) != 0) + 1
+
+        self.kd_tree = None  # built by the first global query
+
+    @classmethod
+    def load(cls, file, mmap=True, gear=1):
+        # load a .npy file of the (N, 3/4) array or the legacy (N, 3/4, 1) array, no pickle
+        # an (N, 4) file stays memory mapped, the others are copied to add the gear column
+        return cls(np.load(file, mmap_mode='r' if mmap else None, allow_pickle=False), gear)
+
+    def save(self, file):
+        np.save(file, self.array)
+
+    def __len__(self):
+        return self.array.shape[0]
+
+    def __getitem__(self, index):
+        # a waypoint as the legacy (4, 1) column, or a ReferencePath of the slice
+
+        if isinstance(index, slice):
+            return ReferencePath(self.array[index])
+
+        return self.array[index][:, np.newaxis]
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+    def to_list(self):
+        # the legacy list of (4, 1) columns, e.g. to draw the path
+        return [np.array(point[:, np.newaxis]) for point in self.array]
+
+    def split(self):
+        # split the path at the gear changes, the sub paths share the array
+        bound_list = [0] + list(self.gear_change_index) + [len(self)]
+        return [self[start:end] for start, end in zip(bound_list[:-1], bound_list[1:])]
+
+    def gear(self, index=0):
+        return self.array[index, 3]
+
+    def closest_point(self, point, start_index, threshold=0.1, index_range=10):
+
+        '''
+        the closest waypoint to the point in [start_index, start_index + index_range),
+        the first waypoint closer than threshold if any, the same as the loop of MPC.closest_point
+
+        return distance, index
+        '''
+
+        window = self.array[start_index:start_index+index_range, 0:2]
+
+        if window.shape[0] == 0:
+            return np.inf, start_index
+
+        dis = np.hypot(window[:, 0] - point[0], window[:, 1] - point[1])
+        near = np.flatnonzero(dis < threshold)
+        index = near[0] if len(near) > 0 else np.argmin(dis)
+
+        return dis[index], start_index + index
+
+    def nearest_segment(self, point, candidate_num=8):
+
+        '''
+        the segment closest to the point over the whole path, O(log N) by the KD-tree of the waypoints:
+        the segments of the candidate_num nearest waypoints are checked exactly.
+
+        return distance, segment index, ratio of the projection on the segment [0, 1]
+        '''
+
+        if self.kd_tree is None:
+            self.kd_tree = cKDTree(self.array[:, 0:2])
+
+        if len(self) == 1:
+            return np.hypot(*(self.array[0, 0:2] - point)), 0, 0
+
+        _, near_index = self.kd_tree.query(point, k=min(candidate_num, len(self)))
+        near_index = np.atleast_1d(near_index)
+
+        # the segments before and after the near waypoints
+        seg_index = np.unique(np.clip(np.concatenate((near_index - 1, near_index)), 0, len(self.seg_len) - 1))
+
+        start = self.array[seg_index, 0:2]
+        ratio = np.einsum('ij,ij->i', point - start, self.seg_diff[seg_index]) / np.maximum(self.seg_len[seg_index]**2, 1e-12)
+        ratio = np.clip(ratio, 0, 1)
+
+        dis = np.linalg.norm(start + ratio[:, np.newaxis] * self.seg_diff[seg_index] - point, axis=1)
+        n = np.argmin(dis)
+
+        return dis[n], seg_index[n], ratio[n]
+
+    def nearest_point(self, point):
+        # the waypoint of the nearest segment: the start or the end, whichever the projection is closer to
+
+        dis, seg_index, ratio = self.nearest_segment(point)
+        index = seg_index + 1 if ratio > 0.5 else seg_index
+
+        return dis, min(index, len(self) - 1)
+
+    def sample(self, start_index, step, num):
+
+        '''
+        start_index: the index of the waypoint of the first sample
+        step: the arc length between the samples
+        num: the number of the samples
+
+        return the (4, num) array of the samples, the samples beyond the end are the end point
+        '''
+
+        if len(self) == 1:
+            return np.repeat(self.array.T, num, axis=1)
+
+        arc = np.clip(self.arc_len[start_index] + step * np.arange(num), 0, self.arc_len[-1])
+
+        index = np.clip(np.searchsorted(self.arc_len, arc, side='right') - 1, 0, len(self.seg_len) - 1)
+        ratio = np.clip((arc - self.arc_len[index]) / np.maximum(self.seg_len[index], 1e-12), 0, 1)
+
+        # the gear is the one of the segment start
+        sample_array = self.array[index].T.copy()
+        sample_array[0:2] = sample_array[0:2] + ratio * self.seg_diff[index].T
+        sample_array[2] = self.seg_heading[index]
+
+        # the first sample is the waypoint itself
+        sample_array[:, 0] = self.array[start_index]
+
+        return sample_array
+
+
+def wraptopi(radian):
+    # the angles to [-pi, pi), vectorized
+    return (radian + pi) % (2 * pi) - pi
@@ -0,0 +1,165 @@
+'''
+Problem cache
+The compiled data of the DPP problems stored on disk, keyed by the problem definition, loaded by the later processes instead of compiling
+'''
+
+import os
+import glob
+import time
+import pickle
+import hashlib
+import tempfile
+import threading
+import cvxpy as cp
+
+# the ids of the cvxpy objects are not thread safe, the definition and the compilation of the problems hold the lock (e.g. BatchPlanner)
+problem_lock = threading.RLock()
+
+# the digest of the package source, computed once per process
+package_digest = None
+
+
+def package_source_digest():
+    # the sha1 of all the modules of the package, any change of the problem definition (rda_solver, kinematics, compiled_conic ...) changes it
+
+    global package_digest
+
+    if package_digest is None:
+        digest = hashlib.sha1()
+
+        for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py'))):
+            with open(path, 'rb') as file:
+                digest.update(os.path.basename(path).encode())
+                digest.update(file.read())
+
+        package_digest = digest.hexdigest()
+
+    return package_digest
+
+
+class ProblemCache:
+    def __init__(self, cache_dir, key, max_entries=100) -> None:
+
+        '''
+        cache_dir: the directory of the cache files, created if not existing
+        key: the description of everything the problems depend on (e.g. horizon, car geometry, weights), any value with a stable repr.
+            The version of cvxpy and the digest of the package source are added to the key.
+        max_entries: the maximum number of the cache files in the directory, the least recently used ones are removed by save; None for no limit.
+
+        One pickle file per problem name, written atomically, so the processes sharing the directory never read a partial file.
+        The entries of an old key (e.g. another horizon or an edited source) are never loaded again, they age out by max_entries.
+        '''
+
+        self.cache_dir = cache_dir
+        self.key = repr((key, cp.__version__, package_source_digest()))
+        self.max_entries = max_entries
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, name):
+        digest = hashlib.sha1((self.key + repr(name)).encode()).hexdigest()
+        return os.path.join(self.cache_dir, 'rda_' + digest[:20] + '.pkl')
+
+    def load(self, name):
+        # the cached entry, None if not cached or not readable (e.g. written by another version)
+
+        try:
+            with open(self.path(name), 'rb') as file:
+                entry = pickle.load(file)
+
+            # the modification time orders the entries by their last use for prune
+            os.utime(self.path(name))
+
+            return entry
+
+        except Exception:
+            return None
+
+    def save(self, name, entry):
+
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            file_id, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(file_id, 'wb') as file:
+                pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+            os.replace(temp_path, self.path(name))
+
+        except Exception as e:
+            print('Problem cache not saved:', e)
+
+        self.prune()
+
+    def prune(self, temp_age=3600):
+
+        '''
+        remove the least recently used cache files beyond max_entries, and the temporary files older than temp_age seconds (left by a killed writer)
+        '''
+
+        try:
+            for path in glob.glob(os.path.join(self.cache_dir, '*.tmp')):
+                if time.time() - os.path.getmtime(path) > temp_age:
+                    os.remove(path)
+
+            if self.max_entries is None:
+                return
+
+            path_list = sorted(glob.glob(os.path.join(self.cache_dir, 'rda_*.pkl')), key=os.path.getmtime)
+
+            for path in path_list[:max(len(path_list) - self.max_entries, 0)]:
+                os.remove(path)
+
+        except OSError:
+            # removed by another process sharing the directory
+            pass
+
+
+def compile_problem(build, parameters, variables, solver, cache=None, name=None):
+
+    '''
+    the parametrized data of a DPP problem for the solver, loaded from the cache or compiled by cvxpy and saved to the cache
+
+    build: function returning the cvxpy problem, called only if the problem is not cached, None to load from the cache only
+    parameters: the parameters the problem may use, in a fixed order; the problem data is mapped to them by the order,
+        since the cvxpy ids differ between the processes
+    variables: the variables to recover from the solution, in a fixed order, without attributes (nonneg etc.)
+    solver: the cvxpy solver name of the data, e.g. cp.ECOS, cp.OSQP
+    cache: ProblemCache or None
+    name: the name of the problem in the cache
+
+    return the dict of
+        param_prog: the cvxpy parametrized program, apply_parameters / split_solution by the ids below;
+        param_ids: the ids of the parameters in param_prog;
+        var_ids: the ids of the variables in param_prog;
+        n_eq: the number of the equality rows of the QP solvers, None for the conic solvers.
+    '''
+
+    if cache is not None:
+        entry = cache.load(name)
+
+        if entry is not None and (build is None or (len(entry['param_ids']) == len(parameters) and len(entry['var_ids']) == len(variables))):
+            return entry
+
+    assert build is not None, 'the problem is not in the cache: ' + repr(name)
+
+    with problem_lock:
+        prob = build()
+        data, _, _ = prob.get_problem_data(solver=solver, enforce_dpp=True)
+        param_prog = data[cp.settings.PARAM_PROB]
+
+        param_ids = [p.id for p in parameters]
+        var_ids = [v.id for v in variables]
+
+        missing = set(p.id for p in prob.parameters()) - set(param_ids)
+        assert not missing, 'parameters of the problem are not in the parameter list'
+
+        # variables with attributes (nonneg etc.) are replaced in the compiled problem and can not be recovered by id
+        missing = set(var_ids) - set(param_prog.var_id_to_col)
+        assert not missing, 'variables with attributes are not supported'
+
+    entry = {'param_prog': param_prog, 'param_ids': param_ids, 'var_ids': var_ids, 'n_eq': data.get('n_eq')}
+
+    if cache is not None:
+        cache.save(name, entry)
+
+    return entry
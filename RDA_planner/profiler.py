@@ -0,0 +1,103 @@
+'''
+Profiler
+Per-phase timing and iteration metrics of the planner, one record per control cycle
+'''
+
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class Profiler:
+    def __init__(self, sink=None, file=None) -> None:
+
+        '''
+        sink: function called with the record of every cycle, sink(record)
+        file: path of a json lines file, one compact record per cycle is appended
+
+        The profiler is disabled if neither is given, then phase() and cycle() are null contexts.
+
+        record: {'timing': {phase name: seconds}, 'iteration_num': int, 'resi_dual_list': [], 'resi_pri_list': [], ...}
+        '''
+
+        self.sink = sink
+        self.file = file
+        self.enabled = sink is not None or file is not None
+
+        self.record = {'timing': {}}
+        self.depth = 0
+        self.file_handle = None
+
+    def phase(self, name):
+        # accumulate the time of the phase into the current record
+
+        if not self.enabled:
+            return nullcontext()
+
+        return self.timer(name)
+
+    @contextmanager
+    def timer(self, name):
+
+        start_time = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            timing = self.record['timing']
+            timing[name] = timing.get(name, 0) + time.perf_counter() - start_time
+
+    def cycle(self):
+        # the nested cycles (MPC.control -> RDA_solver.iterative_solve) are counted as one
+
+        if not self.enabled:
+            return nullcontext()
+
+        return self.cycle_context()
+
+    @contextmanager
+    def cycle_context(self):
+
+        if self.depth == 0:
+            self.record = {'timing': {}}
+
+        self.depth += 1
+        start_time = time.perf_counter()
+
+        try:
+            yield self.record
+        finally:
+            self.depth -= 1
+
+            if self.depth == 0:
+                self.record['timing']['cycle'] = time.perf_counter() - start_time
+                self.emit(self.record)
+
+    def update(self, **kwargs):
+        # add the metrics to the current record
+        if self.enabled:
+            self.record.update(kwargs)
+
+    def emit(self, record):
+
+        if self.sink is not None:
+            self.sink(record)
+
+        if self.file is not None:
+            if self.file_handle is None:
+                self.file_handle = open(self.file, 'a')
+
+            self.file_handle.write(json.dumps(record, separators=(',', ':'), default=float) + '\n')
+            self.file_handle.flush()
+
+    def close(self):
+
+        if self.file_handle is not None:
+            self.file_handle.close()
+            self.file_handle = None
+
+    def __getstate__(self):
+        # the file is written by the owner process only
+        state = self.__dict__.copy()
+        state['file_handle'] = None
+        return state
@@ -6,37 +6,92 @@ Author: Han Ruihua
 
 import cvxpy as cp
 import numpy as np
-from pathos.multiprocessing import Pool
-from math import sin, cos, tan, inf
+from math import inf
 import time
-from collections import namedtuple
+from collections import namedtuple, deque, OrderedDict
+from RDA_planner.dual_solver import DualSolverNumpy
+from RDA_planner.compiled_conic import CompiledConic
+from RDA_planner.problem_cache import ProblemCache, problem_lock
+from RDA_planner.worker_pool import WorkerPool
+from RDA_planner.executor import executor_dict
+from RDA_planner.profiler import Profiler
+from RDA_planner.kinematics import Kinematics
+from RDA_planner.acceleration import AndersonAcceleration
 
 # para_obstacle = namedtuple('obstacle', ['At', 'bt', 'cone_type'])
-pool = None
-
 class RDA_solver:
     def __init__(self, receding, car_tuple, obstacle_template_list=[{'edge_num': 3, 'obstacle_num': 10, 'cone_type': 'norm2'}, {'edge_num': 4, 'obstacle_num': 1, 'cone_type': 'Rpositive'}], 
-                        iter_num=2, step_time=0.1, iter_threshold=0.2, process_num=4, **kwargs) -> None:
+                        iter_num=2, step_time=0.1, iter_threshold=0.2, process_num=4, dual_backend='cvxpy', su_solver='ECOS', **kwargs) -> None:
 
         '''
         obstacle_template_dict: the template for the obstacles to construct the problem, 
             edge_num: number of convex obstacle edges; 
             obstacle_num: number of convex obstacles; 
             cone_type: Rpositive, norm2
+            The slots of an (edge_num, cone_type) are added when the obstacles are more than them, the slots without obstacle are disabled.
+        dual_backend ('cvxpy'): the LamMuZ solver, 'cvxpy' (one ECOS problem per obstacle by the executor) or 'numpy' (all obstacles batched, DualSolverNumpy).
+            The numpy backend returns the analytic center of the optimal set, not the ECOS point, so the plans are close to but not the same as cvxpy.
+        dual_iter_num (20): the number of the Newton steps of the numpy backend.
+        su_solver ('ECOS'): the su solver, 'ECOS' (CompiledConic) or other cvxpy solvers solved by cvxpy (e.g. CLARABEL, OSQP).
+        su_solver_opts ({}): the options of the other su solvers, passed to cvxpy solve.
+        metrics_sink (None), metrics_file (None): function called with / json lines file appended by the record of every cycle, see Profiler.
+        kinematics ('ackermann'): the motion model of the robot, 'ackermann', 'diff' or 'omni', see Kinematics.
+        warm_shift (False): shift the duals and the slack distance one step forward at each solve, the slots follow the obstacles by position.
+        match_dis (1.0): the maximum displacement of an obstacle matched by position between two solves.
+        dual_cache_size (100): the number of the dual variables cached by obstacle id (e.g. rdaobs.id) for the reappearing obstacles, 0 to disable.
+        freeze_threshold (None): skip the LamMuZ solve of the obstacles whose dual and primal residuals are below it in a solve, None to disable.
+        freeze_dis (0.1): solve a frozen obstacle again once the nominal trajectory moves farther than it near the obstacle.
+        adaptive_ro (False): adapt ro1, ro2 by the residual balancing (ro_ratio (10), ro_scale (2), within ro_range (100)), the scaled duals rescaled.
+        acceleration (None): 'anderson' to extrapolate the duals from the last anderson_memory (3) iterations, see AndersonAcceleration.
+        problem_cache_dir (None): the directory to cache the compiled problems, loaded by the later constructions and workers with the same key.
+        problem_cache_size (100): the maximum number of the files in problem_cache_dir, the least recently used ones are removed, see ProblemCache.
+        executor (None): the LamMuZ executor, 'serial', 'thread', 'process' or 'shared_memory'; None for 'shared_memory' if process_num > 1 else 'serial'.
+        chunk_size (None): the number of the slots of one task of the thread and process executors, split evenly among the workers if None.
+        solver_pool (None): an executor shared with other solvers (e.g. SolverPool of BatchPlanner) replacing the own one, started and closed by its owner.
         '''
 
         # setting
         self.T = receding
         self.car_tuple = car_tuple # car_tuple: 'G h cone_type wheelbase max_speed max_acce'
         self.L = car_tuple.wheelbase
+        self.kinematics = Kinematics(kwargs.get('kinematics', 'ackermann'), self.L)
         self.max_speed = np.c_[self.car_tuple.max_speed]
-        self.obstacle_template_list = obstacle_template_list
+        self.obstacle_template_list = list(obstacle_template_list)
         self.obstacle_template_num = sum([ ot['obstacle_num'] for ot in obstacle_template_list])
+        self.active_index_list = []
+        self.obstacle_num = 0
+        self.slot_position = {}  # the obstacle position of the active slots, to match the obstacles of the next solve
+        self.slot_id = {}  # the obstacle id of the active slots
+        self.dual_cache = OrderedDict()  # id: (lam, mu, z, xi, zeta, solve index)
+        self.dual_cache_size = kwargs.get('dual_cache_size', 100)
+        self.solve_index = 0
+        self.warm_shift = kwargs.get('warm_shift', False)
+        self.match_dis = kwargs.get('match_dis', 1.0)
+
+        self.freeze_threshold = kwargs.get('freeze_threshold', None)
+        self.freeze_dis = kwargs.get('freeze_dis', 0.1)
+        self.frozen_dict = {}  # obs_index: (trans, phi, distance) of the nominal steps 1..T at the freezing
+        self.update_index_list = []  # the active slots not frozen, updated in the iteration
+        self.dual_residual = {}  # obs_index: the last dual residual of the slot
+        self.primal_residual = {}  # obs_index: the last squared norm of the Hm of the slot
+        self.obstacle_distance = {}  # obs_index: (T, ) the last Im of the slot, the distance estimate of the steps
+        self.distance_residual = {}  # obs_index: the last squared norm of Im - dis - z of the slot
+
+        self.adaptive_ro = kwargs.get('adaptive_ro', False)
+        self.ro_ratio = kwargs.get('ro_ratio', 10)
+        self.ro_scale = kwargs.get('ro_scale', 2)
+        self.ro_range = kwargs.get('ro_range', 100)
+        self.dual_change = {}  # obs_index: the change of lam, mu, z of the slot in the last update
+
+        self.acceleration = kwargs.get('acceleration', None)
+        self.accelerator = AndersonAcceleration(kwargs.get('anderson_memory', 3)) if self.acceleration == 'anderson' else None
 
         self.iter_num = iter_num
         self.dt = step_time
         self.acce_bound = np.c_[car_tuple.max_acce] * self.dt 
         self.iter_threshold = iter_threshold
+        self.profiler = Profiler(kwargs.get('metrics_sink', None), kwargs.get('metrics_file', None))
+        self.iteration_cost_list = deque(maxlen=10)  # the time of the recent iterations, to predict the next one
 
         # independ variable and cvxpy parameters definition
         self.definition(obstacle_template_list, **kwargs)
@@ -44,28 +99,82 @@ class RDA_solver:
         # flag
         # self.init_flag = True
         self.process_num = process_num
+        self.dual_backend = dual_backend
+        self.su_solver = su_solver
+        self.su_solver_opts = kwargs.get('su_solver_opts', {})
+        self.worker_pool = None
+        self.solver_pool = kwargs.get('solver_pool', None)
+        self.chunk_size = kwargs.get('chunk_size', None)
+        self.kwargs = kwargs
+
+        executor = kwargs.get('executor', None)
+
+        if executor is None:
+            executor = 'shared_memory' if process_num > 1 else 'serial'
+
+        assert executor in executor_dict or executor == 'shared_memory', 'executor should be serial, thread, process or shared_memory'
+
+        # the own executor of the LamMuZ problems, None for the numpy backend, the shared memory workers and the shared solver pool
+        self.shared_memory = dual_backend != 'numpy' and self.solver_pool is None and executor == 'shared_memory'
+        self.executor = executor_dict[executor](process_num) if dual_backend != 'numpy' and self.solver_pool is None and executor in executor_dict else None
+
+        pool_cache_dir = getattr(self.solver_pool if self.solver_pool is not None else self.executor, 'cache_dir', None)
+        cache_dir = kwargs.get('problem_cache_dir', pool_cache_dir)
+        self.problem_cache = ProblemCache(cache_dir, self.problem_key(**kwargs), kwargs.get('problem_cache_size', 100)) if cache_dir is not None else None
+        self.LamMuZ_template_dict = {}  # (edge_num, cone_type): CompiledConic, the LamMuZ problem shared by the slots of the group
+
+        if dual_backend == 'numpy':
+            self.dual_solver = DualSolverNumpy(car_tuple.G, car_tuple.h, car_tuple.cone_type, iter_num=kwargs.get('dual_iter_num', 20))
+
+        self.construct_all_problem(**kwargs)
+        self.deactivate_slot(range(self.obstacle_template_num))
+
+    def start(self):
+        # start the own workers, called by the construction and after close
+        if self.worker_pool is not None:
+            self.worker_pool.start()
+
+        if self.executor is not None:
+            self.executor.start()
+
+        return self
+
+    def close(self):
+        # stop the own workers and release the shared memory, the solver_pool is closed by its owner
+        if self.worker_pool is not None:
+            self.worker_pool.close()
+
+        if self.executor is not None:
+            self.executor.close()
+
+        self.profiler.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
-        if process_num == 1:
-            self.construct_problem(**kwargs)
-        elif process_num > 1:
-            global pool 
-            pool = self.construct_mp_problem(process_num, **kwargs)
-    
     # region: definition of variables and parameters
     def definition(self, obstacle_template_list, **kwargs):
 
         self.state_variable_define()
-        self.dual_variable_define(obstacle_template_list)
-        
         self.state_parameter_define()
-        self.dual_parameter_define(obstacle_template_list)
+        self.adjust_parameter_define(**kwargs)
 
-        self.obstacle_parameter_define(obstacle_template_list)
+        # the lists of the obstacle slots, extended by slot_define
+        self.para_lam_list, self.para_mu_list, self.para_z_list, self.para_xi_list, self.para_zeta_list = [], [], [], [], []
+        self.para_obstacle_list = []
+        self.para_obsA_lam_list, self.para_obsb_lam_list, self.para_obsA_rot_list, self.para_obsA_trans_list = [], [], [], []
 
-        self.adjust_parameter_define(**kwargs)
+        self.slot_define(obstacle_template_list)
 
-        self.combine_parameter_define(obstacle_template_list)
+    def slot_define(self, obstacle_template_list):
+        # define the variables and parameters of the obstacle slots in the template list, appended to the existing slots
 
+        self.dual_parameter_define(obstacle_template_list)
+        self.obstacle_parameter_define(obstacle_template_list)
+        self.combine_parameter_define(obstacle_template_list)
         self.combine_variable_define()
 
 
@@ -73,31 +182,14 @@ class RDA_solver:
         # decision variables
         self.indep_s = cp.Variable((3, self.T+1), name='state')
         self.indep_u = cp.Variable((2, self.T), name='vel')
-        self.indep_dis = cp.Variable((1, self.T), name='distance', nonneg=True)
-
-        self.indep_rot_list = [cp.Variable((2, 2), name='rot_'+str(t))  for t in range(self.T)]  # the variable of rotation matrix
+        self.indep_dis = cp.Variable((1, self.T), name='distance')  # nonneg by bound_dis_constraints, no attribute to recover it from the compiled problem
 
-    def dual_variable_define(self, obstacle_template_list):
-        
-        '''
-        define the indep_lam; indep_mu; indep_z
-        ''' 
-        self.indep_lam_list = []
-        self.indep_mu_list = []
-        self.indep_z_list = []
+        self.indep_rot = cp.Variable((2*self.T, 2), name='rot')  # the rotation matrices of the time steps stacked, rows 2t:2t+2 for step t
 
-        for ot in obstacle_template_list:
-            self.indep_lam_list += [ cp.Variable((ot['edge_num'], self.T+1), name='lam_'+ str(ot['edge_num']) + '_' + str(index)) for index in range(ot['obstacle_num'])]
-            self.indep_mu_list += [ cp.Variable((self.car_tuple.G.shape[0], self.T+1), name='mu_'+ str(ot['edge_num']) + '_' + str(index)) for index in range(ot['obstacle_num'])]
-            self.indep_z_list += [ cp.Variable((1, self.T), nonneg=True, name='z_'+ str(ot['edge_num']) + '_' + str(index)) for index in range(ot['obstacle_num'])]
-    
     def combine_variable_define(self):
 
         self.indep_Im_array_su = cp.Variable((self.obstacle_template_num, self.T), name='Im_array_su')
-        self.indep_Im_array_LamMuZ =[ cp.Variable((self.T,), name='Im_array_LamMuZ') for i in range(self.obstacle_template_num)]
-
         self.indep_Hm_array_su = cp.Variable((self.obstacle_template_num * self.T, 2), name='Im_array_su')
-        self.indep_Hm_array_LamMuZ = [ cp.Variable((self.T, 2), name='Hm_array_LamMuZ') for i in range(self.obstacle_template_num)]
 
 
     def state_parameter_define(self):
@@ -109,21 +201,18 @@ class RDA_solver:
         self.para_u = cp.Parameter((2, self.T), name='para_vel')
         self.para_dis = cp.Parameter((1, self.T), nonneg=True, value=np.ones((1, self.T)), name='para_dis')
 
-        self.para_rot_list = [cp.Parameter((2, 2), name='para_rot_'+str(t)) for t in range(self.T)]
-        self.para_drot_list = [cp.Parameter((2, 2), name='para_drot_'+str(t)) for t in range(self.T)]
-        self.para_drot_phi_list = [cp.Parameter((2, 2), name='para_drot_phi_'+str(t)) for t in range(self.T)]
+        # the rotation matrices stacked as indep_rot, rows 2t:2t+2 for step t
+        self.para_rot = cp.Parameter((2*self.T, 2), name='para_rot')
+        self.para_drot = cp.Parameter((2*self.T, 2), name='para_drot')
+        self.para_drot_phi = cp.Parameter((2*self.T, 2), name='para_drot_phi')
 
-        self.para_A_list = [ cp.Parameter((3, 3), name='para_A_'+str(t)) for t in range(self.T)]
-        self.para_B_list = [ cp.Parameter((3, 2), name='para_B_'+str(t)) for t in range(self.T)]
-        self.para_C_list = [ cp.Parameter((3, 1), name='para_C_'+str(t)) for t in range(self.T)]
+        # the linear model of the time steps, column t is the flattened A, B, C of step t
+        self.para_A = cp.Parameter((9, self.T), name='para_A')
+        self.para_B = cp.Parameter((6, self.T), name='para_B')
+        self.para_C = cp.Parameter((3, self.T), name='para_C')
 
     def dual_parameter_define(self, obstacle_template_list):
         # define the parameters related to obstacles
-        self.para_lam_list = []
-        self.para_mu_list = []
-        self.para_z_list = []
-        self.para_xi_list = []
-        self.para_zeta_list = []
 
         for ot in obstacle_template_list:
             for index in range(ot['obstacle_num']):
@@ -138,23 +227,22 @@ class RDA_solver:
 
     def obstacle_parameter_define(self, obstacle_template_list):
 
-        self.para_obstacle_list = []
-
         for ot in obstacle_template_list: 
             for index in range(ot['obstacle_num']):                
                 oen = ot['edge_num']
 
-                A_list = [ cp.Parameter((oen, 2), value=np.zeros((oen, 2)), name='para_A_t'+ str(t)) for t in range(self.T+1)]
-                b_list = [ cp.Parameter((oen, 1), value=np.zeros((oen, 1)), name='para_b_t'+ str(t)) for t in range(self.T+1)]
-                para_obstacle={'A': A_list, 'b': b_list, 'cone_type': ot['cone_type'], 'edge_num': oen, 'assign': False}
+                # A and b of the time steps stacked, rows t*oen:(t+1)*oen for step t, see time_array
+                para_A = cp.Parameter(((self.T+1)*oen, 2), value=np.zeros(((self.T+1)*oen, 2)), name='para_obs_A')
+                para_b = cp.Parameter(((self.T+1)*oen, 1), value=np.zeros(((self.T+1)*oen, 1)), name='para_obs_b')
+                para_obstacle={'A': para_A, 'b': para_b, 'cone_type': ot['cone_type'], 'edge_num': oen, 'assign': False}
 
                 self.para_obstacle_list.append(para_obstacle)
 
     def combine_parameter_define(self, obstacle_template_list):
-        self.para_obsA_lam_list = []   # lam.T @ obsA
-        self.para_obsb_lam_list = []   # lam.T @ obsb
-        self.para_obsA_rot_list = []   # obs.A @ rot
-        self.para_obsA_trans_list = []   # obs.A @ trans
+        # self.para_obsA_lam_list: lam.T @ obsA
+        # self.para_obsb_lam_list: lam.T @ obsb
+        # self.para_obsA_rot_list: obs.A @ rot
+        # self.para_obsA_trans_list: obs.A @ trans
 
         for ot in obstacle_template_list: 
             for index in range(ot['obstacle_num']): 
@@ -167,8 +255,8 @@ class RDA_solver:
                 self.para_obsA_lam_list.append(para_obsA_lam)
                 self.para_obsb_lam_list.append(para_obsb_lam)
 
-                para_obsA_rot = [ cp.Parameter((oen, 2), value=np.zeros((oen, 2)), name='para_obsA_rot_t'+ str(t)) for t in range(self.T+1) ]
-                para_obsA_trans = [ cp.Parameter((oen, 1), value=np.zeros((oen, 1)), name='para_obsA_trans_t'+ str(t)) for t in range(self.T+1) ]
+                para_obsA_rot = cp.Parameter(((self.T+1)*oen, 2), value=np.zeros(((self.T+1)*oen, 2)), name='para_obsA_rot')
+                para_obsA_trans = cp.Parameter(((self.T+1)*oen, 1), value=np.zeros(((self.T+1)*oen, 1)), name='para_obsA_trans')
 
                 self.para_obsA_rot_list.append(para_obsA_rot)
                 self.para_obsA_trans_list.append(para_obsA_trans)
@@ -192,27 +280,88 @@ class RDA_solver:
         self.ro1 = cp.Parameter(value=kwargs.get('ro1', 200), nonneg=True)
         self.ro2 = cp.Parameter(value=kwargs.get('ro2', 1), nonneg=True)
 
+        # the given ro1, ro2, the center of the range of the adaptive penalties
+        self.ro_base = (self.ro1.value, self.ro2.value)
+
     # endregion
 
     # region: construct the problem
-    def construct_problem(self, **kwargs):
-        self.prob_su = self.construct_su_prob(**kwargs)
-        self.prob_LamMuZ_list = self.construct_LamMuZ_prob(**kwargs)
+    def construct_all_problem(self, **kwargs):
+        # set up the problems of all the slots, called by the construction and after adding slots, compiled at the first solve
+
+        self.construct_su_prob(**kwargs)
+
+        if self.shared_memory:
+            # the workers and the shared layout are built for the slots, replace them
+            if self.worker_pool is not None:
+                self.worker_pool.close()
+
+            self.worker_pool = self.construct_mp_problem(self.process_num, **kwargs)
+
+        self.start()
 
+    def add_slot(self, slot_num_dict):
+
+        '''
+        add the obstacle slots and reconstruct the problems
+        slot_num_dict: {(edge_num, cone_type): number of the new slots}
+        '''
+
+        new_template_list = [{'edge_num': edge_num, 'obstacle_num': num, 'cone_type': cone_type} for (edge_num, cone_type), num in slot_num_dict.items()]
+        start_index = self.obstacle_template_num
+
+        self.obstacle_template_list += new_template_list
+        self.obstacle_template_num += sum(slot_num_dict.values())
+
+        with problem_lock:
+            self.slot_define(new_template_list)
+
+        self.deactivate_slot(range(start_index, self.obstacle_template_num))
+        self.construct_all_problem(**self.kwargs)
 
     def construct_mp_problem(self, process_num, **kwargs):
-        self.prob_su = self.construct_su_prob(**kwargs)
-        pool = Pool(processes=process_num, initializer=self.init_prob_LamMuZ, initargs=(kwargs, )) 
-        return pool
+        worker_pool = WorkerPool(process_num, self.shared_layout(), self.init_prob_LamMuZ, (kwargs, ))
+        return worker_pool
+
+    def shared_layout(self):
+        # the arrays exchanged with the workers, the dual variables are overwritten by the results
+
+        ren = self.car_tuple.G.shape[0]
+        layout = [('s', (3, self.T+1)), ('dis', (1, self.T)), ('ro2', (1,))]
+
+        for obs_index, para_obs in enumerate(self.para_obstacle_list):
+            oen = para_obs['edge_num']
+
+            layout += [('xi_'+str(obs_index), (self.T+1, 2)), ('zeta_'+str(obs_index), (1, self.T)), 
+                       ('lam_'+str(obs_index), (oen, self.T+1)), ('mu_'+str(obs_index), (ren, self.T+1)), ('z_'+str(obs_index), (1, self.T)),
+                       ('obsA_'+str(obs_index), ((self.T+1)*oen, 2)), ('obsb_'+str(obs_index), ((self.T+1)*oen, 1)), 
+                       ('obsA_rot_'+str(obs_index), ((self.T+1)*oen, 2)), ('obsA_trans_'+str(obs_index), ((self.T+1)*oen, 1))]
+
+        return layout
     
     def construct_su_prob(self, **kwargs):
+
+        '''
+        the su problem, compiled by the first solve or loaded from the problem cache:
+            ECOS: CompiledConic; other solvers: the cvxpy problem built at the first solve.
+        '''
+
+        build = lambda: self.su_prob(**kwargs)
+        name = ('su', self.su_solver, [(para_obs['edge_num'], para_obs['cone_type']) for para_obs in self.para_obstacle_list])
+        variables = [self.indep_s, self.indep_u, self.indep_dis, self.indep_rot, self.indep_Im_array_su, self.indep_Hm_array_su]
+
+        self.prob_su = None
+
+        if self.su_solver == 'ECOS':
+            self.compiled_su = CompiledConic(build, self.su_parameter_list(), variables, self.problem_cache, name)
+        else:
+            self.compiled_su = None
+
+    def su_prob(self, **kwargs):
         
         ws = kwargs.get('ws', 1)
         wu = kwargs.get('wu', 1)
 
-        # ro1 = kwargs.get('ro1', 200)
-        # ro2 = kwargs.get('ro2', 1)
-        
         nav_cost, nav_constraints = self.nav_cost_cons(ws, wu)
         su_cost, su_constraints = self.update_su_cost_cons(self.para_slack_gain, self.ro1, self.ro2)
 
@@ -222,85 +371,81 @@ class RDA_solver:
 
         return prob_su
 
-    def construct_LamMuZ_prob(self, **kwargs):
-        
-        # ro1 = kwargs.get('ro1', 200)
-        # ro2 = kwargs.get('ro2', 1) 
+    def su_parameter_list(self):
+        # all the parameters of the su problem, in the order of the compiled data
 
-        prob_list = []
+        state_list = [self.para_ref_s, self.para_ref_speed, self.para_s, self.para_u, self.para_dis, self.para_rot, self.para_drot, self.para_drot_phi, self.para_A, self.para_B, self.para_C]
+        adjust_list = [self.para_slack_gain, self.para_max_sd, self.para_min_sd, self.ro1, self.ro2]
+        slot_list = self.para_lam_list + self.para_mu_list + self.para_z_list + self.para_xi_list + self.para_zeta_list + self.para_obsA_lam_list + self.para_obsb_lam_list
 
-        for obs_index in range(self.obstacle_template_num):
+        return state_list + adjust_list + slot_list
 
-            indep_lam = self.indep_lam_list[obs_index]
-            indep_mu = self.indep_mu_list[obs_index]
-            indep_z = self.indep_z_list[obs_index]
+    def LamMuZ_template(self, obs_index):
 
-            indep_Im_lamMuZ = self.indep_Im_array_LamMuZ[obs_index]
-            indep_Hm_lamMuZ = self.indep_Hm_array_LamMuZ[obs_index]
+        '''
+        the LamMuZ problem of the slot, shared by the slots of the same (edge_num, cone_type) which differ only in the parameter values, 
+        the parameters: s, dis, ro2, xi, zeta, obs A, obs b, obsA_rot, obsA_trans of the slot; the variables: lam, mu, z.
+        '''
 
-            para_xi = self.para_xi_list[obs_index]
-            para_zeta = self.para_zeta_list[obs_index]
+        para_obs = self.para_obstacle_list[obs_index]
+        key = (para_obs['edge_num'], para_obs['cone_type'])
 
-            para_obs = self.para_obstacle_list[obs_index]
+        with problem_lock:
+            if key not in self.LamMuZ_template_dict:
+                self.LamMuZ_template_dict[key] = self.LamMuZ_compiled(*key)
 
-            para_obsA_rot = self.para_obsA_rot_list[obs_index]
-            para_obsA_trans = self.para_obsA_trans_list[obs_index]
+        return self.LamMuZ_template_dict[key]
 
-            cost, constraints = self.LamMuZ_cost_cons(indep_lam, indep_mu, indep_z, indep_Im_lamMuZ, indep_Hm_lamMuZ, self.para_s, self.para_rot_list, para_xi, self.para_dis, para_zeta, para_obs, para_obsA_rot, para_obsA_trans, self.T, 1, self.ro2)
-            
-            prob = cp.Problem(cp.Minimize(cost), constraints)
+    def LamMuZ_compiled(self, edge_num, cone_type):
 
-            assert prob.is_dcp(dpp=True)
-            
-            prob_list.append(prob)
+        ren = self.car_tuple.G.shape[0]
+        T = self.T
 
-        return prob_list
+        parameters = [self.para_s, self.para_dis, self.ro2, 
+                      cp.Parameter((T+1, 2), name='para_xi_'+str(edge_num)), cp.Parameter((1, T), name='para_zeta_'+str(edge_num)), 
+                      cp.Parameter(((T+1)*edge_num, 2), name='para_obs_A'), cp.Parameter(((T+1)*edge_num, 1), name='para_obs_b'), 
+                      cp.Parameter(((T+1)*edge_num, 2), name='para_obsA_rot'), cp.Parameter(((T+1)*edge_num, 1), name='para_obsA_trans')]
 
-    def init_prob_LamMuZ(self, kwargs):
-        global prob_LamMuZ_list, para_xi_list, para_zeta_list, para_s, para_rot_list, para_dis, para_obsA_rot_list, para_obsA_trans_list, para_obstacle_list
+        # z is nonneg by the constraint of construct_LamMuZ_prob, a variable with attributes can not be recovered from the compiled problem
+        variables = [cp.Variable((edge_num, T+1), name='lam_'+str(edge_num)), cp.Variable((ren, T+1), name='mu_'+str(edge_num)), cp.Variable((1, T), name='z_'+str(edge_num))]
 
-        para_xi_list = self.para_xi_list
-        para_zeta_list = self.para_zeta_list
-        para_s = self.para_s
-        para_rot_list = self.para_rot_list
-        para_dis = self.para_dis 
+        build = lambda: self.construct_LamMuZ_prob(edge_num, cone_type, parameters, variables)
 
-        para_obsA_rot_list = self.para_obsA_rot_list
-        para_obsA_trans_list = self.para_obsA_trans_list
-        para_obstacle_list = self.para_obstacle_list
+        return CompiledConic(build, parameters, variables, self.problem_cache, ('LamMuZ', edge_num, cone_type))
 
-        prob_LamMuZ_list = self.construct_LamMuZ_prob_parallel(para_xi_list, para_zeta_list, para_s, para_rot_list, para_dis, para_obstacle_list, para_obsA_rot_list, para_obsA_trans_list, **kwargs)
+    def construct_LamMuZ_prob(self, edge_num, cone_type, parameters, variables):
+        
+        para_s, para_dis, ro2, para_xi, para_zeta, para_A, para_b, para_obsA_rot, para_obsA_trans = parameters
+        indep_lam, indep_mu, indep_z = variables
 
-    def construct_LamMuZ_prob_parallel(self, para_xi_list, para_zeta_list, para_s, para_rot_list, para_dis, para_obstacle_list, para_obsA_rot_list, para_obsA_trans_list, **kwargs):
+        indep_Im_lamMuZ = cp.Variable((self.T,), name='Im_array_LamMuZ')
+        indep_Hm_lamMuZ = cp.Variable((self.T, 2), name='Hm_array_LamMuZ')
 
-        # ro1 = kwargs.get('ro1', 200)
-        # ro2 = kwargs.get('ro2', 1) 
+        para_obs = {'A': para_A, 'b': para_b, 'cone_type': cone_type, 'edge_num': edge_num}
 
-        prob_list = []
+        cost, constraints = self.LamMuZ_cost_cons(indep_lam, indep_mu, indep_z, indep_Im_lamMuZ, indep_Hm_lamMuZ, para_s, para_xi, para_dis, para_zeta, para_obs, para_obsA_rot, para_obsA_trans, self.T, 1, ro2)
+        constraints += [ indep_z >= 0 ]
 
-        for obs_index in range(self.obstacle_template_num):
+        prob = cp.Problem(cp.Minimize(cost), constraints)
 
-            indep_lam = self.indep_lam_list[obs_index]
-            indep_mu = self.indep_mu_list[obs_index]
-            indep_z = self.indep_z_list[obs_index]
+        assert prob.is_dcp(dpp=True)
 
-            indep_Im_lamMuZ = self.indep_Im_array_LamMuZ[obs_index] # combine variables
-            indep_Hm_lamMuZ = self.indep_Hm_array_LamMuZ[obs_index]
+        return prob
 
-            para_xi = para_xi_list[obs_index]
-            para_zeta = para_zeta_list[obs_index]
+    def init_prob_LamMuZ(self, kwargs):
+        # run in the worker process, the copy of the solver is the worker state, the LamMuZ problems of the slot groups are compiled 
+        # (or loaded from the problem cache) at the start of the worker instead of the first solve
 
-            para_obs = para_obstacle_list[obs_index]
-            para_obsA_rot = para_obsA_rot_list[obs_index]
-            para_obsA_trans = para_obsA_trans_list[obs_index]
+        for index_list in self.slot_group().values():
+            self.LamMuZ_template(index_list[0]).compile()
 
-            cost, constraints = self.LamMuZ_cost_cons(indep_lam, indep_mu, indep_z, indep_Im_lamMuZ, indep_Hm_lamMuZ, para_s, para_rot_list, para_xi, para_dis, para_zeta, para_obs, para_obsA_rot, para_obsA_trans, self.T, 1, self.ro2)
-            
-            prob = cp.Problem(cp.Minimize(cost), constraints)
-            prob_list.append(prob)
+        return self
 
-        return prob_list
+    def problem_key(self, **kwargs):
+        # everything the compiled problems depend on besides the parameter values, the package source is added by ProblemCache
 
+        return (self.T, self.dt, self.car_tuple.G.tolist(), self.car_tuple.h.tolist(), self.car_tuple.cone_type, 
+                self.max_speed.tolist(), self.acce_bound.tolist(), kwargs.get('ws', 1), kwargs.get('wu', 1))
 
     def nav_cost_cons(self, ws=1, wu=1):
  
@@ -344,20 +489,15 @@ class RDA_solver:
             para_obsb_lam = self.para_obsb_lam_list[obs_index]
 
             Imsu = self.Im_su(self.indep_s, self.indep_dis, para_lam, para_mu, para_z, para_zeta, para_obs, para_obsA_lam, para_obsb_lam)
-            Hmsu = self.Hm_su(self.indep_rot_list, para_mu, para_lam, para_xi, para_obs, self.T, para_obsA_lam)
+            Hmsu = self.Hm_su(self.indep_rot, para_mu, para_lam, para_xi, para_obs, self.T, para_obsA_lam)
             
             Im_su_list.append(Imsu)
             Hm_su_list.append(Hmsu)
 
-        rot_diff_list = []
-        for t in range(self.T):
-
-            indep_phi = self.indep_s[2, t+1:t+2]
-            indep_rot_t = self.indep_rot_list[t]
+        # the linearized rotation of each step, the phi of step t repeated on the rows 2t:2t+2
+        repeat_phi = np.kron(np.eye(self.T), np.ones((2, 1))) @ self.indep_s[2:3, 1:].T @ np.ones((1, 2))
+        rot_diff_array = self.para_rot - self.para_drot_phi + cp.multiply(self.para_drot, repeat_phi) - self.indep_rot
 
-            rot_diff_list.append(self.para_rot_list[t] - self.para_drot_phi_list[t] + self.para_drot_list[t] * indep_phi - indep_rot_t)
-
-        rot_diff_array = cp.vstack(rot_diff_list)
         Im_su_array = cp.vstack(Im_su_list)
         Hm_su_array = cp.vstack(Hm_su_list)
 
@@ -375,12 +515,12 @@ class RDA_solver:
 
         return cost, constraints
 
-    def LamMuZ_cost_cons(self, indep_lam, indep_mu, indep_z, indep_Im_lamMuZ, indep_Hm_lamMuZ, para_s, para_rot_list, para_xi, para_dis, para_zeta, para_obs, para_obsA_rot, para_obsA_trans, receding, ro1, ro2):
+    def LamMuZ_cost_cons(self, indep_lam, indep_mu, indep_z, indep_Im_lamMuZ, indep_Hm_lamMuZ, para_s, para_xi, para_dis, para_zeta, para_obs, para_obsA_rot, para_obsA_trans, receding, ro1, ro2):
 
         cost = 0
         constraints = []
 
-        Hm_array = self.Hm_LamMu(indep_lam, indep_mu, para_rot_list, para_xi, para_obs, receding, para_obsA_rot)
+        Hm_array = self.Hm_LamMu(indep_lam, indep_mu, para_xi, para_obs, receding, para_obsA_rot)
         Im_array = self.Im_LamMu(indep_lam, indep_mu, indep_z, para_s, para_dis, para_zeta, para_obs, para_obsA_trans)
 
         constraints += [indep_Im_lamMuZ == Im_array]
@@ -390,15 +530,9 @@ class RDA_solver:
         constraints += [indep_Hm_lamMuZ == Hm_array]
         cost += 0.5*ro2 * cp.sum_squares(indep_Hm_lamMuZ)
 
-        temp_list = []
-        for t in range(self.T):
-            para_obsAt = para_obs['A'][t+1]
-            indep_lam_t = indep_lam[:, t+1:t+2]
-            temp_list.append( cp.norm(para_obsAt.T @ indep_lam_t) )
-        
-        temp = cp.max(cp.vstack(temp_list))
-
-        
+        # obsA_t.T @ lam_t of all the steps, (2, T)
+        obsA_lam = self.time_product(indep_lam, para_obs['A'], para_obs['edge_num'])
+        temp = cp.max(cp.norm(obsA_lam, axis=0))
 
         constraints += [ temp <= 1 ]
         # constraints += [ cp.norm(para_obs.A.T @ indep_lam, axis=0) <= 1 ]
@@ -419,43 +553,41 @@ class RDA_solver:
         self.ro1.value = kwargs.get('ro1', self.ro1.value)
         self.ro2.value = kwargs.get('ro2', self.ro2.value)
 
+        if 'ro1' in kwargs or 'ro2' in kwargs:
+            self.ro_base = (self.ro1.value, self.ro2.value)
+
     def assign_state_parameter(self, nom_s, nom_u, nom_dis):
 
         self.para_s.value = nom_s
         self.para_u.value = nom_u
         self.para_dis.value = nom_dis
-        
-        for t in range(self.T):
-            nom_st = nom_s[:, t:t+1]
-            nom_ut = nom_u[:, t:t+1]
-            
-            A, B, C = self.linear_ackermann_model(nom_st, nom_ut, self.dt, self.L)
 
-            self.para_A_list[t].value = A
-            self.para_B_list[t].value = B
-            self.para_C_list[t].value = C
+        # all the time steps together, (T, 3, 3), (T, 3, 2), (T, 3, 1)
+        A, B, C = self.kinematics.linearize(nom_s[:, :-1], nom_u, self.dt)
 
-            nom_phi = nom_st[2, 0]
-            self.para_rot_list[t].value = np.array([[cos(nom_phi), -sin(nom_phi)],  [sin(nom_phi), cos(nom_phi)]])
-            self.para_drot_list[t].value = np.array( [[-sin(nom_phi), -cos(nom_phi)],  [cos(nom_phi), -sin(nom_phi)]] )
-            self.para_drot_phi_list[t].value = nom_phi * np.array( [[-sin(nom_phi), -cos(nom_phi)],  [cos(nom_phi), -sin(nom_phi)]] )
+        self.para_A.value = A.reshape(self.T, 9).T
+        self.para_B.value = B.reshape(self.T, 6).T
+        self.para_C.value = C[:, :, 0].T
 
-    def assign_state_parameter_parallel(self, input):
+        # (T, 2, 2), the rotation of each step and its derivative
+        nom_phi = nom_s[2, :-1]
+        cos_phi, sin_phi = np.cos(nom_phi), np.sin(nom_phi)
 
-        nom_s, nom_dis = input
+        self.rot_array = np.stack([cos_phi, -sin_phi, sin_phi, cos_phi], axis=1).reshape(self.T, 2, 2)
+        drot_array = np.stack([-sin_phi, -cos_phi, cos_phi, -sin_phi], axis=1).reshape(self.T, 2, 2)
 
-        para_s.value = nom_s
-        para_dis.value = nom_dis
-        
-        for t in range(self.T):
-            nom_st = nom_s[:, t:t+1]
-            
-            nom_phi = nom_st[2, 0]
-            para_rot_list[t].value = np.array([[cos(nom_phi), -sin(nom_phi)],  [sin(nom_phi), cos(nom_phi)]])
+        self.para_rot.value = self.rot_array.reshape(2*self.T, 2)
+        self.para_drot.value = drot_array.reshape(2*self.T, 2)
+        self.para_drot_phi.value = (nom_phi[:, np.newaxis, np.newaxis] * drot_array).reshape(2*self.T, 2)
 
     def assign_dual_parameter(self, LamMuZ_list):
 
-        for index, LamMuZ in enumerate(LamMuZ_list):
+        for index, LamMuZ in zip(self.update_index_list, LamMuZ_list):
+
+            if self.adaptive_ro:
+                # the change of the update, for the dual residuals of the penalties
+                self.dual_change[index] = (LamMuZ[0] - self.para_lam_list[index].value, LamMuZ[1] - self.para_mu_list[index].value, LamMuZ[2] - self.para_z_list[index].value)
+
             self.para_lam_list[index].value = LamMuZ[0]
             self.para_mu_list[index].value = LamMuZ[1]
             self.para_z_list[index].value = LamMuZ[2]
@@ -463,315 +595,831 @@ class RDA_solver:
 
     def assign_obstacle_parameter(self, obstacle_list):
         
-        # self.obstacle_template_list
+        # each obstacle takes a slot with the same edge number and cone type, the slots are added if not enough 
         self.obstacle_num = len(obstacle_list)
 
+        # obs.A: (edge_num, 2) for all the time steps, or a list / (receding+1, edge_num, 2) array for each time step
+        obs_dict = {}
         for obs in obstacle_list:
-            for para_obs in self.para_obstacle_list:
+            obs_edge_num = obs.A[0].shape[0] if self.obstacle_moving(obs) else obs.A.shape[0]
+            obs_dict.setdefault((obs_edge_num, obs.cone_type), []).append(obs)
 
-                para_obs_edge_num = para_obs['edge_num']
+        slot_dict = self.slot_group()
+        slot_num_dict = {}
 
-                if isinstance(obs.A, list):
-                    obs_edge_num = obs.A[0].shape[0]
-                    if obs_edge_num == para_obs_edge_num and para_obs['assign'] is False:
-                        for t in range(len(para_obs['A'])):
-                            para_obs['A'][t].value = obs.A[t]
-                            para_obs['b'][t].value = obs.b[t]
+        for key, obs_group in obs_dict.items():
+            slot_num = len(slot_dict.get(key, []))
 
-                        para_obs['assign'] = True
-                        break
-                           
+            # at least double the slots to avoid reconstructing the problem for every new obstacle
+            if len(obs_group) > slot_num:
+                slot_num_dict[key] = max(len(obs_group) - slot_num, slot_num)
+
+        if len(slot_num_dict) != 0:
+            self.add_slot(slot_num_dict)
+            slot_dict = self.slot_group()
+
+        active_index_list = []
+        new_index_list = []
+        slot_id = {}
+
+        for key, obs_group in obs_dict.items():
+            for obs, obs_index, matched in self.match_slot(obs_group, slot_dict[key]):
+                para_obs = self.para_obstacle_list[obs_index]
+
+                if self.obstacle_moving(obs):
+                    para_obs['A'].value = np.reshape(np.asarray(obs.A)[0:self.T+1], para_obs['A'].shape)
+                    para_obs['b'].value = np.reshape(np.asarray(obs.b)[0:self.T+1], para_obs['b'].shape)
                 else:
-                    obs_edge_num = obs.A.shape[0]
+                    para_obs['A'].value = np.tile(obs.A, (self.T+1, 1))
+                    para_obs['b'].value = np.tile(obs.b, (self.T+1, 1))
+
+                self.slot_position[obs_index] = self.obstacle_position(obs)
+                slot_id[obs_index] = self.obstacle_id(obs)
+                active_index_list.append(obs_index)
+
+                if not matched:
+                    new_index_list.append(obs_index)
+
+        active_index_list.sort()
+
+        # the obstacles leaving their slots
+        self.cache_dual([index for index in self.active_index_list if index in new_index_list or index not in active_index_list])
+
+        if self.warm_shift:
+            self.shift_slot([index for index in active_index_list if index not in new_index_list])
+
+        self.slot_id = slot_id
+
+        self.activate_slot(new_index_list)
+        self.restore_dual([index for index in new_index_list if slot_id[index] in self.dual_cache])
+        self.deactivate_slot([index for index in range(self.obstacle_template_num) if index not in active_index_list])
+        self.active_index_list = active_index_list
+
+        if self.warm_shift:
+            # lam.T @ obsA of the shifted duals and the new obstacles, used by the first su problem
+            self.assign_combine_parameter_lamobs()
 
-                    if obs_edge_num == para_obs_edge_num and para_obs['assign'] is False:
-                        for t in range(len(para_obs['A'])):
-                            para_obs['A'][t].value = obs.A
-                            para_obs['b'][t].value = obs.b
+    def match_slot(self, obs_group, slot_list):
 
-                        para_obs['assign'] = True
+        '''
+        match the obstacles to the slots of their group: an obstacle with id keeps the slot of the same id, 
+        the others keep the slot of an obstacle in the last solve moved less than match_dis
+        obs_group: the obstacles of the group; slot_list: the slot indices of the group, at least as many as the obstacles
+
+        return list of (obs, slot index, matched), the unmatched obstacles take the free slots with the initial (or cached) dual values
+        '''
+
+        prev_list = [index for index in slot_list if index in self.active_index_list]
+        id_list = [self.obstacle_id(obs) for obs in obs_group]
+
+        match_dict = {}  # obstacle order: slot index
+
+        id_slot_dict = {self.slot_id[index]: index for index in prev_list if self.slot_id.get(index) is not None}
+
+        for k, obs_id in enumerate(id_list):
+            if obs_id is not None and obs_id in id_slot_dict:
+                match_dict[k] = id_slot_dict[obs_id]
+
+        # the obstacles and slots without id, by position
+        rest_list = [k for k, obs_id in enumerate(id_list) if obs_id is None]
+        rest_prev_list = [index for index in prev_list if self.slot_id.get(index) is None]
+
+        position_list = [self.obstacle_position(obs_group[k]) for k in rest_list]
+
+        if self.warm_shift and all([position is not None for position in position_list]) and all([self.slot_position.get(index) is not None for index in rest_prev_list]):
+
+            if len(rest_list) != 0 and len(rest_prev_list) != 0:
+                prev_position = np.array([self.slot_position[index] for index in rest_prev_list])
+                distance = np.linalg.norm(np.array(position_list)[:, np.newaxis] - prev_position[np.newaxis], axis=2)
+
+                # the closest pairs first
+                for i, j in zip(*np.unravel_index(np.argsort(distance, axis=None), distance.shape)):
+                    if distance[i, j] > self.match_dis:
                         break
-                        
-        for para_obs in self.para_obstacle_list:
-            para_obs['assign'] = False
 
+                    if rest_list[i] not in match_dict and rest_prev_list[j] not in match_dict.values():
+                        match_dict[rest_list[i]] = rest_prev_list[j]
 
-    def assign_combine_parameter_lamobs(self):
-        
-        for n in range(self.obstacle_template_num):
+        elif len(rest_list) == len(obs_group):
+            # by order, the obstacles without position keep the slots of the last solve
+            return [(obs, index, index in self.active_index_list) for obs, index in zip(obs_group, slot_list)]
+
+        # the slots without obstacle first, then the slots of the obstacles gone
+        used_list = list(match_dict.values())
+        free_list = [index for index in slot_list if index not in prev_list] + [index for index in prev_list if index not in used_list]
+
+        return [(obs, match_dict[k], True) if k in match_dict else (obs, free_list.pop(0), False) for k, obs in enumerate(obs_group)]
+
+    @staticmethod
+    def obstacle_id(obs):
+        return getattr(obs, 'id', None)
+
+    def cache_dual(self, index_list):
+        # cache the dual values of the slots by the obstacle id, least recently used first
+
+        if self.dual_cache_size <= 0:
+            return
+
+        for obs_index in index_list:
+            obs_id = self.slot_id.get(obs_index)
+
+            if obs_id is None:
+                continue
 
-            para_lam_value = self.para_lam_list[n].value
-            para_obs = self.para_obstacle_list[n]
+            self.dual_cache[obs_id] = (self.para_lam_list[obs_index].value.copy(), self.para_mu_list[obs_index].value.copy(), self.para_z_list[obs_index].value.copy(), 
+                                       self.para_xi_list[obs_index].value.copy(), self.para_zeta_list[obs_index].value.copy(), self.solve_index)
+            self.dual_cache.move_to_end(obs_id)
 
-            for t in range(self.T):
-                lam = para_lam_value[:, t+1:t+2]
-                obsA = para_obs['A'][t+1].value
-                obsb = para_obs['b'][t+1].value
+            while len(self.dual_cache) > self.dual_cache_size:
+                self.dual_cache.popitem(last=False)
 
-                self.para_obsA_lam_list[n].value[t+1, :] = lam.T @ obsA
-                self.para_obsb_lam_list[n].value[t+1, :] = lam.T @ obsb
+    def restore_dual(self, index_list):
+        # the cached dual values of the obstacle reappearing in the slot, shifted by the solves since it left
+
+        for obs_index in index_list:
+            lam, mu, z, xi, zeta, solve_index = self.dual_cache.pop(self.slot_id[obs_index])
+
+            # the obstacle may come back with another edge number
+            if lam.shape != self.para_lam_list[obs_index].shape:
+                continue
+
+            self.para_lam_list[obs_index].value = lam
+            self.para_mu_list[obs_index].value = mu
+            self.para_z_list[obs_index].value = z
+            self.para_xi_list[obs_index].value = xi
+            self.para_zeta_list[obs_index].value = zeta
+
+            if self.warm_shift:
+                # cached before the shift of its leaving solve
+                for _ in range(min(self.solve_index - solve_index + 1, self.T)):
+                    self.shift_slot([obs_index])
+
+    @staticmethod
+    def obstacle_position(obs):
+        # the center of a circle or the vertex mean of a polygon at the current time, None if not given
+
+        center = getattr(obs, 'center', None)
+        if center is not None:
+            return np.reshape(center, -1)[0:2].astype(float)
+
+        vertex = getattr(obs, 'vertex', None)
+        if vertex is not None:
+            return np.mean(np.asarray(vertex, dtype=float)[0:2], axis=1)
+
+        return None
+
+    def shift_slot(self, index_list):
+        # receding horizon warm start, the dual values of step t+1 to step t, the last step repeated
+        # the step 0 of lam, mu and xi is not in the subproblems (its value is arbitrary), only the steps 1..T are shifted
+
+        for obs_index in index_list:
+            self.para_lam_list[obs_index].value = self.shift_time(self.para_lam_list[obs_index].value, 1)
+            self.para_mu_list[obs_index].value = self.shift_time(self.para_mu_list[obs_index].value, 1)
+            self.para_xi_list[obs_index].value = self.shift_time(self.para_xi_list[obs_index].value.T, 1).T
+            self.para_z_list[obs_index].value = self.shift_time(self.para_z_list[obs_index].value)
+            self.para_zeta_list[obs_index].value = self.shift_time(self.para_zeta_list[obs_index].value)
+
+    @staticmethod
+    def shift_time(array, start=0):
+        # shift the columns (time steps) from start one step forward, the last column repeated
+        return np.hstack((array[:, 0:start], array[:, start+1:], array[:, -1:]))
+
+    @staticmethod
+    def obstacle_moving(obs):
+        return isinstance(obs.A, list) or np.ndim(obs.A) == 3
+
+    def slot_group(self):
+        # {(edge_num, cone_type): list of the slot index}
+
+        slot_dict = {}
+        for obs_index, para_obs in enumerate(self.para_obstacle_list):
+            slot_dict.setdefault((para_obs['edge_num'], para_obs['cone_type']), []).append(obs_index)
+
+        return slot_dict
+
+    def activate_slot(self, index_list):
+        # the initial dual values of a new obstacle in the slot
+
+        for obs_index in index_list:
+            oen = self.para_obstacle_list[obs_index]['edge_num']
+            ren = self.car_tuple.G.shape[0]
+
+            self.para_lam_list[obs_index].value = 0.1*np.ones((oen, self.T+1))
+            self.para_mu_list[obs_index].value = np.ones((ren, self.T+1))
+            self.para_z_list[obs_index].value = 0.01*np.ones((1, self.T))
+            self.para_xi_list[obs_index].value = np.zeros((self.T+1, 2))
+            self.para_zeta_list[obs_index].value = np.zeros((1, self.T))
+
+    def deactivate_slot(self, index_list):
+        # the slot without obstacle: Hm = xi = 0 and Im = zeta - dis >= 0 in the su problem, no cost
+
+        for obs_index in index_list:
+            self.para_lam_list[obs_index].value = np.zeros(self.para_lam_list[obs_index].shape)
+            self.para_mu_list[obs_index].value = np.zeros(self.para_mu_list[obs_index].shape)
+            self.para_z_list[obs_index].value = np.zeros((1, self.T))
+            self.para_xi_list[obs_index].value = np.zeros((self.T+1, 2))
+            self.para_zeta_list[obs_index].value = self.para_max_sd.value * np.ones((1, self.T))
+
+            self.para_obsA_lam_list[obs_index].value = np.zeros((self.T+1, 2))
+            self.para_obsb_lam_list[obs_index].value = np.zeros((self.T+1, 1))
+
+    def active_group(self, index_list=None):
+        # {(edge_num, cone_type): list of the active slot index}, the slots of a group are stacked by the batched updates
+        # index_list: the slots to group, all the active slots if None
+
+        group_dict = {}
+        for obs_index in (self.active_index_list if index_list is None else index_list):
+            para_obs = self.para_obstacle_list[obs_index]
+            group_dict.setdefault((para_obs['edge_num'], para_obs['cone_type']), []).append(obs_index)
+
+        return group_dict
+
+    def time_array(self, para):
+        # the (T+1, edge_num, column) view of a stacked obstacle parameter, e.g. para_obs['A'] -> obs.A of each step
+        return para.value.reshape(self.T+1, -1, para.shape[1])
+
+    def obstacle_para_list(self, key):
+        return [para_obs[key] for para_obs in self.para_obstacle_list]
+
+    def stack_value(self, para_list, index_list, time_array=False):
+        # the values of the slots stacked on the first axis
+
+        if time_array:
+            return np.stack([self.time_array(para_list[n]) for n in index_list])
+
+        return np.stack([para_list[n].value for n in index_list])
+
+    def assign_combine_parameter_lamobs(self, index_list=None):
+
+        for index_list in self.active_group(index_list).values():
+
+            lam = self.stack_value(self.para_lam_list, index_list)  # (K, edge_num, T+1)
+            obsA = self.stack_value(self.obstacle_para_list('A'), index_list, True)  # (K, T+1, edge_num, 2)
+            obsb = self.stack_value(self.obstacle_para_list('b'), index_list, True)  # (K, T+1, edge_num, 1)
+
+            obsA_lam = np.einsum('kit,ktij->ktj', lam, obsA)
+            obsb_lam = np.einsum('kit,ktij->ktj', lam, obsb)
+
+            for k, n in enumerate(index_list):
+                self.para_obsA_lam_list[n].value = obsA_lam[k]
+                self.para_obsb_lam_list[n].value = obsb_lam[k]
                     
-    def assign_combine_parameter_stateobs(self):
+    def assign_combine_parameter_stateobs(self, index_list=None):
         
         # self.para_obsA_lam_list = []   # lam.T @ obsA
         # self.para_obsb_lam_list = []   # lam.T @ obsb
         # self.para_obsA_rot_list = []   # obs.A @ rot
         # self.para_obsA_trans_list = []   # obs.A @ trans
 
-        for n in range(self.obstacle_template_num):
+        trans = self.para_s.value[0:2, 1:]
 
-            para_obs = self.para_obstacle_list[n]
- 
-            for t in range(self.T):
-                obsA = para_obs['A'][t+1].value
+        for index_list in self.active_group(index_list).values():
 
-                rot = self.para_rot_list[t].value
-                trans = self.para_s.value[0:2, t+1:t+2]
-                
-                self.para_obsA_rot_list[n][t+1].value = obsA @ rot
-                self.para_obsA_trans_list[n][t+1].value = obsA @ trans
+            obsA = self.stack_value(self.obstacle_para_list('A'), index_list, True)
+
+            # the step 0 is not in the subproblems
+            obsA_rot = np.zeros(obsA.shape)
+            obsA_trans = np.zeros(obsA.shape[:-1] + (1,))
+
+            obsA_rot[:, 1:] = np.einsum('ktij,tjl->ktil', obsA[:, 1:], self.rot_array)
+            obsA_trans[:, 1:, :, 0] = np.einsum('ktij,jt->kti', obsA[:, 1:], trans)
+
+            for k, n in enumerate(index_list):
+                self.para_obsA_rot_list[n].value = obsA_rot[k].reshape(self.para_obsA_rot_list[n].shape)
+                self.para_obsA_trans_list[n].value = obsA_trans[k].reshape(self.para_obsA_trans_list[n].shape)
 
     # endregion
     
     # region: solve the problem
-    def iterative_solve(self, nom_s, nom_u, ref_states, ref_speed, obstacle_list, **kwargs):
+    def iterative_solve(self, nom_s, nom_u, ref_states, ref_speed, obstacle_list, time_budget=None, **kwargs):
 
         # obstacle_list: a list of obstacle instance
         #   obstacle: (A, b, cone_type)
+        # time_budget: the wall clock budget (seconds) of this solve, None for no deadline. 
+        #   Another iteration runs only if its predicted time fits in the remaining budget, 
+        #   otherwise the iterate with the least residual is returned. The first iteration always runs.
+
+        with self.profiler.cycle():
+            return self.iterative_solve_cycle(nom_s, nom_u, ref_states, ref_speed, obstacle_list, time_budget)
+
+    def iterative_solve_cycle(self, nom_s, nom_u, ref_states, ref_speed, obstacle_list, time_budget=None):
 
-        # start_time = time.time()
+        solve_time = time.time()
+        self.solve_index += 1
         
         self.para_ref_s.value = np.hstack(ref_states)[0:3, :]
         self.para_ref_speed.value = ref_speed
 
         # random.shuffle(obstacle_list)
-        self.assign_state_parameter(nom_s, nom_u, self.para_dis.value)
-        self.assign_obstacle_parameter(obstacle_list)
+        with self.profiler.phase('assign_state_parameter'):
+            nom_dis = self.shift_time(self.para_dis.value) if self.warm_shift else self.para_dis.value
+            self.assign_state_parameter(nom_s, nom_u, nom_dis)
+
+        with self.profiler.phase('assign_obstacle_parameter'):
+            self.assign_obstacle_parameter(obstacle_list)
+
+        # the freezing is within a solve, the obstacles and the trajectory of the last solve are shifted
+        self.frozen_dict = {}
+        self.dual_residual, self.primal_residual, self.obstacle_distance, self.distance_residual = {}, {}, {}, {}
+
+        deadline_stop = False
+        best_iterate = None
+        resi_dual_list, resi_pri_list, iteration_time_list, update_num_list = [], [], [], []
+        extrapolate_num = 0
+
+        if self.accelerator is not None:
+            self.accelerator.reset()
 
-        iteration_time = time.time()
         for i in range(self.iter_num):
 
+            if i > 0 and time_budget is not None and time.time() - solve_time + self.predict_iteration_cost(cost_time) > time_budget:
+                deadline_stop = True
+                break
+
             start_time = time.time()
+
+            if self.accelerator is not None:
+                iterate, ro = self.iterate_vector(), (self.ro1.value, self.ro2.value)
+
             opt_state_array, opt_velocity_array, resi_dual, resi_pri = self.rda_solver()
-            print('iteration ' + str(i) + ' time: ', time.time()-start_time)
+            cost_time = time.time()-start_time
+
+            self.iteration_cost_list.append(cost_time)
+
+            resi_dual_list.append(resi_dual)
+            resi_pri_list.append(resi_pri)
+            iteration_time_list.append(cost_time)
+            update_num_list.append(len(self.update_index_list))
+
+            if best_iterate is None or resi_dual + resi_pri < best_iterate[2] + best_iterate[3]:
+                best_iterate = (opt_state_array, opt_velocity_array, resi_dual, resi_pri)
             
             if resi_dual < self.iter_threshold and resi_pri < self.iter_threshold:
-                print('iteration early stop: '+ str(i))
                 break
 
-        print('-----------------------------------------------')
-        print('iteration time:', time.time() - iteration_time)
-        print('==============================================')
-        
+            if self.accelerator is not None and i < self.iter_num - 1:
+                with self.profiler.phase('accelerate'):
+                    extrapolate_num += self.accelerate(iterate, ro)
+
+        if deadline_stop:
+            opt_state_array, opt_velocity_array, resi_dual, resi_pri = best_iterate
+
         # info for debug
         opt_state_list = [state[:, np.newaxis] for state in opt_state_array.T ]
         info = {'ref_traj_list': ref_states, 'opt_state_list': opt_state_list}
         info['iteration_time'] = time.time() - start_time
         info['resi_dual'] = resi_dual
         info['resi_pri'] = resi_pri    
+        info['iteration_num'] = len(resi_dual_list)
+        info['deadline_stop'] = deadline_stop
+        info['solve_time'] = time.time() - solve_time
+        info['resi_dual_list'] = resi_dual_list
+        info['resi_pri_list'] = resi_pri_list
+        info['iteration_time_list'] = iteration_time_list
+        info['update_num_list'] = update_num_list
+        info['ro1'] = self.ro1.value
+        info['ro2'] = self.ro2.value
+        info['dis'] = np.array(self.para_dis.value).ravel()
+        info['extrapolate_num'] = extrapolate_num
+
+        if self.profiler.enabled:
+            info['timing'] = self.profiler.record['timing']
+            self.profiler.update(iteration_num=len(resi_dual_list), deadline_stop=deadline_stop, obstacle_num=self.obstacle_num,
+                                 resi_dual_list=resi_dual_list, resi_pri_list=resi_pri_list, iteration_time_list=iteration_time_list,
+                                 update_num_list=update_num_list)
         
         return opt_velocity_array, info 
 
+    def predict_iteration_cost(self, last_cost):
+        # the median is robust to the one-off compilation of the problems, the last iteration follows the current obstacles
+        return max(np.median(self.iteration_cost_list), last_cost)
+
     def rda_solver(self):
         
         resi_dual, resi_pri = 0, 0
         
-        # start_time = time.time()
-        nom_s, nom_u, nom_dis = self.su_prob_solve()
-        # print('- su problem solve:', time.time() - start_time)
+        with self.profiler.phase('su_prob_solve'):
+            nom_s, nom_u, nom_dis = self.su_prob_solve()
         
-        self.assign_state_parameter(nom_s, nom_u, nom_dis)
-        # start_time = time.time()
-        self.assign_combine_parameter_stateobs()
-        # print('- other1:', time.time() - start_time)
+        with self.profiler.phase('assign_state_parameter'):
+            self.assign_state_parameter(nom_s, nom_u, nom_dis)
+
+            if self.freeze_threshold is not None:
+                self.unfreeze_obstacle()
+
+            self.update_index_list = [index for index in self.active_index_list if index not in self.frozen_dict]
+            self.assign_combine_parameter_stateobs(self.update_index_list)
 
         if self.obstacle_num != 0:
         # if self.obstacle_template_num != 0:
-            # start_time = time.time()
-            LamMuZ_list, resi_dual = self.LamMuZ_prob_solve()
-            # print('- LamMu problem solve:', time.time() - start_time)
+            with self.profiler.phase('LamMuZ_prob_solve'):
+                LamMuZ_list, resi_dual = self.LamMuZ_prob_solve()
 
-            self.assign_dual_parameter(LamMuZ_list)
-            self.assign_combine_parameter_lamobs()
+            with self.profiler.phase('assign_dual_parameter'):
+                self.assign_dual_parameter(LamMuZ_list)
+                self.assign_combine_parameter_lamobs(self.update_index_list)
+
+            with self.profiler.phase('update_xi_zeta'):
+                resi_pri = self.update_xi()
+                resi_dis = self.update_zeta()
+
+            if self.adaptive_ro:
+                self.adapt_penalty(resi_pri, resi_dis)
 
-            resi_pri = self.update_xi()
-            self.update_zeta()
+            if self.freeze_threshold is not None:
+                self.freeze_obstacle()
             
         return nom_s, nom_u, resi_dual, resi_pri
 
-    def update_zeta(self):
+    def accelerate(self, iterate, ro):
 
-        for obs_index, para_obs in enumerate(self.para_obstacle_list):
+        # iterate, ro: the iterate vector and the penalties before the iteration; return whether extrapolated
+        
+        if ro != (self.ro1.value, self.ro2.value):
+            # the scaled duals are rescaled by the adaptive penalties, the history does not apply
+            self.accelerator.reset()
 
-            Im_list = []
-            zeta = self.para_zeta_list[obs_index].value
-            z = self.para_z_list[obs_index].value
+        next_iterate, extrapolated = self.accelerator.step(iterate, self.iterate_vector())
 
-            for t in range(self.T):
+        if extrapolated:
+            self.assign_iterate_vector(next_iterate)
 
-                lam_t = self.para_lam_list[obs_index].value[:, t+1:t+2]
-                mu_t = self.para_mu_list[obs_index].value[:, t+1:t+2]
-                z_t = self.para_z_list[obs_index].value[:, t:t+1]
-                zeta_t = self.para_zeta_list[obs_index].value[:, t:t+1]
+        return extrapolated
 
-                trans_t = self.para_s.value[0:2, t+1:t+2]
+    def iterate_vector(self):
+        # the state of the iterations in one vector: the nominal s, u, dis and the lam, mu, z, xi, zeta of the active slots
 
-                para_obsAt = para_obs['A'][t+1].value
-                para_obsbt = para_obs['b'][t+1].value
+        value_list = [self.para_s.value.ravel(), self.para_u.value.ravel(), self.para_dis.value.ravel()]
 
-                Im = lam_t.T @ para_obsAt @ trans_t - lam_t.T @ para_obsbt - mu_t.T @ self.car_tuple.h
+        for obs_index in self.active_index_list:
+            for para_list in (self.para_lam_list, self.para_mu_list, self.para_z_list, self.para_xi_list, self.para_zeta_list):
+                value_list.append(para_list[obs_index].value.ravel())
 
-                Im_list.append(Im)
+        return np.concatenate(value_list)
 
-            Im_array = np.hstack(Im_list)
+    def assign_iterate_vector(self, vector):
+        # the inverse of iterate_vector, projected to the feasible sets of the variables
 
-            # temp= zeta + (Im_array - self.para_dis.value - z)  
-            self.para_zeta_list[obs_index].value = zeta + (Im_array - self.para_dis.value - z)    
-            
-    def update_xi(self): 
+        def take(shape):
+            nonlocal start
+            start += int(np.prod(shape))
+            return vector[start-int(np.prod(shape)):start].reshape(shape)
 
-        hm_list = []
+        start = 0
+        nom_s, nom_u, nom_dis = take(self.para_s.shape), take(self.para_u.shape), take(self.para_dis.shape)
 
-        for obs_index, obs in enumerate(self.para_obstacle_list):
-            for t in range(self.T):
+        # the initial state is fixed, the bounds of the su problem
+        nom_s = np.hstack((self.para_s.value[:, 0:1], nom_s[:, 1:]))
+        nom_u = np.clip(nom_u, -self.max_speed, self.max_speed)
+        nom_dis = np.clip(nom_dis, self.para_min_sd.value, self.para_max_sd.value)
 
-                lam_t = self.para_lam_list[obs_index].value[:, t+1:t+2]
-                mu_t = self.para_mu_list[obs_index].value[:, t+1:t+2]
-                rot_t = self.para_rot_list[t].value
-                xi_t = self.para_xi_list[obs_index].value[t+1:t+2, :]
-                
-                obsAt = obs['A'][t+1].value
+        self.assign_state_parameter(nom_s, nom_u, nom_dis)
+
+        for obs_index in self.active_index_list:
+            para_obs = self.para_obstacle_list[obs_index]
+            lam, mu, z, xi, zeta = [take(para_list[obs_index].shape) for para_list in (self.para_lam_list, self.para_mu_list, self.para_z_list, self.para_xi_list, self.para_zeta_list)]
+
+            lam = DualSolverNumpy.cone_project(lam.T, para_obs['cone_type']).T
+            mu = DualSolverNumpy.cone_project(mu.T, self.car_tuple.cone_type).T
+
+            # ||obs.A_t.T @ lam_t|| <= 1 of each step, scaled in the cone
+            obsA_lam = np.einsum('it,tij->tj', lam, self.time_array(para_obs['A']))
+            lam = lam / np.maximum(np.linalg.norm(obsA_lam, axis=1), 1)
+
+            self.para_lam_list[obs_index].value = lam
+            self.para_mu_list[obs_index].value = mu
+            self.para_z_list[obs_index].value = np.maximum(z, 0)
+            self.para_xi_list[obs_index].value = xi
+            self.para_zeta_list[obs_index].value = zeta
+
+        self.assign_combine_parameter_stateobs()
+        self.assign_combine_parameter_lamobs()
+
+    def adapt_penalty(self, resi_pri, resi_dis):
 
-                Hmt = mu_t.T @ self.car_tuple.G + lam_t.T @ obsAt @ rot_t
-                self.para_xi_list[obs_index].value[t+1:t+2, :] = Hmt + xi_t    
+        # residual balancing of ro2 (Hm, the primal residual resi_pri) and ro1 (Im - dis - z, resi_dis), the dual residual: 
+        # the change of the constraint by the update of lam, mu, z at the current su solution, times the weight of the constraint 
+        # in the LamMuZ problem, ro2 for Hm and 1 for Im (ro1 weights Im in the su problem only)
+        change_Hm, change_Im = self.dual_change_residual()
 
-                hm_list.append(Hmt)
+        # ro1 is also the weight of the safety distance in the su problem, not below the given value
+        for para_ro, ro_min, ro_max, primal, dual, para_dual_list in (
+                (self.ro1, self.ro_base[0], self.ro_base[0] * self.ro_range, resi_dis, change_Im, self.para_zeta_list), 
+                (self.ro2, self.ro_base[1] / self.ro_range, self.ro_base[1] * self.ro_range, resi_pri, self.ro2.value * change_Hm, self.para_xi_list)):
 
-        hm_array = np.vstack(hm_list)
-        resi_pri = np.linalg.norm(hm_array)
+            # converged by the stop test of the iterations, no balance to keep
+            if not np.isfinite(dual) or (primal < self.iter_threshold and dual < self.iter_threshold):
+                continue
 
-        return resi_pri
+            if primal > self.ro_ratio * dual:
+                ro = para_ro.value * self.ro_scale
+            elif dual > self.ro_ratio * primal:
+                ro = para_ro.value / self.ro_scale
+            else:
+                continue
+
+            ro = float(np.clip(ro, ro_min, ro_max))
+
+            if ro == para_ro.value:
+                continue
+
+            # the scaled dual variables: para_dual = unscaled dual / ro
+            for obs_index in self.active_index_list:
+                para_dual_list[obs_index].value = para_dual_list[obs_index].value * (para_ro.value / ro)
+
+            para_ro.value = ro
+
+    def dual_change_residual(self):
+        # the norms of the change of Hm and Im by the last update of lam, mu, z of the updated slots
+
+        change_Hm, change_Im = 0, 0
+        h = self.car_tuple.h[:, 0]
+
+        for index_list in self.active_group(self.update_index_list).values():
+
+            d_lam = np.stack([self.dual_change[n][0] for n in index_list])[:, :, 1:]
+            d_mu = np.stack([self.dual_change[n][1] for n in index_list])[:, :, 1:]
+            d_z = np.stack([self.dual_change[n][2] for n in index_list])[:, 0, :]
+
+            obsA_rot = self.stack_value(self.para_obsA_rot_list, index_list, True)[:, 1:]
+            obsA_trans = self.stack_value(self.para_obsA_trans_list, index_list, True)[:, 1:, :, 0]
+            obsb = self.stack_value(self.obstacle_para_list('b'), index_list, True)[:, 1:, :, 0]
+
+            # the same as update_xi and update_zeta, linear in lam, mu, z
+            d_Hm = np.einsum('kit,ij->ktj', d_mu, self.car_tuple.G) + np.einsum('kit,ktij->ktj', d_lam, obsA_rot)
+            d_Im = np.einsum('kit,kti->kt', d_lam, obsA_trans - obsb) - np.einsum('kit,i->kt', d_mu, h) - d_z
+
+            change_Hm += np.sum(d_Hm**2)
+            change_Im += np.sum(d_Im**2)
+
+        return np.sqrt(change_Hm), np.sqrt(change_Im)
+
+    def freeze_obstacle(self):
+        # freeze the updated obstacles with both residuals below the threshold, record the nominal steps to check the move
+
+        trans, phi = self.para_s.value[0:2, 1:], self.para_s.value[2, 1:]
+
+        for obs_index in self.update_index_list:
+            if self.dual_residual[obs_index] < self.freeze_threshold and np.sqrt(self.primal_residual[obs_index]) < self.freeze_threshold:
+                self.frozen_dict[obs_index] = (trans.copy(), phi.copy(), self.obstacle_distance[obs_index])
+
+    def unfreeze_obstacle(self):
+
+        # the obstacles solved again: a step moved more than freeze_dis, and it may be within max_sd of the obstacle after the move 
+        # (the distance estimate Im changes at most by the move of the step)
+        trans, phi = self.para_s.value[0:2, 1:], self.para_s.value[2, 1:]
+
+        for obs_index, (frozen_trans, frozen_phi, distance) in list(self.frozen_dict.items()):
+            move = np.linalg.norm(trans - frozen_trans, axis=0) + self.L * np.abs(np.arctan2(np.sin(phi - frozen_phi), np.cos(phi - frozen_phi)))
+
+            if np.any((move > self.freeze_dis) & (distance - move < self.para_max_sd.value)):
+                del self.frozen_dict[obs_index]
+
+    def update_zeta(self):
+
+        h = self.car_tuple.h[:, 0]
+        nom_dis = self.para_dis.value
+
+        for index_list in self.active_group(self.update_index_list).values():
+
+            lam = self.stack_value(self.para_lam_list, index_list)[:, :, 1:]  # (K, edge_num, T)
+            mu = self.stack_value(self.para_mu_list, index_list)[:, :, 1:]
+            obsA_trans = self.stack_value(self.para_obsA_trans_list, index_list, True)[:, 1:, :, 0]  # (K, T, edge_num)
+            obsb = self.stack_value(self.obstacle_para_list('b'), index_list, True)[:, 1:, :, 0]
+
+            # lam_t.T @ obsA_t @ trans_t - lam_t.T @ obsb_t - mu_t.T @ h, (K, T)
+            Im_array = np.einsum('kit,kti->kt', lam, obsA_trans - obsb) - np.einsum('kit,i->kt', mu, h)
+
+            for k, obs_index in enumerate(index_list):
+                zeta = self.para_zeta_list[obs_index].value
+                z = self.para_z_list[obs_index].value
+                self.obstacle_distance[obs_index] = Im_array[k]
+
+                residual = Im_array[k:k+1] - nom_dis - z
+                self.distance_residual[obs_index] = np.sum(residual**2)
+                self.para_zeta_list[obs_index].value = zeta + residual
+
+        # the frozen slots keep their last residual
+        return np.sqrt(sum([self.distance_residual[obs_index] for obs_index in self.active_index_list]))
+            
+    def update_xi(self): 
+
+        # the frozen slots keep their last Hm in the residual
+        for index_list in self.active_group(self.update_index_list).values():
+
+            lam = self.stack_value(self.para_lam_list, index_list)[:, :, 1:]
+            mu = self.stack_value(self.para_mu_list, index_list)[:, :, 1:]
+            obsA_rot = self.stack_value(self.para_obsA_rot_list, index_list, True)[:, 1:]  # (K, T, edge_num, 2)
+
+            # mu_t.T @ G + lam_t.T @ obsA_t @ rot_t, (K, T, 2)
+            Hm_array = np.einsum('kit,ij->ktj', mu, self.car_tuple.G) + np.einsum('kit,ktij->ktj', lam, obsA_rot)
+
+            for k, obs_index in enumerate(index_list):
+                self.para_xi_list[obs_index].value[1:] += Hm_array[k]
+                self.primal_residual[obs_index] = np.sum(Hm_array[k]**2)
+
+        return np.sqrt(sum([self.primal_residual[obs_index] for obs_index in self.active_index_list]))
     
     def su_prob_solve(self):
-        self.prob_su.solve(solver=cp.ECOS, verbose=False)
-        # self.prob_su.solve(solver=cp.SCS, verbose=False)
 
-        if self.prob_su.status == cp.OPTIMAL or self.prob_su.status == cp.OPTIMAL_INACCURATE:
+        if self.solver_pool is not None and self.su_solver == 'ECOS':
+            status = self.compiled_su.solve(pool=self.solver_pool)
+        elif self.compiled_su is not None:
+            status = self.compiled_su.solve()
+        else:
+            # cvxpy compiles the problem at the first solve
+            with problem_lock:
+                if self.prob_su is None:
+                    self.prob_su = self.su_prob(**self.kwargs)
+
+                self.prob_su.solve(solver=self.su_solver, verbose=False, **self.su_solver_opts)
+                # self.prob_su.solve(solver=cp.SCS, verbose=False)
+
+            status = self.prob_su.status
+
+        if status == cp.OPTIMAL or status == cp.OPTIMAL_INACCURATE:
             return self.indep_s.value, self.indep_u.value, self.indep_dis.value
         else:
             print('No update of state and control vector')
             return self.para_s.value, self.para_u.value, self.para_dis.value
 
     def LamMuZ_prob_solve(self):
-        
-        input_args = []
-        if self.process_num > 1:
-            for obs_index in range(self.obstacle_template_num):
-
-                nom_s = self.para_s.value
-                nom_dis = self.para_dis.value
-                nom_xi = self.para_xi_list[obs_index].value
-                nom_zeta = self.para_zeta_list[obs_index].value
-                receding = self.T
-                nom_lam = self.para_lam_list[obs_index].value
-                nom_mu = self.para_mu_list[obs_index].value
-                nom_z = self.para_z_list[obs_index].value
-                
-                nom_obs_A = [o.value for o in self.para_obstacle_list[obs_index]['A']]    
-                nom_obs_b = [o.value for o in self.para_obstacle_list[obs_index]['b']]   
-                nom_obsA_rot = [p.value for p in self.para_obsA_rot_list[obs_index]]
-                nom_obsA_trans = [p.value for p in self.para_obsA_trans_list[obs_index]] 
 
-                input_args.append((obs_index, nom_s, nom_dis, nom_xi, receding, nom_lam, nom_mu, nom_z, nom_zeta, nom_obs_A, nom_obs_b, nom_obsA_rot, nom_obsA_trans))
-            
-            LamMuZ_list = pool.map(RDA_solver.solve_parallel, input_args)
+        if self.dual_backend == 'numpy':
+            LamMuZ_list = self.solve_numpy()
 
-        else:
-            for obs_index in range(self.obstacle_template_num):
-                prob = self.prob_LamMuZ_list[obs_index]
-                input_args.append((prob, obs_index))
-            
-            LamMuZ_list = list(map(self.solve_direct, input_args))
-        
-        # update
-        if len(LamMuZ_list) != 0:
-            resi_dual_list = ([LamMu[3] for LamMu in LamMuZ_list])
+        elif self.solver_pool is not None:
+            with self.profiler.phase('pool_map'):
+                LamMuZ_list = self.solve_pool(self.solver_pool)
+
+        elif self.executor is not None:
+            if not self.executor.running:
+                self.start()
+
+            with self.profiler.phase('pool_map'):
+                LamMuZ_list = self.solve_pool(self.executor)
+
+        elif self.shared_memory:
+            if not self.worker_pool.running:
+                self.start()
+
+            with self.profiler.phase('pool_write'):
+                self.write_shared_parameter()
+
+            with self.profiler.phase('pool_map'):
+                residual_list = self.worker_pool.map(RDA_solver.solve_parallel, self.update_index_list)
+
+            arrays = self.worker_pool.arrays
+            LamMuZ_list = [ (arrays['lam_'+str(obs_index)].copy(), arrays['mu_'+str(obs_index)].copy(), arrays['z_'+str(obs_index)].copy(), residual) for obs_index, residual in zip(self.update_index_list, residual_list)]
+
+        # update, the frozen slots keep their last residual
+        for obs_index, LamMuZ in zip(self.update_index_list, LamMuZ_list):
+            self.dual_residual[obs_index] = LamMuZ[3]
+
+        if len(self.active_index_list) != 0:
+            resi_dual_list = [self.dual_residual[obs_index] for obs_index in self.active_index_list]
             resi_dual = sum(resi_dual_list) / len(resi_dual_list)
         else:
             resi_dual = 0
 
         return LamMuZ_list, resi_dual
 
-    def solve_parallel(input):
-        
-        obs_index, nom_s, nom_dis, nom_xi, receding, nom_lam, nom_mu, nom_z, nom_zeta, nom_obs_A, nom_obs_b, nom_obsA_rot, nom_obsA_trans = input
-        
-        prob = prob_LamMuZ_list[obs_index]
-
-        # update parameter
-        para_s.value = nom_s
-        para_dis.value = nom_dis
-        para_xi_list[obs_index].value = nom_xi
-        para_zeta_list[obs_index].value = nom_zeta
-
-        for t in range(receding):
-            nom_st = nom_s[:, t:t+1]
-            nom_phi = nom_st[2, 0]
-            para_rot_list[t].value = np.array([[cos(nom_phi), -sin(nom_phi)],  [sin(nom_phi), cos(nom_phi)]])
+    def write_shared_parameter(self):
+        # the parameters of the active slots to the shared memory of the workers
+
+        arrays = self.worker_pool.arrays
+
+        arrays['s'][:] = self.para_s.value
+        arrays['dis'][:] = self.para_dis.value
+        arrays['ro2'][:] = self.ro2.value
+
+        for obs_index in self.update_index_list:
             
-            para_obsA_rot_list[obs_index][t+1].value = nom_obsA_rot[t+1]
-            para_obsA_trans_list[obs_index][t+1].value = nom_obsA_trans[t+1]
+            index = str(obs_index)
+
+            arrays['xi_'+index][:] = self.para_xi_list[obs_index].value
+            arrays['zeta_'+index][:] = self.para_zeta_list[obs_index].value
+            arrays['lam_'+index][:] = self.para_lam_list[obs_index].value
+            arrays['mu_'+index][:] = self.para_mu_list[obs_index].value
+            arrays['z_'+index][:] = self.para_z_list[obs_index].value
+
+            arrays['obsA_'+index][:] = self.para_obstacle_list[obs_index]['A'].value
+            arrays['obsb_'+index][:] = self.para_obstacle_list[obs_index]['b'].value
+            arrays['obsA_rot_'+index][:] = self.para_obsA_rot_list[obs_index].value
+            arrays['obsA_trans_'+index][:] = self.para_obsA_trans_list[obs_index].value
 
-            para_obstacle_list[obs_index]['A'][t+1].value = nom_obs_A[t+1]
-            para_obstacle_list[obs_index]['b'][t+1].value = nom_obs_b[t+1]
+    def solve_parallel(self, arrays, obs_index):
+        # run in the worker process, read the parameters from the shared arrays and write the solution back
         
-        prob.solve(solver=cp.ECOS)
-        # prob.solve(solver=cp.SCS)
-
-        for variable in prob.variables():
-            if 'lam_' in variable.name():
-                indep_lam_value = variable.value
-            elif 'mu_' in variable.name():
-                indep_mu_value = variable.value
-            elif 'z_' in variable.name():
-                indep_z_value = variable.value
+        index = str(obs_index)
+        compiled = self.LamMuZ_template(obs_index)
+
+        nom_lam = arrays['lam_'+index]
+        nom_mu = arrays['mu_'+index]
+        nom_z = arrays['z_'+index]
+
+        value_list = [arrays['s'], arrays['dis'], arrays['ro2'][0], arrays['xi_'+index], arrays['zeta_'+index], 
+                      arrays['obsA_'+index], arrays['obsb_'+index], arrays['obsA_rot_'+index], arrays['obsA_trans_'+index]]
+        
+        status = compiled.solve(value_list)
+
+        indep_lam, indep_mu, indep_z = compiled.variables
                 
-        if prob.status == cp.OPTIMAL:
+        if status == cp.OPTIMAL:
 
-            lam_diff = np.linalg.norm(indep_lam_value - nom_lam)
-            mu_diff = np.linalg.norm(indep_mu_value - nom_mu)
+            lam_diff = np.linalg.norm(indep_lam.value - nom_lam)
+            mu_diff = np.linalg.norm(indep_mu.value - nom_mu)
             
-            z_diff = np.linalg.norm(indep_z_value - nom_z)
+            # the solution of ECOS may be slightly negative, the parameter z is nonneg
+            z_value = np.maximum(indep_z.value, 0)
+            z_diff = np.linalg.norm(z_value - nom_z)
             residual = lam_diff**2 + mu_diff**2 + z_diff**2
 
-            return indep_lam_value, indep_mu_value, indep_z_value, residual
+            nom_lam[:] = indep_lam.value
+            nom_mu[:] = indep_mu.value
+            nom_z[:] = z_value
+
+            return residual
 
         else:
+            # the nominal values are kept in the shared arrays
             print('Update Lam Mu Fail')
-            return nom_lam, nom_mu, nom_z, inf
+            return inf
 
-    def solve_direct(self, input):
-        
-        prob, obs_index = input
-        prob.solve(solver=cp.ECOS)
-        # prob.solve(solver=cp.SCS)
+    def solve_numpy(self):
+
+        # stack the active obstacles with the same edge number and cone type, solve them together
+        LamMuZ_list = [None] * len(self.update_index_list)
+        nom_dis = self.para_dis.value[0, :]
+
+        for (edge_num, cone_type), index_list in self.active_group(self.update_index_list).items():
+
+            nom_lam = np.swapaxes(self.stack_value(self.para_lam_list, index_list)[:, :, 1:], 1, 2)
+            nom_mu = np.swapaxes(self.stack_value(self.para_mu_list, index_list)[:, :, 1:], 1, 2)
+            nom_xi = self.stack_value(self.para_xi_list, index_list)[:, 1:, :]
+            nom_offset = self.stack_value(self.para_zeta_list, index_list)[:, 0, :] - nom_dis
+
+            obsA = self.stack_value(self.obstacle_para_list('A'), index_list, True)[:, 1:]
+            obsb = self.stack_value(self.obstacle_para_list('b'), index_list, True)[:, 1:, :, 0]
+            obsA_rot = self.stack_value(self.para_obsA_rot_list, index_list, True)[:, 1:]
+            obsA_trans = self.stack_value(self.para_obsA_trans_list, index_list, True)[:, 1:, :, 0]
+
+            lam, mu, z = self.dual_solver.solve(nom_lam, nom_mu, obsA, obsA_rot, obsA_trans - obsb, nom_xi, nom_offset, self.ro2.value, cone_type)
+
+            for k, obs_index in enumerate(index_list):
+
+                para_lam = self.para_lam_list[obs_index].value
+                para_mu = self.para_mu_list[obs_index].value
+                para_z = self.para_z_list[obs_index].value
+
+                # the first column is not in the subproblem, keep it 
+                indep_lam = np.hstack((para_lam[:, 0:1], lam[k].T))
+                indep_mu = np.hstack((para_mu[:, 0:1], mu[k].T))
+                indep_z = z[k][np.newaxis, :]
+
+                lam_diff = np.linalg.norm(indep_lam - para_lam)
+                mu_diff = np.linalg.norm(indep_mu - para_mu)
+                z_diff = np.linalg.norm(indep_z - para_z)
+                residual = lam_diff**2 + mu_diff**2 + z_diff**2
+
+                LamMuZ_list[self.update_index_list.index(obs_index)] = (indep_lam, indep_mu, indep_z, residual)
+
+        return LamMuZ_list
+
+    def solve_pool(self, executor):
+        # the LamMuZ problems of the updated slots solved by the executor together, chunk_size slots per task
+
+        problem_list = [(self.LamMuZ_template(obs_index), self.LamMuZ_value_list(obs_index)) for obs_index in self.update_index_list]
+        solution_list = executor.solve(problem_list, self.chunk_size)
+
+        return [self.LamMuZ_result(obs_index, *solution) for obs_index, solution in zip(self.update_index_list, solution_list)]
 
-        indep_lam = self.indep_lam_list[obs_index]
-        indep_mu = self.indep_mu_list[obs_index]
-        indep_z = self.indep_z_list[obs_index]
+    def LamMuZ_value_list(self, obs_index):
+        # the parameter values of the slot in the order of LamMuZ_template
+
+        para_obs = self.para_obstacle_list[obs_index]
+
+        return [self.para_s.value, self.para_dis.value, self.ro2.value, self.para_xi_list[obs_index].value, self.para_zeta_list[obs_index].value, 
+                para_obs['A'].value, para_obs['b'].value, self.para_obsA_rot_list[obs_index].value, self.para_obsA_trans_list[obs_index].value]
+
+    def LamMuZ_result(self, obs_index, status, solution_list):
 
         para_lam = self.para_lam_list[obs_index]
         para_mu = self.para_mu_list[obs_index]
         para_z = self.para_z_list[obs_index]
 
-        if prob.status == cp.OPTIMAL:
+        if status == cp.OPTIMAL:
+            indep_lam, indep_mu, indep_z = solution_list
 
-            lam_diff = np.linalg.norm(indep_lam.value - para_lam.value)
-            mu_diff = np.linalg.norm(indep_mu.value - para_mu.value)
-            z_diff = np.linalg.norm(indep_z.value - para_z.value)
+            # the solution of ECOS may be slightly negative, the parameter z is nonneg
+            indep_z = np.maximum(indep_z, 0)
+
+            lam_diff = np.linalg.norm(indep_lam - para_lam.value)
+            mu_diff = np.linalg.norm(indep_mu - para_mu.value)
+            z_diff = np.linalg.norm(indep_z - para_z.value)
             residual = lam_diff**2 + mu_diff**2 + z_diff**2
 
-            return indep_lam.value, indep_mu.value, indep_z.value, residual
+            return indep_lam, indep_mu, indep_z, residual
         else:
             print('Update Lam Mu Fail')
             return para_lam.value, para_mu.value, para_z.value, inf
@@ -780,101 +1428,69 @@ class RDA_solver:
 
     # region: formula， Hm, Im
     def Im_su(self, state, distance, para_lam, para_mu, para_z, para_zeta, para_obs, para_obsA_lam, para_obsb_lam):
-        
-        Im_list = []
 
-        for t in range(self.T):
-            para_lam_t = para_lam[:, t+1:t+2]
-            indep_trans_t = state[0:2, t+1:t+2]
-            para_mu_t = para_mu[:, t+1:t+2]
+        # obsA_lam_t @ trans_t - obsb_lam_t - mu_t.T @ h of the steps 1..T
+        Im_array = cp.sum(cp.multiply(para_obsA_lam[1:, :], state[0:2, 1:].T), axis=1) - para_obsb_lam[1:, 0] - (para_mu[:, 1:].T @ self.car_tuple.h)[:, 0]
 
-            para_obsAt = para_obs['A'][t+1]
-            para_obsbt = para_obs['b'][t+1]
-
-            para_obsA_lam_t = para_obsA_lam[t+1:t+2, :]
-            para_obsb_lam_t = para_obsb_lam[t+1:t+2, :]
-             
-            Im = para_obsA_lam_t @ indep_trans_t - para_obsb_lam_t - para_mu_t.T @ self.car_tuple.h
-            Im_list.append(Im)
-
-        Im_array = cp.hstack(Im_list)
-
-        return Im_array[0, :] - distance[0, :] - para_z[0, :] + para_zeta[0, :]
+        return Im_array - distance[0, :] - para_z[0, :] + para_zeta[0, :]
 
     def Hm_su(self, rot, para_mu, para_lam, para_xi, para_obs, receding, para_obsA_lam):
-        
-        Hm_list = []
 
-        for t in range(receding):
-    
-            lam_t = para_lam[:, t+1:t+2]
-            mu_t = para_mu[:, t+1:t+2]
-            para_xi_t = para_xi[t+1:t+2, :]
-            indep_rot_t = rot[t]
+        # obsA_lam_t @ rot_t = obsA_lam_t[0] * rot_t[0, :] + obsA_lam_t[1] * rot_t[1, :], rot_t is rows 2t:2t+2 of rot
+        obsA_lam_rot = cp.multiply(para_obsA_lam[1:, 0:1] @ np.ones((1, 2)), rot[0::2, :]) + cp.multiply(para_obsA_lam[1:, 1:2] @ np.ones((1, 2)), rot[1::2, :])
 
-            para_obsAt = para_obs['A'][t+1]
+        return para_mu[:, 1:].T @ self.car_tuple.G + obsA_lam_rot + para_xi[1:, :]
 
-            para_obsA_lam_t = para_obsA_lam[t+1:t+2, :]
+    def Hm_LamMu(self, indep_lam, indep_mu, para_xi, para_obs, receding, para_obsA_rot):
 
-            Hmt = mu_t.T @ self.car_tuple.G + para_obsA_lam_t @ indep_rot_t + para_xi_t
+        # mu_t.T @ G + lam_t.T @ obsA_rot_t + xi_t of the steps 1..T, (T, 2)
+        lam_obsA_rot = self.time_product(indep_lam, para_obsA_rot, para_obs['edge_num'])
 
-            Hm_list.append(Hmt)
+        return indep_mu[:, 1:].T @ self.car_tuple.G + lam_obsA_rot.T + para_xi[1:, :]
 
-        return cp.vstack(Hm_list)
+    def Im_LamMu(self, indep_lam, indep_mu, indep_z, para_s, para_dis, para_zeta, para_obs, para_obsA_trans):
 
-    def Hm_LamMu(self, indep_lam, indep_mu, para_rot_list, para_xi, para_obs, receding, para_obsA_rot):
+        # Im_array = cp.diag( indep_lam.T @ obs.A @ para_s[0:2] - indep_lam.T @ obs.b - indep_mu.T @ self.car_tuple.h ) 
+        lam_obs_trans = self.time_product(indep_lam, para_obsA_trans - para_obs['b'], para_obs['edge_num'])
 
-        Hm_list = []
-        for t in range(receding):
-            indep_lam_t = indep_lam[:, t+1:t+2]
-            indep_mu_t = indep_mu[:, t+1:t+2]
-            
-            para_rot_t = para_rot_list[t]
-            para_xi_t = para_xi[t+1:t+2, :]
+        Im_array = lam_obs_trans[0, :] - (indep_mu[:, 1:].T @ self.car_tuple.h)[:, 0]
 
-            para_obsA_rot_t = para_obsA_rot[t+1]
-        
-            Hmt = indep_mu_t.T @ self.car_tuple.G + indep_lam_t.T @ para_obsA_rot_t + para_xi_t
-            Hm_list.append(Hmt)
+        Im_lammu = Im_array - para_dis[0, :] - indep_z[0, :] + para_zeta[0, :]
 
-        return cp.vstack(Hm_list)
+        return Im_lammu
 
-    def Im_LamMu(self, indep_lam, indep_mu, indep_z, para_s, para_dis, para_zeta, para_obs, para_obsA_trans):
+    def time_product(self, indep_lam, para, edge_num):
 
-        # Im_array = cp.diag( indep_lam.T @ obs.A @ para_s[0:2] - indep_lam.T @ obs.b - indep_mu.T @ self.car_tuple.h ) 
-        Im_list = []
+        '''
+        lam_t.T @ para_t of the steps 1..T, the rows of all the steps in one expression
+        indep_lam: (edge_num, T+1)
+        para: the stacked ((T+1)*edge_num, column) parameter, para_t is the rows t*edge_num:(t+1)*edge_num
 
-        for t in range(self.T):
-            indep_lam_t = indep_lam[:, t+1:t+2]
-            indep_mu_t = indep_mu[:, t+1:t+2]
-            para_obsbt = para_obs['b'][t+1]
-            para_obsA_trans_t = para_obsA_trans[t+1]
+        return (column, T)
+        '''
 
-            Im = indep_lam_t.T @ para_obsA_trans_t - indep_lam_t.T @ para_obsbt - indep_mu_t.T @ self.car_tuple.h
-            Im_list.append(Im)
+        product_list = []
 
-        Im_array = cp.hstack(Im_list)
+        for c in range(para.shape[1]):
+            # the column c of all the steps as (edge_num, T+1)
+            para_c = cp.reshape(para[:, c], (edge_num, self.T+1), order='F')
+            product_list.append(cp.sum(cp.multiply(indep_lam[:, 1:], para_c[:, 1:]), axis=0))
 
-        Im_lammu = Im_array[0, :] - para_dis[0, :] - indep_z[0, :] + para_zeta[0, :]
-
-        return Im_lammu
+        return cp.vstack(product_list)
 
     def dynamics_constraint(self, state, control_u, receding):
 
+        # A_t @ s_t + B_t @ u_t + C_t of all the steps, the row i of A_t is the rows 3i:3i+3 of para_A
         temp_s1_list = []
 
-        for t in range(receding):
-            indep_st = state[:, t:t+1]
-            indep_ut = control_u[:, t:t+1]
+        for i in range(3):
+            temp_s1 = self.para_C[i, :]
+            temp_s1 += sum([cp.multiply(self.para_A[3*i+j, :], state[j, :-1]) for j in range(3)])
+            temp_s1 += sum([cp.multiply(self.para_B[2*i+j, :], control_u[j, :]) for j in range(2)])
 
-            ## dynamic constraints
-            A = self.para_A_list[t]
-            B = self.para_B_list[t]
-            C = self.para_C_list[t]
-            
-            temp_s1_list.append(A @ indep_st + B @ indep_ut + C)
+            temp_s1_list.append(temp_s1)
         
-        constraints = [ state[:, 1:] == cp.hstack(temp_s1_list) ]
+        constraints = [ state[:, 1:] == cp.vstack(temp_s1_list) ]
 
         return constraints
         
@@ -894,25 +1510,10 @@ class RDA_solver:
 
         constraints += [ cp.max(indep_dis) <= self.para_max_sd ] 
         constraints += [ cp.min(indep_dis) >= self.para_min_sd ]
+        constraints += [ indep_dis >= 0 ]
 
         return constraints
     
-    def linear_ackermann_model(self, nom_state, nom_u, dt, L):
-        
-        phi = nom_state[2, 0]
-        v = nom_u[0, 0]
-        psi = nom_u[1, 0]
-
-        A = np.array([ [1, 0, -v * dt * sin(phi)], [0, 1, v * dt * cos(phi)], [0, 0, 1] ])
-
-        B = np.array([ [cos(phi)*dt, 0], [sin(phi)*dt, 0], 
-                        [ tan(psi)*dt / L, v*dt/(L * (cos(psi))**2 ) ] ])
-
-        C = np.array([ [ phi*v*sin(phi)*dt ], [ -phi*v*cos(phi)*dt ], 
-                        [ -psi * v*dt / ( L * (cos(psi))**2) ]])
-
-        return A, B, C
-
     def C0_cost(self, ref_s, ref_speed, state, speed, ws, wu):
 
         diff_s = (state - ref_s)
@@ -931,14 +1532,3 @@ class RDA_solver:
             return cp.constraints.nonpos.NonPos( cp.norm(array[0:-1], axis = 0) - array[-1]  )
         
     # endregion
-    
-
-
-    
-
-
-    
-
-
-    
-
@@ -0,0 +1,20 @@
+'''
+Solver pool
+A process pool shared by the solvers of several robots, each task solves the compiled problems loaded from the problem cache
+'''
+
+from RDA_planner.executor import ProcessExecutor
+
+
+class SolverPool(ProcessExecutor):
+    def __init__(self, process_num=4, cache_dir=None) -> None:
+
+        '''
+        process_num: the number of the worker processes
+        cache_dir: the directory of the problem cache, a temporary directory removed by close if None
+
+        The ProcessExecutor started by the owner (e.g. BatchPlanner) and passed to the solvers by their solver_pool argument,
+        the tasks of all the solvers share the queue, so the robots with more obstacles do not hold the others.
+        '''
+
+        super().__init__(process_num, cache_dir)
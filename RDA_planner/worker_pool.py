@@ -0,0 +1,111 @@
+'''
+Worker pool
+A persistent process pool owned by one solver, the parameters are exchanged by a shared memory block
+'''
+
+import numpy as np
+from multiprocessing import shared_memory
+from pathos.multiprocessing import Pool
+
+# the state of the worker process, each process serves only one pool
+worker_state = None
+worker_arrays = None
+worker_shm = None
+
+
+class WorkerPool:
+    def __init__(self, process_num, layout, initializer, initargs=()) -> None:
+
+        '''
+        process_num: the number of the worker processes
+        layout: list of (key, shape), the float64 arrays in the shared memory block
+        initializer: function called once in every worker, initializer(*initargs), its return is the worker state
+
+        The tasks only send the small arguments (e.g. the obstacle index), the large arrays are written to
+        self.arrays before the map and read by the workers from the shared memory.
+        '''
+
+        self.process_num = process_num
+        self.layout = [(key, tuple(shape)) for key, shape in layout]
+        self.initializer = initializer
+        self.initargs = initargs
+
+        self.pool = None
+        self.shm = None
+        self.arrays = {}
+
+    def start(self):
+
+        if self.running:
+            return self
+
+        size = sum([int(np.prod(shape)) for _, shape in self.layout]) * np.dtype(np.float64).itemsize
+        self.shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        self.arrays = array_views(self.shm.buf, self.layout)
+
+        self.pool = Pool(processes=self.process_num, initializer=init_worker, initargs=(self.shm.name, self.layout, self.initializer, self.initargs))
+
+        return self
+
+    def map(self, func, args):
+        # func(worker_state, worker_arrays, arg) runs in the workers
+
+        assert self.running, 'the worker pool is not started'
+
+        return self.pool.map(run_worker, [(func, arg) for arg in args])
+
+    def close(self):
+
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+        if self.shm is not None:
+            self.arrays = {}
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    @property
+    def running(self):
+        return self.pool is not None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __getstate__(self):
+        # the pool and the shared memory belong to the owner process, not sent to the workers
+        state = self.__dict__.copy()
+        state.update(pool=None, shm=None, arrays={})
+        return state
+
+
+def array_views(buffer, layout):
+
+    arrays = {}
+    offset = 0
+
+    for key, shape in layout:
+        arrays[key] = np.ndarray(shape, dtype=np.float64, buffer=buffer, offset=offset)
+        offset += int(np.prod(shape)) * np.dtype(np.float64).itemsize
+
+    return arrays
+
+
+def init_worker(shm_name, layout, initializer, initargs):
+    global worker_state, worker_arrays, worker_shm
+
+    worker_shm = shared_memory.SharedMemory(name=shm_name)
+    worker_arrays = array_views(worker_shm.buf, layout)
+    worker_state = initializer(*initargs)
+
+
+def run_worker(input):
+
+    func, arg = input
+
+    return func(worker_state, worker_arrays, arg)
@@ -0,0 +1,253 @@
+'''
+Headless benchmark of MPC.control, no ir_sim needed.
+
+Sweep the receding horizon, the obstacle number, the process number and the iteration number on a synthetic
+scene, report the p50/p95/p99 latency of every phase, the setup time and the memory, and save the results as json.
+
+    python benchmark/benchmark.py                              # default sweep, results in benchmark/results
+    python benchmark/benchmark.py --receding 10 20 --obstacle_num 0 5 10 --process_num 1 4 --steps 50
+    python benchmark/benchmark.py --obstacle_num 2 4 --process_num 4 --executor thread   # the executor of the dual subproblems
+    python benchmark/benchmark.py --compare old.json new.json   # p50 ratio of the same cases
+'''
+
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from collections import namedtuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RDA_planner.mpc import MPC
+
+car = namedtuple('car', 'G h cone_type wheelbase max_speed max_acce')
+obs = namedtuple('obstacle', 'center radius vertex cone_type velocity')
+
+bench_path = os.path.dirname(os.path.abspath(__file__))
+ref_npy_path = os.path.join(bench_path, '..', 'example', 'path_track', 'path_track_ref.npy')
+
+
+def load_ref_path(npy_path=ref_npy_path):
+    # the list of 3*1 (x, y, theta) points, the path of the path_track example, or a synthetic s-curve if not found
+
+    if os.path.exists(npy_path):
+        return list(np.load(npy_path, allow_pickle=True))
+
+    return synthetic_ref_path()
+
+
+def synthetic_ref_path(length=60, step=0.5):
+
+    x = np.arange(0, length, step)
+    y = 3 * np.sin(x / 8)
+    theta = np.arctan2(np.gradient(y), np.gradient(x))
+
+    return [np.array([[px], [py], [pt]]) for px, py, pt in zip(x, y, theta)]
+
+
+def default_car():
+    # rectangle car 4.6 * 1.6, rear axle at the origin
+
+    G = np.array([[1, 0], [0, 1], [-1, 0], [0, -1]])
+    h = np.array([[3.8], [0.8], [0.8], [0.8]])
+
+    return car(G, h, 'Rpositive', 3, [10, 1], [10, 0.5])
+
+
+def synthetic_obstacles(ref_path, circle_num, polygon_num, seed=0):
+    # obstacles beside the reference path, 2-5 m off the path so that they are active but do not block it
+
+    rng = np.random.default_rng(seed)
+    obstacle_list = []
+
+    index_array = rng.integers(len(ref_path) // 10, len(ref_path), circle_num + polygon_num)
+
+    for n, index in enumerate(index_array):
+        point = ref_path[index]
+        side = rng.choice([-1, 1])
+        offset = rng.uniform(2, 5)
+
+        normal = np.array([[-np.sin(point[2, 0])], [np.cos(point[2, 0])]])
+        center = point[0:2] + side * offset * normal
+
+        if n < circle_num:
+            obstacle_list.append(obs(center, rng.uniform(0.5, 1.0), None, 'norm2', np.zeros((2, 1))))
+        else:
+            half = rng.uniform(0.5, 1.0, 2)
+            vertex = center + np.array([[-half[0], half[0], half[0], -half[0]], [-half[1], -half[1], half[1], half[1]]])
+            obstacle_list.append(obs(None, None, vertex, 'Rpositive', np.zeros((2, 1))))
+
+    return obstacle_list
+
+
+def max_rss():
+    # peak resident memory of this process in MB, ru_maxrss is KB on linux and B on mac
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024**2 if sys.platform == 'darwin' else rss / 1024
+
+
+def percentile(value_list):
+
+    if len(value_list) == 0:
+        return {}
+
+    p50, p95, p99 = np.percentile(value_list, [50, 95, 99])
+    return {'p50': p50, 'p95': p95, 'p99': p99, 'mean': float(np.mean(value_list)), 'max': float(np.max(value_list))}
+
+
+def run_case(ref_path, receding=10, obstacle_num=10, polygon_num=1, process_num=1, iter_num=2, steps=30, warmup=2, seed=0, **kwargs):
+
+    '''
+    run steps of MPC.control from the start of the reference path, the first warmup steps (compilation) are not counted
+
+    return the dict of the case result, setup_time is the construction and the first step, the problems are compiled at the first solve
+    '''
+
+    obstacle_list = synthetic_obstacles(ref_path, obstacle_num, polygon_num, seed)
+    obstacle_template_list = [{'edge_num': 3, 'obstacle_num': obstacle_num, 'cone_type': 'norm2'}, {'edge_num': 4, 'obstacle_num': polygon_num, 'cone_type': 'Rpositive'}]
+
+    record_list = []
+
+    gc.collect()
+    rss_start = max_rss()
+
+    start_time = time.perf_counter()
+    mpc = MPC(default_car(), ref_path, receding=receding, sample_time=0.1, iter_num=iter_num, process_num=process_num,
+              obstacle_template_list=obstacle_template_list, metrics_sink=record_list.append, **kwargs)
+    construct_time = time.perf_counter() - start_time
+
+    state = ref_path[0].copy()
+    first_time = None
+
+    try:
+        for step in range(steps + warmup):
+            start_time = time.perf_counter()
+            u, info = mpc.control(state, 4, obstacle_list)
+
+            if step == 0:
+                first_time = time.perf_counter() - start_time
+
+            state = mpc.motion_predict_model(state, u, mpc.L, mpc.dt)
+
+            if info['arrive']:
+                break
+    finally:
+        mpc.close()
+
+    record_list = record_list[warmup:]
+
+    phase_dict = {}
+    for record in record_list:
+        for name, value in record['timing'].items():
+            phase_dict.setdefault(name, []).append(value)
+
+    result = {
+        'case': {'receding': receding, 'obstacle_num': obstacle_num, 'polygon_num': polygon_num, 'process_num': process_num, 'iter_num': iter_num, **kwargs},
+        'steps': len(record_list),
+        'construct_time': construct_time,
+        'first_step_time': first_time,
+        'setup_time': construct_time + (first_time or 0),
+        'latency': {name: percentile(value_list) for name, value_list in phase_dict.items()},
+        'iteration_num': percentile([record['iteration_num'] for record in record_list]),
+        'max_rss_mb': max_rss(),
+        'rss_growth_mb': max_rss() - rss_start,
+        'final_state': state[:, 0].tolist(),
+    }
+
+    return result
+
+
+def case_name(case):
+    return ' '.join([key + '=' + str(value) for key, value in case.items()])
+
+
+def git_commit():
+
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=bench_path, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def sweep(receding_list, obstacle_num_list, process_num_list, iter_num_list, steps=30, **kwargs):
+
+    ref_path = load_ref_path()
+    result_list = []
+
+    for receding, obstacle_num, process_num, iter_num in itertools.product(receding_list, obstacle_num_list, process_num_list, iter_num_list):
+
+        result = run_case(ref_path, receding, obstacle_num, process_num=process_num, iter_num=iter_num, steps=steps, **kwargs)
+        result_list.append(result)
+
+        cycle = result['latency'].get('cycle', {})
+        print('{:<60} setup {:6.2f}s (first step {:6.2f}s)  p50 {:7.4f}s  p95 {:7.4f}s  p99 {:7.4f}s  rss {:7.1f}MB'.format(
+              case_name(result['case']), result['setup_time'], result['first_step_time'] or 0, cycle.get('p50', 0), cycle.get('p95', 0), cycle.get('p99', 0),
+              result['max_rss_mb']))
+
+    return result_list
+
+
+def compare(old_file, new_file, phase='cycle'):
+    # the p50 ratio new / old of the cases in both files
+
+    with open(old_file) as f:
+        old = {case_name(r['case']): r for r in json.load(f)['results']}
+
+    with open(new_file) as f:
+        new = {case_name(r['case']): r for r in json.load(f)['results']}
+
+    for name in new:
+        if name in old and phase in old[name]['latency'] and phase in new[name]['latency']:
+            old_p50 = old[name]['latency'][phase]['p50']
+            new_p50 = new[name]['latency'][phase]['p50']
+            print('{:<60} {:7.4f}s -> {:7.4f}s  x{:.2f}'.format(name, old_p50, new_p50, new_p50 / old_p50))
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Headless benchmark of the RDA planner')
+    parser.add_argument('--receding', type=int, nargs='+', default=[10, 20])
+    parser.add_argument('--obstacle_num', type=int, nargs='+', default=[0, 5, 10])
+    parser.add_argument('--polygon_num', type=int, default=1)
+    parser.add_argument('--process_num', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--iter_num', type=int, nargs='+', default=[2])
+    parser.add_argument('--steps', type=int, default=30)
+    parser.add_argument('--dual_backend', default='cvxpy')
+    parser.add_argument('--executor', default=None, help='serial, thread, process or shared_memory, see RDA_solver')
+    parser.add_argument('--chunk_size', type=int, default=None, help='the slots of each task of the executor')
+    parser.add_argument('--output', default=None, help='the json file of the results, default benchmark/results/<time>.json')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare the p50 latency of two result files')
+    args = parser.parse_args()
+
+    if args.compare is not None:
+        compare(*args.compare)
+        return
+
+    result_list = sweep(args.receding, args.obstacle_num, args.process_num, args.iter_num, steps=args.steps, polygon_num=args.polygon_num, dual_backend=args.dual_backend, 
+                        executor=args.executor, chunk_size=args.chunk_size)
+
+    output = args.output
+    if output is None:
+        os.makedirs(os.path.join(bench_path, 'results'), exist_ok=True)
+        output = os.path.join(bench_path, 'results', time.strftime('%Y%m%d_%H%M%S') + '.json')
+
+    meta = {'commit': git_commit(), 'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'python': platform.python_version(),
+            'machine': platform.machine(), 'cpu_count': os.cpu_count()}
+
+    with open(output, 'w') as f:
+        json.dump({'meta': meta, 'results': result_list}, f, indent=1, default=float)
+
+    print('results saved to', output)
+
+
+if __name__ == '__main__':
+    main()
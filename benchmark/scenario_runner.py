@@ -0,0 +1,369 @@
+'''
+Headless closed-loop scenario runner, no ir_sim needed.
+
+Run the scenarios of the examples (the robot, the obstacles and the reference path of the example yaml files) in closed loop:
+the robot is stepped by MPC.motion_predict_model and the obstacles are scripted from the yaml (the wander obstacles move to
+random goals in their range, seeded). The episodes of all the scenarios, parameter combinations and seeds are run by a process pool,
+and the result of every episode (success, collision, min clearance, the latency and the iteration number of every cycle) is appended
+to a json lines file as soon as it finishes. The yaml files are read by pyyaml, installed with the benchmark extra (pip install -e .[benchmark]).
+
+    python benchmark/scenario_runner.py                                    # path_track and dynamic_obs with the example parameters
+    python benchmark/scenario_runner.py --scenario path_track corridor --slack_gain 4 8 --ro1 100 200 --min_sd 0.1 0.5 --iter_num 2 4
+    python benchmark/scenario_runner.py --seed 0 1 2 --process_num 4 --output sweep.jsonl
+'''
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+import traceback
+from collections import namedtuple
+
+import numpy as np
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RDA_planner.mpc import MPC
+
+car = namedtuple('car', 'G h cone_type wheelbase max_speed max_acce')
+obs = namedtuple('obstacle', 'center radius vertex cone_type velocity')
+
+bench_path = os.path.dirname(os.path.abspath(__file__))
+example_path = os.path.join(bench_path, '..', 'example')
+
+# the settings of the example scripts: the yaml, the reference path, the reference speed and the MPC arguments
+SCENARIO_DICT = {
+    'path_track': {'yaml': 'path_track/path_track.yaml', 'ref_path': 'path_track/path_track_ref.npy', 'ref_speed': 4,
+                   'mpc': {'receding': 10, 'iter_num': 1, 'obstacle_order': True, 'ro1': 200,
+                           'obstacle_template_list': [{'edge_num': 3, 'obstacle_num': 10, 'cone_type': 'norm2'}, {'edge_num': 4, 'obstacle_num': 1, 'cone_type': 'Rpositive'}]}},
+    'dynamic_obs': {'yaml': 'dynamic_obs/dynamic_obs.yaml', 'ref_path': 'dynamic_obs/dynamic_obs.npy', 'ref_speed': 6,
+                    'mpc': {'receding': 10, 'iter_num': 3, 'obstacle_order': True, 'min_sd': 0.5, 'wu': 0.2,
+                            'obstacle_template_list': [{'edge_num': 3, 'obstacle_num': 4, 'cone_type': 'norm2'}, {'edge_num': 4, 'obstacle_num': 0, 'cone_type': 'Rpositive'}]}},
+    'corridor': {'yaml': 'corridor/corridor.yaml', 'ref_path': 'corridor', 'ref_speed': 4,
+                 'mpc': {'obstacle_template_list': [{'edge_num': 3, 'obstacle_num': 0, 'cone_type': 'norm2'}, {'edge_num': 4, 'obstacle_num': 6, 'cone_type': 'Rpositive'}]}},
+    'reverse': {'yaml': 'reverse/reverse.yaml', 'ref_path': 'reverse', 'ref_speed': 4,
+                'mpc': {'enable_reverse': True,
+                        'obstacle_template_list': [{'edge_num': 3, 'obstacle_num': 4, 'cone_type': 'norm2'}, {'edge_num': 4, 'obstacle_num': 3, 'cone_type': 'Rpositive'}]}},
+}
+
+# the swept parameters of MPC, None for the value of the scenario
+PARAMETER_LIST = ['slack_gain', 'ro1', 'min_sd', 'iter_num']
+
+
+class Scenario:
+    def __init__(self, name, seed=0) -> None:
+
+        '''
+        name: the key of SCENARIO_DICT
+        seed: the seed of the scripted obstacle motion
+
+        the robot: rectangle of the acker shape [length, width, wheelbase, ...], the origin at the rear axle;
+        the obstacles: obstacle_circle (center, radius), obstacle_polygon (vertices), obstacle_block (center, heading, [length, width]),
+                       obstacle_line (start point, heading, [length, width]), the first number of the manual states and shapes,
+                       the last shape repeated; dynamic wander: move to random goals in sport_range at vel.
+        '''
+
+        self.name = name
+        self.setting = SCENARIO_DICT[name]
+        self.rng = np.random.default_rng(seed)
+
+        with open(os.path.join(example_path, self.setting['yaml'])) as file:
+            config = yaml.safe_load(file)
+
+        self.step_time = config['world']['step_time']
+
+        robot = config['robots']
+        length, width, wheelbase = robot['shape'][0:3]
+        front, rear = (length + wheelbase) / 2, (length - wheelbase) / 2
+
+        G = np.array([[1, 0], [0, 1], [-1, 0], [0, -1]])
+        h = np.array([[front], [width/2], [rear], [width/2]])
+        self.car_tuple = car(G, h, 'Rpositive', wheelbase, [10, 1], [10, 0.5])
+        self.footprint = np.array([[front, -rear, -rear, front], [width/2, width/2, -width/2, -width/2]])
+
+        self.ref_path = self.load_ref_path(self.setting['ref_path'])
+        self.state = np.array(self.ref_path[0][0:3], dtype=float).reshape(3, 1) if self.setting['ref_path'] in ('corridor', 'reverse') else np.c_[robot['state'][0:3]].astype(float)
+
+        # circles: center (2, N), radius (N,); polygons: list of the vertex (2, n)
+        self.center, self.radius, self.velocity = np.zeros((2, 0)), np.zeros(0), np.zeros((2, 0))
+        self.wander_range, self.wander_vel, self.goal = None, 0, None
+        self.vertex_list = []
+
+        for obstacle in config.get('obstacles', []):
+            self.add_obstacle(obstacle)
+
+    def load_ref_path(self, ref_path):
+
+        if ref_path == 'corridor':
+            # the dubins curve of the example between (0, 20, 0) and (60, 20, 0), a straight line
+            x = np.arange(0, 60.05, 0.1)
+            return [np.array([[px], [20.0], [0.0]]) for px in x]
+
+        if ref_path == 'reverse':
+            from GCT.curve_generator import curve_generator
+
+            point_list = [np.array([[5], [40], [0]]), np.array([[5], [40], [0]]), np.array([[35], [11], [-3.14]]), np.array([[43.8], [11], [-3.14]])]
+            return curve_generator().generate_curve('reeds', point_list, 0.5, 5, include_gear=True)
+
+        return list(np.load(os.path.join(example_path, ref_path), allow_pickle=True))
+
+    def add_obstacle(self, obstacle):
+
+        number = obstacle.get('number', 0)
+        distribute = obstacle.get('distribute', {})
+        state_list = distribute.get('states', [])[0:number]
+        shape_list = distribute.get('shapes', [])
+        shape_list = [shape_list[min(n, len(shape_list)-1)] for n in range(len(state_list))]
+
+        if obstacle['type'] == 'obstacle_circle':
+            self.center = np.hstack((self.center, np.array(state_list, dtype=float)[:, 0:2].T))
+            self.radius = np.concatenate((self.radius, np.array(shape_list, dtype=float)))
+            self.velocity = np.hstack((self.velocity, np.zeros((2, len(state_list)))))
+
+            if 'dynamic' in obstacle and obstacle['dynamic'].get('sport') == 'wander':
+                self.wander_range = np.array(obstacle['dynamic']['sport_range'], dtype=float)
+                self.wander_vel = obstacle['dynamic'].get('vel', 1.0)
+                self.goal = self.random_goal(self.center.shape[1])
+
+        elif obstacle['type'] == 'obstacle_polygon':
+            self.vertex_list += [np.array(shape, dtype=float).T for shape in shape_list]
+
+        elif obstacle['type'] in ('obstacle_block', 'obstacle_line'):
+            for (x, y, theta), (length, width) in zip(state_list, shape_list):
+                start = -length/2 if obstacle['type'] == 'obstacle_block' else 0
+                rect = np.array([[start, start + length, start + length, start], [-width/2, -width/2, width/2, width/2]])
+                rot = np.array([[np.cos(theta), -np.sin(theta)], [np.sin(theta), np.cos(theta)]])
+                self.vertex_list.append(rot @ rect + np.c_[[x, y]])
+
+    def random_goal(self, num):
+        low, high = self.wander_range[0:2], self.wander_range[2:4]
+        return self.rng.uniform(low, high, (num, 2)).T
+
+    def step(self):
+        # move the wander obstacles toward their goals, new goals when reached
+
+        if self.goal is None:
+            return
+
+        diff = self.goal - self.center
+        dis = np.linalg.norm(diff, axis=0)
+
+        reach = dis < self.wander_vel * self.step_time
+        if np.any(reach):
+            self.goal[:, reach] = self.random_goal(np.count_nonzero(reach))
+            diff = self.goal - self.center
+            dis = np.linalg.norm(diff, axis=0)
+
+        self.velocity = self.wander_vel * diff / np.maximum(dis, 1e-9)
+        self.center = self.center + self.velocity * self.step_time
+
+    def obstacle_list(self):
+        # the obstacles of MPC.control
+
+        circle_list = [obs(self.center[:, n:n+1].copy(), self.radius[n], None, 'norm2', self.velocity[:, n:n+1].copy()) for n in range(len(self.radius))]
+        polygon_list = [obs(None, None, vertex, 'Rpositive', np.zeros((2, 1))) for vertex in self.vertex_list]
+
+        return circle_list + polygon_list
+
+    def clearance(self, state):
+        # the minimum distance from the robot footprint to the obstacles, negative for the penetration
+
+        rot = np.array([[np.cos(state[2, 0]), -np.sin(state[2, 0])], [np.sin(state[2, 0]), np.cos(state[2, 0])]])
+        footprint = rot @ self.footprint + state[0:2]
+
+        dis_list = [polygon_distance(footprint, self.center[:, n:n+1]) - self.radius[n] for n in range(len(self.radius))]
+        dis_list += [polygon_distance(footprint, vertex) for vertex in self.vertex_list]
+
+        return min(dis_list) if len(dis_list) > 0 else np.inf
+
+
+def polygon_distance(vertex1, vertex2):
+
+    '''
+    the distance between two convex polygons (or points), the vertices (2, n) in order;
+    negative if overlapping: the maximum separation along the edge normals (the penetration depth)
+    '''
+
+    separation = -np.inf
+
+    for vertex, other in ((vertex1, vertex2), (vertex2, vertex1)):
+        if vertex.shape[1] < 3:
+            continue
+
+        edge = np.roll(vertex, -1, axis=1) - vertex
+        normal = np.array([edge[1], -edge[0]]) / np.linalg.norm(edge, axis=0)
+        normal = normal * np.sign(np.sum(normal * (vertex - vertex.mean(axis=1, keepdims=True)), axis=0))
+
+        separation = max(separation, np.max(np.min(normal.T @ other, axis=1) - np.sum(normal * vertex, axis=0)))
+
+    if separation <= 0:
+        return separation
+
+    dis_list = [point_segment_distance(other, vertex) for vertex, other in ((vertex1, vertex2), (vertex2, vertex1)) if vertex.shape[1] > 1]
+
+    return min(dis_list)
+
+
+def point_segment_distance(point, vertex):
+    # the minimum distance from the points (2, m) to the closed polyline of the vertices (2, n)
+
+    start = vertex.T[:, np.newaxis, :]
+    seg = (np.roll(vertex, -1, axis=1) - vertex).T[:, np.newaxis, :]
+    diff = point.T[np.newaxis, :, :] - start
+
+    ratio = np.clip(np.sum(diff * seg, axis=2) / np.maximum(np.sum(seg**2, axis=2), 1e-12), 0, 1)
+
+    return np.min(np.linalg.norm(diff - ratio[:, :, np.newaxis] * seg, axis=2))
+
+
+def run_episode(task):
+
+    '''
+    task: (scenario name, the dict of the swept parameters, seed, max_steps)
+
+    return the dict of the episode result
+    '''
+
+    name, parameter_dict, seed, max_steps = task
+    result = {'scenario': name, 'parameter': parameter_dict, 'seed': seed}
+
+    try:
+        scenario = Scenario(name, seed)
+        record_list = []
+
+        mpc_kwargs = dict(scenario.setting['mpc'])
+        mpc_kwargs.update({key: value for key, value in parameter_dict.items() if value is not None})
+
+        start_time = time.perf_counter()
+        mpc = MPC(scenario.car_tuple, scenario.ref_path, sample_time=scenario.step_time, process_num=1, metrics_sink=record_list.append, **mpc_kwargs)
+        setup_time = time.perf_counter() - start_time
+
+        state = scenario.state
+        clearance_list = [scenario.clearance(state)]
+        arrive = False
+
+        try:
+            for step in range(max_steps):
+                u, info = mpc.control(state, scenario.setting['ref_speed'], scenario.obstacle_list())
+
+                state = mpc.motion_predict_model(state, u, mpc.L, mpc.dt)
+                scenario.step()
+                clearance_list.append(scenario.clearance(state))
+
+                if clearance_list[-1] < 0 or info['arrive']:
+                    arrive = info['arrive']
+                    break
+        finally:
+            mpc.close()
+
+        min_clearance = float(np.min(clearance_list))
+
+        result.update({
+            'success': bool(arrive and min_clearance >= 0),
+            'arrive': bool(arrive),
+            'collision': bool(min_clearance < 0),
+            'steps': len(record_list),
+            'min_clearance': min_clearance,
+            'setup_time': setup_time,
+            'cycle_time': [record['timing'].get('cycle', 0) for record in record_list],
+            'iteration_num': [record['iteration_num'] for record in record_list],
+            'final_state': state[:, 0].tolist(),
+        })
+
+    except Exception:
+        result.update({'success': False, 'error': traceback.format_exc()})
+
+    return result
+
+
+def task_list(scenario_list, parameter_dict, seed_list, max_steps):
+    # the product of the scenarios, the parameter values and the seeds
+
+    key_list = list(parameter_dict)
+    value_product = itertools.product(*[parameter_dict[key] for key in key_list])
+
+    return [(name, dict(zip(key_list, value)), seed, max_steps) for value in value_product for name in scenario_list for seed in seed_list]
+
+
+def run(tasks, output, process_num=4):
+
+    '''
+    run the episodes in a process pool, each result appended to the output json lines file as it finishes
+
+    return the list of the results, in the finishing order
+    '''
+
+    from pathos.multiprocessing import Pool
+
+    result_list = []
+
+    with open(output, 'a') as file:
+
+        if process_num > 1:
+            pool = Pool(processes=process_num)
+            result_iter = pool.imap_unordered(run_episode, tasks)
+        else:
+            pool = None
+            result_iter = map(run_episode, tasks)
+
+        try:
+            for result in result_iter:
+                file.write(json.dumps(result, default=float) + '\n')
+                file.flush()
+
+                result_list.append(result)
+                print(summary(result))
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+    return result_list
+
+
+def summary(result):
+
+    if 'error' in result:
+        return '{:<12} {} seed={}  error: {}'.format(result['scenario'], result['parameter'], result['seed'], result['error'].strip().splitlines()[-1])
+
+    cycle_time = result['cycle_time'] if len(result['cycle_time']) > 0 else [0]
+
+    return '{:<12} {} seed={}  success {!s:<5} steps {:4d}  min clear {:6.3f}  p50 {:7.4f}s  max {:7.4f}s  iter {:.2f}'.format(
+           result['scenario'], result['parameter'], result['seed'], result['success'], result['steps'], result['min_clearance'],
+           np.median(cycle_time), np.max(cycle_time), np.mean(result['iteration_num']) if len(result['iteration_num']) > 0 else 0)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description='Headless closed-loop scenario runner of the RDA planner')
+    parser.add_argument('--scenario', nargs='+', default=['path_track', 'dynamic_obs'], choices=list(SCENARIO_DICT))
+    parser.add_argument('--slack_gain', type=float, nargs='+', default=[None])
+    parser.add_argument('--ro1', type=float, nargs='+', default=[None])
+    parser.add_argument('--min_sd', type=float, nargs='+', default=[None])
+    parser.add_argument('--iter_num', type=int, nargs='+', default=[None])
+    parser.add_argument('--seed', type=int, nargs='+', default=[0])
+    parser.add_argument('--max_steps', type=int, default=500)
+    parser.add_argument('--process_num', type=int, default=4, help='the number of the episodes run at the same time')
+    parser.add_argument('--output', default=None, help='the json lines file the results are appended to, default benchmark/results/scenario_<time>.jsonl')
+    args = parser.parse_args()
+
+    parameter_dict = {key: getattr(args, key) for key in PARAMETER_LIST}
+    tasks = task_list(args.scenario, parameter_dict, args.seed, args.max_steps)
+
+    output = args.output
+    if output is None:
+        os.makedirs(os.path.join(bench_path, 'results'), exist_ok=True)
+        output = os.path.join(bench_path, 'results', 'scenario_' + time.strftime('%Y%m%d_%H%M%S') + '.jsonl')
+
+    print(len(tasks), 'episodes, results appended to', output)
+
+    result_list = run(tasks, output, args.process_num)
+
+    print('success {}/{}'.format(sum([result['success'] for result in result_list]), len(result_list)))
+
+
+if __name__ == '__main__':
+    main()
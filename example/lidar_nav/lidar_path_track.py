@@ -3,12 +3,8 @@ import sys
 import numpy as np
 from RDA_planner.mpc import MPC
 from collections import namedtuple
+from RDA_planner.lidar import LidarObstacle
 import time
-from scipy.spatial import ConvexHull, convex_hull_plot_2d
-import cv2
-import matplotlib.pyplot as plt
-from sklearn.cluster import DBSCAN
-# from pyhull.convex_hull import ConvexHull
 
 # environment
 env = EnvBase('lidar_path_track.yaml', save_ani=False, display=True, full=False)
@@ -21,50 +17,9 @@ ref_path_list = list(np.load(npy_path, allow_pickle=True))
 env.draw_trajectory(ref_path_list, traj_type='-k') # plot path
 
 
-def scan_box(state, scan_data):
+# one box for each cluster of the scan points, the rdaobs for rda_solver directly
+lidar_obstacle = LidarObstacle(eps=2.0, min_points=6, shape='box')
 
-    ranges = np.array(scan_data['ranges'])
-    angles = np.linspace(scan_data['angle_min'], scan_data['angle_max'], len(ranges))
-
-    point_list = []
-    obstacle_list = []
-
-    for i in range(len(ranges)):
-        scan_range = ranges[i]
-        angle = angles[i]
-
-        if scan_range < ( scan_data['range_max'] - 0.01):
-            point = np.array([ [scan_range * np.cos(angle)], [scan_range * np.sin(angle)]  ])
-            point_list.append(point)
-
-    if len(point_list) < 4:
-        return obstacle_list
-
-    else:
-        point_array = np.hstack(point_list).T
-        labels = DBSCAN(eps=2.0, min_samples=6).fit_predict(point_array)
-
-        for label in labels:
-            if label == -1:
-                continue
-            else:
-                point_array2 = point_array[labels == label]
-                rect = cv2.minAreaRect(point_array2.astype(np.float32))
-                box = cv2.boxPoints(rect)
-
-                vertices = box.T
-
-                trans = state[0:2]
-                rot = state[2, 0]
-                R = np.array([[np.cos(rot), -np.sin(rot)], [np.sin(rot), np.cos(rot)]])
-                global_vertices = trans + R @ vertices
-
-                obstacle_list.append(obs(None, None, global_vertices, 'Rpositive', 0))
-
-        return obstacle_list
-
-
-        # obs_list : obstacle: (center, radius, vertex, cone_type, velocity)
 
 def main():
     
@@ -73,14 +28,14 @@ def main():
     
     obstacle_template_list = [{'edge_num': 3, 'obstacle_num': 0, 'cone_type': 'norm2'}, {'edge_num': 4, 'obstacle_num': 3, 'cone_type': 'Rpositive'}] # define the number of obstacles in advance
 
-    mpc_opt = MPC(car_tuple, ref_path_list, receding=10, sample_time=env.step_time, process_num=5, iter_num=5, obstacle_template_list=obstacle_template_list, obstacle_order=True, wu=0.5, slack_gain=5)
+    mpc_opt = MPC(car_tuple, ref_path_list, receding=10, sample_time=env.step_time, process_num=5, iter_num=5, obstacle_template_list=obstacle_template_list, obstacle_order=True, rda_obstacle=True, wu=0.5, slack_gain=5)
     
     for i in range(500):   
         
         obs_list_ref = env.get_obstacle_list()
         scan_data = env.get_lidar_scan()
-        # obs_list : obstacle: (center, radius, vertex, cone_type, velocity)
-        obs_list = scan_box(env.robot.state, scan_data)
+        # obs_list : rdaobs: (A, b, cone_type, center, vertex, id), the closest first
+        obs_list = lidar_obstacle(env.robot.state, scan_data)
 
         for obs in obs_list:
             env.draw_box(obs.vertex, refresh=True)
@@ -8,10 +8,14 @@ setup(
     install_requires=[
         'cvxpy',
         'numpy',
+        'scipy',
         'pathos',
         'ir_sim==1.1.9',
         'matplotlib'
     ],
+    extras_require={
+        'benchmark': ['pyyaml']
+    },
     description="The source code of optimization based RDA motion planner",
     author="Han Ruihua"
 )
\ No newline at end of file
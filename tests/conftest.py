@@ -0,0 +1,115 @@
+'''
+Test scene
+A fixed small scene for the checks: a rectangle car on a straight reference path, two circles and one box near the path,
+and the path of the path track example with the scalar reference of its sampling
+'''
+
+import os
+import sys
+from collections import namedtuple
+from math import sqrt
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from RDA_planner.mpc import MPC
+
+car = namedtuple('car', 'G h cone_type wheelbase max_speed max_acce')
+obs = namedtuple('obstacle', 'center radius vertex cone_type velocity')
+
+car_tuple = car(np.array([[1, 0], [0, 1], [-1, 0], [0, -1]]), np.array([[3.5], [1], [0.5], [1]]), 'Rpositive', 3, [10, 1], [10, 0.5])
+ref_path = [np.array([[x], [0.0], [0.0]]) for x in np.arange(0, 30, 0.5)]
+
+obstacle_list = [obs(np.array([[8.0], [2.2]]), 1.0, None, 'norm2', np.zeros((2, 1))),
+                 obs(np.array([[12.0], [-2.5]]), 1.0, None, 'norm2', np.zeros((2, 1))),
+                 obs(None, None, np.array([[16, 18, 18, 16], [1.8, 1.8, 3.5, 3.5]], dtype=float), 'Rpositive', np.zeros((2, 1)))]
+
+obstacle_template_list = [{'edge_num': 3, 'obstacle_num': 2, 'cone_type': 'norm2'}, {'edge_num': 4, 'obstacle_num': 1, 'cone_type': 'Rpositive'}]
+
+
+def make_mpc(**kwargs):
+    setting = dict(receding=10, iter_num=2, process_num=1, obstacle_template_list=obstacle_template_list)
+    setting.update(kwargs)
+
+    return MPC(car_tuple, ref_path, **setting)
+
+
+def run_steps(mpc, steps, ref_speed=4):
+    # closed loop by the motion model, return the states, the commands and the infos
+
+    state = ref_path[0].copy()
+    state_list, u_list, info_list = [state], [], []
+
+    for _ in range(steps):
+        u, info = mpc.control(state, ref_speed, obstacle_list)
+        state = mpc.motion_predict_model(state, u, mpc.L, mpc.dt)
+
+        state_list.append(state)
+        u_list.append(u)
+        info_list.append(info)
+
+    return state_list, u_list, info_list
+
+
+example_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'example')
+
+
+def load_path():
+    return list(np.load(os.path.join(example_path, 'path_track', 'path_track_ref.npy'), allow_pickle=True))
+
+
+def scalar_wraptopi(radian):
+    while radian > np.pi:
+        radian = radian - 2 * np.pi
+    while radian < -np.pi:
+        radian = radian + 2 * np.pi
+
+    return radian
+
+
+def scalar_sample(ref_path, index, length, num):
+    # the reference of ReferencePath.sample: step along the path by the circle-segment intersection, as the original pre_process
+
+    traj_point = np.copy(ref_path[index])
+    sample_list = [traj_point]
+
+    for _ in range(num - 1):
+        circle = traj_point[0:2, 0]
+        traj_point = np.copy(traj_point)
+
+        while True:
+            if index + 1 > len(ref_path) - 1:
+                traj_point = np.copy(ref_path[-1])
+                traj_point[2, 0] = scalar_wraptopi(traj_point[2, 0])
+                break
+
+            start, end = ref_path[index][0:2, 0], ref_path[index+1][0:2, 0]
+            d, f = end - start, start - circle
+            a, b, c = d @ d, 2 * f @ d, f @ f - length**2
+            discriminant = b**2 - 4 * a * c
+            t = (-b + sqrt(discriminant)) / (2 * a) if a > 0 and discriminant >= 0 else -1
+
+            if 0 <= t <= 1:
+                diff = scalar_wraptopi(ref_path[index+1][2, 0] - ref_path[index][2, 0])
+                traj_point[0:2, 0] = start + t * d
+                traj_point[2, 0] = scalar_wraptopi(ref_path[index][2, 0] + diff / 2)
+                break
+
+            index += 1
+
+        sample_list.append(traj_point)
+
+    return np.hstack(sample_list)
+
+
+@pytest.fixture
+def warm_mpc():
+    # the cvxpy solver after a few steps, the duals warm and the obstacles active
+    mpc = make_mpc()
+    run_steps(mpc, 5)
+
+    yield mpc
+
+    mpc.close()
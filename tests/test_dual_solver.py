@@ -0,0 +1,89 @@
+import numpy as np
+
+from RDA_planner.dual_solver import DualSolverNumpy
+from RDA_planner.executor import SerialExecutor
+from conftest import car_tuple, make_mpc, run_steps
+
+
+def LamMuZ_objective(rda, obs_index, lam, mu, z):
+    # the cost of the LamMuZ problem of the slot and the max norm of obsA_t.T @ lam_t
+
+    T = rda.T
+    para_obs = rda.para_obstacle_list[obs_index]
+    edge_num = para_obs['edge_num']
+
+    A = para_obs['A'].value.reshape(T+1, edge_num, 2)[1:]
+    A_rot = rda.para_obsA_rot_list[obs_index].value.reshape(T+1, edge_num, 2)[1:]
+    trans = (rda.para_obsA_trans_list[obs_index].value - para_obs['b'].value).reshape(T+1, edge_num)[1:]
+
+    Hm = mu[:, 1:].T @ car_tuple.G + np.einsum('et,tei->ti', lam[:, 1:], A_rot) + rda.para_xi_list[obs_index].value[1:]
+    Im = np.einsum('et,te->t', lam[:, 1:], trans) - (mu[:, 1:].T @ car_tuple.h)[:, 0] - rda.para_dis.value[0] - z[0] + rda.para_zeta_list[obs_index].value[0]
+
+    cost = 0.5 * np.sum(np.minimum(Im, 0)**2) + 0.5 * rda.ro2.value * np.sum(Hm**2)
+    norm = np.max(np.linalg.norm(np.einsum('et,tei->ti', lam[:, 1:], A), axis=1))
+
+    return cost, Hm, norm
+
+
+def solve_numpy(rda, iter_num):
+    rda.dual_solver = DualSolverNumpy(car_tuple.G, car_tuple.h, car_tuple.cone_type, iter_num=iter_num)
+    return rda.solve_numpy()
+
+
+def test_numpy_matches_ecos(warm_mpc):
+
+    rda = warm_mpc.rda
+    rda.update_index_list = list(rda.active_index_list)
+
+    assert len(rda.update_index_list) == 3
+
+    ecos_list = rda.solve_pool(SerialExecutor())
+    numpy_list = solve_numpy(rda, 20)
+
+    for obs_index, ecos, numpy in zip(rda.update_index_list, ecos_list, numpy_list):
+        ecos_cost, ecos_Hm, _ = LamMuZ_objective(rda, obs_index, *ecos[0:3])
+        numpy_cost, numpy_Hm, numpy_norm = LamMuZ_objective(rda, obs_index, *numpy[0:3])
+
+        # both optimal, Hm is unique at the optimum
+        assert ecos_cost < 1e-10 and numpy_cost < 1e-10
+        assert np.allclose(numpy_Hm, ecos_Hm, atol=1e-6)
+        assert numpy_norm <= 1 + 1e-9
+
+        # the optimal set is not a point, both are interior points of it: z away from 0 as ECOS, not the corner z = 0
+        assert np.all(numpy[2] > 0.5 * ecos[2])
+
+
+def test_numpy_independent_of_iter_num(warm_mpc):
+
+    rda = warm_mpc.rda
+    rda.update_index_list = list(rda.active_index_list)
+
+    short_list = solve_numpy(rda, 20)
+    long_list = solve_numpy(rda, 200)
+
+    for short, long in zip(short_list, long_list):
+        for short_value, long_value in zip(short[0:3], long[0:3]):
+            assert np.allclose(short_value, long_value, atol=1e-4)
+
+
+def test_numpy_closed_loop_matches_ecos():
+
+    result_dict = {}
+
+    for dual_backend in ('cvxpy', 'numpy'):
+        mpc = make_mpc(dual_backend=dual_backend)
+
+        try:
+            state_list, _, info_list = run_steps(mpc, 40)
+        finally:
+            mpc.close()
+
+        result_dict[dual_backend] = (state_list[-1], info_list[-1]['dis'])
+
+    # past all the obstacles, the same final state and safety distances, not the crawl at dis = min_sd
+    ecos_state, ecos_dis = result_dict['cvxpy']
+    numpy_state, numpy_dis = result_dict['numpy']
+
+    assert ecos_state[0, 0] > 12
+    assert np.allclose(numpy_state, ecos_state, atol=0.2)
+    assert np.allclose(numpy_dis, ecos_dis, atol=0.15)
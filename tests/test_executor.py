@@ -0,0 +1,43 @@
+import numpy as np
+
+from RDA_planner.executor import SerialExecutor, ThreadExecutor
+from conftest import make_mpc, run_steps
+
+
+def test_executors_match_serial():
+
+    # the process executor of the solver, its problem cache shared with the workers
+    mpc = make_mpc(executor='process', process_num=2)
+
+    try:
+        state_list, _, _ = run_steps(mpc, 5)
+
+        rda = mpc.rda
+        rda.update_index_list = list(rda.active_index_list)
+
+        serial_list = rda.solve_pool(SerialExecutor())
+        assert len(serial_list) == 3
+
+        with ThreadExecutor(2) as executor:
+            thread_list = rda.solve_pool(executor)
+
+        result_dict = {'thread': thread_list}
+
+        for chunk_size in [None, 1]:
+            rda.chunk_size = chunk_size
+            result_dict['process', chunk_size] = rda.solve_pool(rda.executor)
+
+        for result_list in result_dict.values():
+            for serial, result in zip(serial_list, result_list):
+                for serial_value, value in zip(serial[0:3], result[0:3]):
+                    assert np.array_equal(serial_value, value)
+
+    finally:
+        mpc.close()
+
+    # the same closed loop as the serial solver
+    serial_mpc = make_mpc()
+    serial_state_list, _, _ = run_steps(serial_mpc, 5)
+    serial_mpc.close()
+
+    assert np.allclose(np.hstack(state_list), np.hstack(serial_state_list), atol=1e-9)
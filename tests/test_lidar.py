@@ -0,0 +1,63 @@
+import numpy as np
+
+from RDA_planner.lidar import LidarObstacle
+
+
+def circle_scan(state, circle_list, beam_num=360, range_max=10):
+    # the ranges of a 360 degrees scan of the circles (x, y, r) in the world frame from the pose state
+
+    angles = np.linspace(-np.pi, np.pi, beam_num)
+    ranges = np.full(beam_num, float(range_max))
+
+    for x, y, r in circle_list:
+        offset = np.array([x - state[0, 0], y - state[1, 0]])
+        direction = np.vstack((np.cos(angles + state[2, 0]), np.sin(angles + state[2, 0])))
+
+        proj = offset @ direction
+        disc = proj**2 - (offset @ offset - r**2)
+        hit = (disc >= 0) & (proj > 0)
+
+        ranges[hit] = np.minimum(ranges[hit], proj[hit] - np.sqrt(disc[hit]))
+
+    return {'ranges': ranges, 'angle_min': -np.pi, 'angle_max': np.pi, 'range_max': range_max}
+
+
+def scalar_scan_points(scan_data):
+    # the reference of LidarObstacle.scan_points, the loop of the original example
+
+    ranges = np.array(scan_data['ranges'])
+    angles = np.linspace(scan_data['angle_min'], scan_data['angle_max'], len(ranges))
+
+    point_list = [[r * np.cos(a), r * np.sin(a)] for r, a in zip(ranges, angles) if r < scan_data['range_max'] - 0.01]
+
+    return np.array(point_list).T
+
+
+def test_scan_points_match_scalar():
+
+    scan_data = circle_scan(np.zeros((3, 1)), [(3, 1, 0.5), (-2, -4, 1)])
+    points, _ = LidarObstacle().scan_points(scan_data)
+
+    assert np.allclose(points, scalar_scan_points(scan_data))
+
+
+def test_ids_kept_across_scans():
+
+    lidar = LidarObstacle(eps=0.5, min_points=3)
+    circle_list = [(3, 1, 0.5), (-2, -4, 1)]
+
+    first = lidar(np.zeros((3, 1)), circle_scan(np.zeros((3, 1)), circle_list))
+    first_id = {round(np.mean(obs.vertex[0])): obs.id for obs in first}
+
+    assert len(first) == 2 and len(set(first_id.values())) == 2
+
+    # the robot moved and turned, the obstacles moved a little, one new obstacle
+    state = np.array([[0.3], [0.2], [0.5]])
+    second = lidar(state, circle_scan(state, [(3.2, 1, 0.5), (-2, -3.9, 1), (0, 5, 0.5)]))
+    second_id = {round(np.mean(obs.vertex[0])): obs.id for obs in second}
+
+    assert len(second) == 3
+    assert second_id[3] == first_id[3] and second_id[-2] == first_id[-2]
+    assert second_id[0] not in first_id.values()
+
+    assert all(obs.id is None for obs in LidarObstacle(match_dis=None)(state, circle_scan(state, circle_list)))
@@ -0,0 +1,71 @@
+import numpy as np
+
+from RDA_planner.path import wraptopi
+from conftest import make_mpc, load_path, scalar_sample
+
+
+def loop_path():
+    # a circle of radius 5 driven twice, the second pass over the first one
+    angle = np.linspace(0, 4 * np.pi, 201)
+    return np.column_stack((5 * np.cos(angle), 5 * np.sin(angle), angle + np.pi / 2))
+
+
+def test_relocalize_opt_in():
+
+    mpc = make_mpc()
+    path = loop_path()
+
+    # the robot at the start of the path is also at the start of the second pass
+    state = np.array([[6.0], [0.0], [np.pi / 2]])
+
+    mpc.update_ref_path(path)
+    mpc.relocalize_dis = None
+    _, index = mpc.closest_point(state, mpc.ref_path, 0)
+    assert index < 10
+
+    # the robot pushed off the path, the window of the current index is far
+    state = np.array([[-5.0], [0.5], [0.0]])
+    _, index = mpc.closest_point(state, mpc.ref_path, 0)
+    assert index < 10
+
+    mpc.relocalize_dis = 2.0
+    _, index = mpc.closest_point(state, mpc.ref_path, 0)
+    assert np.hypot(*(path[index, 0:2] - state[0:2, 0])) < 1
+
+    mpc.close()
+
+
+def test_pre_process_matches_scalar():
+
+    mpc = make_mpc()
+    point_list = load_path()
+    mpc.update_ref_path(point_list)
+
+    rng = np.random.default_rng(0)
+    heading_diff = []
+
+    for _ in range(20):
+        index = rng.integers(0, len(point_list) - 20)
+        state = point_list[index] + rng.normal(scale=[[0.2], [0.2], [0.1]])
+        mpc.cur_vel_array = np.vstack((rng.uniform(0, 4, mpc.receding), rng.uniform(-0.5, 0.5, mpc.receding)))
+
+        state_pre_array, ref_traj_list, min_index = mpc.pre_process(state, mpc.ref_path, index, 4)
+
+        # the loop of the original pre_process: one motion model step and one circle-segment step per time step
+        state_list = [state]
+        for t in range(mpc.receding):
+            state_list.append(mpc.motion_predict_model(state_list[-1], mpc.cur_vel_array[:, t:t+1], mpc.L, mpc.dt))
+
+        reference = scalar_sample(point_list, min_index, 4 * mpc.dt, mpc.receding + 1)
+        ref_array = np.hstack(ref_traj_list)
+
+        assert np.allclose(state_pre_array, np.hstack(state_list), atol=1e-12)
+        assert np.max(np.abs(ref_array[0:2] - reference[0:2])) < 0.02
+
+        # the reference headings are unwrapped to the predicted ones
+        assert np.all(np.abs(ref_array[2] - state_pre_array[2]) <= np.pi)
+        heading_diff.append(np.abs(wraptopi(ref_array[2] - reference[2])))
+
+    assert np.mean(np.concatenate(heading_diff) < 1e-9) > 0.9
+
+    mpc.close()
@@ -0,0 +1,66 @@
+import numpy as np
+
+from conftest import make_mpc, obs
+
+
+def scalar_polygon(vertex):
+    # the reference of gen_inequal_batch, the loop of the original gen_inequal_global
+
+    point_num = vertex.shape[1]
+    temp_vertex = np.c_[vertex, vertex[0:2, 0]]
+    A, b = np.zeros((point_num, 2)), np.zeros((point_num, 1))
+
+    for i in range(point_num):
+        diff = temp_vertex[0:2, i+1] - temp_vertex[0:2, i]
+        A[i] = [diff[1], -diff[0]]
+        b[i, 0] = diff[1] * temp_vertex[0, i] - diff[0] * temp_vertex[1, i]
+
+    return A, b
+
+
+def scalar_convert(obstacle, receding, dt):
+    # the reference of convert_rda_obstacle, the original per obstacle conversion: A, b of one step if static, else the list of the steps
+
+    velocity = np.zeros((2, 1)) if obstacle.velocity is None or np.size(obstacle.velocity) < 2 else np.reshape(obstacle.velocity, (2, 1))
+    step_list = [0] if np.linalg.norm(velocity) <= 0.01 else range(receding + 1)
+    A_list, b_list = [], []
+
+    for t in step_list:
+        if obstacle.cone_type == 'norm2':
+            A_list.append(np.array([[1, 0], [0, 1], [0, 0]]))
+            b_list.append(np.vstack((obstacle.center[0:2] + velocity * t * dt, [[-obstacle.radius]])))
+        else:
+            A, b = scalar_polygon(obstacle.vertex + velocity * t * dt)
+            A_list.append(A)
+            b_list.append(b)
+
+    if len(step_list) == 1:
+        return A_list[0], b_list[0]
+
+    return np.array(A_list), np.array(b_list)
+
+
+def test_convert_matches_scalar():
+
+    mpc = make_mpc()
+    square = np.array([[1, 2, 2, 1], [1, 1, 2, 2]], dtype=float)
+    triangle = np.array([[4, 6, 5], [0, 0, 2]], dtype=float)
+
+    obstacle_list = [obs(np.array([[3.0], [1.0]]), 0.5, None, 'norm2', np.zeros((2, 1))),
+                     obs(np.array([[3.0], [-1.0]]), 0.8, None, 'norm2', np.array([[0.5], [-0.2]])),
+                     obs(np.array([[5.0], [2.0]]), 0.3, None, 'norm2', 0),
+                     obs(None, None, square, 'Rpositive', np.array([[1.0], [0.0]])),
+                     obs(None, None, square + 3, 'Rpositive', None),
+                     obs(None, None, triangle, 'Rpositive', np.zeros(2))]
+
+    rda_obs_list = mpc.convert_rda_obstacle(obstacle_list)
+
+    assert len(rda_obs_list) == len(obstacle_list)
+
+    for obstacle, rda_obs in zip(obstacle_list, rda_obs_list):
+        A, b = scalar_convert(obstacle, mpc.receding, mpc.dt)
+
+        assert np.allclose(rda_obs.A, A, atol=1e-12) and np.allclose(rda_obs.b, b, atol=1e-12)
+        assert rda_obs.cone_type == obstacle.cone_type
+
+    mpc.close()
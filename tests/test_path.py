@@ -0,0 +1,125 @@
+import numpy as np
+
+from RDA_planner.path import ReferencePath, wraptopi
+from RDA_planner.kinematics import Kinematics
+from conftest import load_path, scalar_wraptopi, scalar_sample
+
+
+def test_sample_matches_scalar():
+
+    point_list = load_path()
+    ref_path = ReferencePath(point_list)
+    max_turn = np.max(np.abs(wraptopi(np.diff(ref_path.array[:, 2]))))
+
+    heading_diff = []
+
+    for index in range(0, len(point_list) - 5, 7):
+        sample = ref_path.sample(index, 0.4, 11)
+        reference = scalar_sample(point_list, index, 0.4, 11)
+
+        # the arc length steps differ from the chord steps only on the curves
+        assert np.max(np.abs(sample[0:2] - reference[0:2])) < 0.02
+        heading_diff.append(np.abs(wraptopi(sample[2] - reference[2])))
+
+    # the same segment heading, except the samples near a waypoint on the curves falling on the other segment
+    heading_diff = np.concatenate(heading_diff)
+
+    assert np.mean(heading_diff < 1e-9) > 0.9
+    assert np.max(heading_diff) <= max_turn + 1e-9
+
+
+def test_wraptopi_matches_scalar():
+
+    radian = np.linspace(-20, 20, 1001)
+
+    assert np.allclose(np.cos(wraptopi(radian)), np.cos(radian))
+    assert np.allclose(wraptopi(radian), [scalar_wraptopi(r) for r in radian])
+
+
+def test_rollout_matches_step():
+
+    rng = np.random.default_rng(0)
+
+    for name in ['ackermann', 'diff', 'omni']:
+        kinematics = Kinematics(name, 3)
+        state = rng.normal(size=(3, 1))
+        vel_array = rng.normal(size=(2, 10))
+
+        state_list = [state]
+        for t in range(10):
+            state_list.append(kinematics.step(state_list[-1], vel_array[:, t:t+1], 0.1, 3))
+
+        assert np.allclose(kinematics.rollout(state, vel_array, 0.1, 3), np.hstack(state_list), atol=1e-12)
+
+
+def scalar_closest_point(point, point_list, start_index, threshold=0.1, index_range=10):
+    # the reference of ReferencePath.closest_point, the loop of the original MPC.closest_point
+
+    min_dis, min_index = np.inf, start_index
+
+    for i, waypoint in enumerate(point_list[start_index:start_index+index_range]):
+        dis = np.hypot(point[0] - waypoint[0, 0], point[1] - waypoint[1, 0])
+
+        if dis < min_dis:
+            min_dis, min_index = dis, start_index + i
+
+            if dis < threshold:
+                break
+
+    return min_dis, min_index
+
+
+def test_closest_point_matches_scalar():
+
+    point_list = load_path()
+    ref_path = ReferencePath(point_list)
+    rng = np.random.default_rng(0)
+
+    for _ in range(500):
+        start_index = rng.integers(0, len(point_list))
+        point = point_list[min(start_index + rng.integers(0, 5), len(point_list) - 1)][0:2, 0] + rng.normal(scale=0.3, size=2)
+
+        dis, index = ref_path.closest_point(point, start_index)
+        scalar_dis, scalar_index = scalar_closest_point(point, point_list, start_index)
+
+        assert index == scalar_index and np.isclose(dis, scalar_dis)
+
+
+def test_legacy_formats():
+
+    point_list = load_path()
+    ref_path = ReferencePath(point_list)
+
+    assert np.array_equal(ReferencePath(np.array(point_list)).array, ref_path.array)
+    assert np.array_equal(ReferencePath(np.hstack(point_list).T).array, ref_path.array)
+    assert np.array_equal(ref_path.array[:, 3], np.ones(len(point_list)))
+
+    for index in [0, 10, len(point_list) - 1]:
+        assert np.array_equal(ref_path[index][0:3], point_list[index])
+
+
+def scalar_linear_ackermann(nom_state, nom_u, dt, L):
+    # the reference of Kinematics.linearize, the one step model of the original RDASolver.linear_ackermann_model
+
+    phi, v, psi = nom_state[2, 0], nom_u[0, 0], nom_u[1, 0]
+
+    A = np.array([ [1, 0, -v * dt * np.sin(phi)], [0, 1, v * dt * np.cos(phi)], [0, 0, 1] ])
+    B = np.array([ [np.cos(phi)*dt, 0], [np.sin(phi)*dt, 0], [ np.tan(psi)*dt / L, v*dt/(L * (np.cos(psi))**2 ) ] ])
+    C = np.array([ [ phi*v*np.sin(phi)*dt ], [ -phi*v*np.cos(phi)*dt ], [ -psi * v*dt / ( L * (np.cos(psi))**2) ] ])
+
+    return A, B, C
+
+
+def test_linearize_matches_scalar():
+
+    rng = np.random.default_rng(0)
+    nom_s, nom_u = rng.normal(size=(3, 10)), rng.normal(scale=0.3, size=(2, 10))
+
+    A, B, C = Kinematics('ackermann', 3).linearize(nom_s, nom_u, 0.1)
+
+    for t in range(10):
+        scalar_A, scalar_B, scalar_C = scalar_linear_ackermann(nom_s[:, t:t+1], nom_u[:, t:t+1], 0.1, 3)
+
+        assert np.allclose(A[t], scalar_A, rtol=0, atol=1e-14)
+        assert np.allclose(B[t], scalar_B, rtol=0, atol=1e-14)
+        assert np.allclose(C[t], scalar_C, rtol=0, atol=1e-14)
@@ -0,0 +1,32 @@
+import os
+import time
+
+import numpy as np
+
+from RDA_planner.problem_cache import ProblemCache, package_source_digest
+
+
+def test_key_has_package_source(tmp_path):
+
+    cache = ProblemCache(str(tmp_path), 'key')
+
+    assert package_source_digest() in cache.key
+    assert cache.path('su') != ProblemCache(str(tmp_path), 'other key').path('su')
+
+
+def test_prune_least_recently_used(tmp_path):
+
+    cache = ProblemCache(str(tmp_path), 'key', max_entries=3)
+
+    for i in range(3):
+        cache.save(i, {'value': np.arange(i)})
+        os.utime(cache.path(i), (time.time() - 100 + i, time.time() - 100 + i))
+
+    # the oldest entry used again, the second one becomes the least recently used
+    assert np.array_equal(cache.load(0)['value'], np.arange(0))
+
+    cache.save(3, {'value': np.arange(3)})
+
+    assert len(os.listdir(str(tmp_path))) == 3
+    assert cache.load(1) is None
+    assert all(cache.load(i) is not None for i in [0, 2, 3])
@@ -0,0 +1,76 @@
+import numpy as np
+
+from conftest import car_tuple
+
+
+def slot_value(rda, obs_index):
+    # the per step arrays of the slot, A (T+1, edge_num, 2), b (T+1, edge_num, 1)
+
+    T = rda.T
+    para_obs = rda.para_obstacle_list[obs_index]
+    edge_num = para_obs['edge_num']
+
+    return para_obs['A'].value.reshape(T+1, edge_num, 2), para_obs['b'].value.reshape(T+1, edge_num, 1)
+
+
+def test_combine_parameter_matches_scalar(warm_mpc):
+
+    rda = warm_mpc.rda
+    rot_list = rda.para_rot.value.reshape(rda.T, 2, 2)
+
+    for t in range(rda.T):
+        phi = rda.para_s.value[2, t]
+        assert np.allclose(rot_list[t], [[np.cos(phi), -np.sin(phi)], [np.sin(phi), np.cos(phi)]], atol=1e-12)
+
+    rda.assign_combine_parameter_lamobs()
+    rda.assign_combine_parameter_stateobs()
+
+    for obs_index in rda.active_index_list:
+        A, b = slot_value(rda, obs_index)
+        edge_num = A.shape[1]
+        lam = rda.para_lam_list[obs_index].value
+
+        obsA_rot = rda.para_obsA_rot_list[obs_index].value.reshape(rda.T+1, edge_num, 2)
+        obsA_trans = rda.para_obsA_trans_list[obs_index].value.reshape(rda.T+1, edge_num, 1)
+
+        # the per step loop of the original assign_combine_parameter_lamobs and assign_combine_parameter_stateobs
+        for t in range(rda.T):
+            lam_t = lam[:, t+1:t+2]
+            trans_t = rda.para_s.value[0:2, t+1:t+2]
+
+            assert np.allclose(rda.para_obsA_lam_list[obs_index].value[t+1], (lam_t.T @ A[t+1])[0], atol=1e-12)
+            assert np.allclose(rda.para_obsb_lam_list[obs_index].value[t+1], (lam_t.T @ b[t+1])[0], atol=1e-12)
+            assert np.allclose(obsA_rot[t+1], A[t+1] @ rot_list[t], atol=1e-12)
+            assert np.allclose(obsA_trans[t+1], A[t+1] @ trans_t, atol=1e-12)
+
+
+def test_dual_update_matches_scalar(warm_mpc):
+
+    rda = warm_mpc.rda
+    rda.update_index_list = list(rda.active_index_list)
+    rot_list = rda.para_rot.value.reshape(rda.T, 2, 2)
+
+    xi_list = {index: rda.para_xi_list[index].value.copy() for index in rda.active_index_list}
+    zeta_list = {index: rda.para_zeta_list[index].value.copy() for index in rda.active_index_list}
+
+    rda.update_xi()
+    rda.update_zeta()
+
+    for obs_index in rda.active_index_list:
+        A, b = slot_value(rda, obs_index)
+        lam, mu = rda.para_lam_list[obs_index].value, rda.para_mu_list[obs_index].value
+
+        # the per step loop of the original update_xi and update_zeta
+        Im_list = []
+
+        for t in range(rda.T):
+            lam_t, mu_t = lam[:, t+1:t+2], mu[:, t+1:t+2]
+            trans_t = rda.para_s.value[0:2, t+1:t+2]
+
+            Hmt = mu_t.T @ car_tuple.G + lam_t.T @ A[t+1] @ rot_list[t]
+            assert np.allclose(rda.para_xi_list[obs_index].value[t+1:t+2], xi_list[obs_index][t+1:t+2] + Hmt, atol=1e-12)
+
+            Im_list.append(lam_t.T @ A[t+1] @ trans_t - lam_t.T @ b[t+1] - mu_t.T @ car_tuple.h)
+
+        zeta = zeta_list[obs_index] + (np.hstack(Im_list) - rda.para_dis.value - rda.para_z_list[obs_index].value)
+        assert np.allclose(rda.para_zeta_list[obs_index].value, zeta, atol=1e-12)
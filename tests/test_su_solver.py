@@ -0,0 +1,18 @@
+import numpy as np
+
+from conftest import make_mpc, run_steps
+
+
+def test_osqp_matches_ecos():
+
+    state_dict = {}
+
+    for su_solver in ['ECOS', 'OSQP']:
+        mpc = make_mpc(su_solver=su_solver)
+        state_dict[su_solver], _, _ = run_steps(mpc, 10)
+
+        assert np.min(mpc.rda.indep_dis.value) >= 0
+
+        mpc.close()
+
+    assert np.allclose(np.hstack(state_dict['OSQP']), np.hstack(state_dict['ECOS']), atol=1e-3)